@@ -0,0 +1,396 @@
+"""initial schema
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('boards',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=50), nullable=False),
+    sa.Column('created_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('updated_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('name')
+    )
+    op.create_table('grades',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=50), nullable=False),
+    sa.Column('created_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('updated_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('name')
+    )
+    op.create_table('schools',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=200), nullable=False),
+    sa.Column('address', sa.String(), nullable=False),
+    sa.Column('locality', sa.String(), nullable=True),
+    sa.Column('city', sa.String(), nullable=False),
+    sa.Column('state', sa.String(), nullable=False),
+    sa.Column('country', sa.String(), nullable=False),
+    sa.Column('zip_code', sa.String(), nullable=False),
+    sa.Column('contact_number_1', sa.String(length=20), nullable=False),
+    sa.Column('contact_number_2', sa.String(length=20), nullable=True),
+    sa.Column('email', sa.String(length=100), nullable=True),
+    sa.Column('poc1', sa.String(length=100), nullable=True),
+    sa.Column('poc2', sa.String(length=100), nullable=True),
+    sa.Column('created_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('updated_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('email'),
+    sa.UniqueConstraint('name')
+    )
+    op.create_table('sections',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=50), nullable=False),
+    sa.Column('created_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('updated_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('name')
+    )
+    op.create_table('subjects',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=100), nullable=False),
+    sa.Column('code', sa.String(length=20), nullable=True),
+    sa.Column('department', sa.String(length=25), nullable=True),
+    sa.Column('description', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('updated_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('code'),
+    sa.UniqueConstraint('id')
+    )
+    op.create_table('user_roles',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('description', sa.Text(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('name')
+    )
+    op.create_table('users',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('email', sa.String(), nullable=False),
+    sa.Column('password', sa.String(), nullable=False),
+    sa.Column('created_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.Column('updated_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('email')
+    )
+    op.create_table('divisions',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('grade_id', sa.Integer(), nullable=False),
+    sa.Column('section_id', sa.Integer(), nullable=False),
+    sa.Column('academic_year', sa.String(length=10), nullable=False),
+    sa.Column('created_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('updated_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.Column('school_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['grade_id'], ['grades.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['school_id'], ['schools.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['section_id'], ['sections.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('grade_id', 'section_id', 'academic_year', 'school_id', name='unique_division_per_school_year')
+    )
+    op.create_table('students',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('first_name', sa.String(length=100), nullable=False),
+    sa.Column('last_name', sa.String(length=100), nullable=False),
+    sa.Column('email', sa.String(length=100), nullable=False),
+    sa.Column('created_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('updated_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('school_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['school_id'], ['schools.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('email')
+    )
+    op.create_table('subject_topics',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('topic', sa.String(length=50), nullable=False),
+    sa.Column('sub_topic', sa.String(length=50), nullable=True),
+    sa.Column('subject_id', sa.Integer(), nullable=False),
+    sa.Column('board_id', sa.Integer(), nullable=False),
+    sa.Column('grade_id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('updated_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['board_id'], ['boards.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['grade_id'], ['grades.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['subject_id'], ['subjects.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('topic', 'sub_topic', 'subject_id', 'board_id', 'grade_id', name='unique_subject_topic')
+    )
+    op.create_table('teachers',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('first_name', sa.String(length=100), nullable=False),
+    sa.Column('last_name', sa.String(length=100), nullable=False),
+    sa.Column('email', sa.String(length=100), nullable=False),
+    sa.Column('created_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('updated_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('school_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['school_id'], ['schools.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('email')
+    )
+    op.create_table('user_roles_rel',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('role_id', sa.Integer(), nullable=False),
+    sa.Column('assigned_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.ForeignKeyConstraint(['role_id'], ['user_roles.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('class_schedules',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('period', sa.Integer(), nullable=False),
+    sa.Column('date', sa.Date(), server_default=sa.text('CURRENT_DATE'), nullable=False),
+    sa.Column('subject_id', sa.Integer(), nullable=False),
+    sa.Column('division_id', sa.Integer(), nullable=False),
+    sa.Column('teacher_id', sa.Integer(), nullable=False),
+    sa.Column('start_time', sa.Time(), nullable=False),
+    sa.Column('end_time', sa.Time(), nullable=False),
+    sa.Column('created_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('updated_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['division_id'], ['divisions.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['subject_id'], ['subjects.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['teacher_id'], ['teachers.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('division_subjects',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('updated_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.Column('school_id', sa.Integer(), nullable=False),
+    sa.Column('division_id', sa.Integer(), nullable=False),
+    sa.Column('subject_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['division_id'], ['divisions.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['school_id'], ['schools.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['subject_id'], ['subjects.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('school_id', 'division_id', 'subject_id', name='unique_division_subject')
+    )
+    op.create_table('published_quiz',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('quiz_detail', sa.JSON(), nullable=True),
+    sa.Column('quiz_type', sa.String(length=20), nullable=False),
+    sa.Column('start_time', sa.DateTime(), nullable=False),
+    sa.Column('duration', sa.Integer(), nullable=False),
+    sa.Column('end_time', sa.DateTime(), sa.Computed("start_time + interval '1 minute' * duration"), nullable=False),
+    sa.Column('quiz_id', sa.Integer(), nullable=False),
+    sa.Column('teacher_task_id', sa.Integer(), nullable=True),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('division_id', sa.Integer(), nullable=False),
+    sa.Column('school_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['division_id'], ['divisions.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['school_id'], ['schools.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('quiz_id', 'division_id', 'school_id', 'quiz_type', name='uq_published_quiz_div_school')
+    )
+    op.create_table('questions',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('title', sa.String(length=200), nullable=False),
+    sa.Column('body', sa.JSON(), nullable=True),
+    sa.Column('is_objective', sa.Boolean(), server_default=sa.text('true'), nullable=False),
+    sa.Column('answer', sa.JSON(), nullable=True),
+    sa.Column('choice_body', sa.JSON(), nullable=True),
+    sa.Column('topic', sa.String(length=50), nullable=False),
+    sa.Column('sub_topic', sa.String(length=50), nullable=False),
+    sa.Column('baseline_answer', sa.JSON(), nullable=True),
+    sa.Column('is_public', sa.Boolean(), server_default=sa.text('true'), nullable=True),
+    sa.Column('state', sa.Enum('active', 'draft', 'edited', name='questionstate'), nullable=True),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('school_id', sa.Integer(), nullable=False),
+    sa.Column('division_id', sa.Integer(), nullable=False),
+    sa.Column('subject_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['division_id'], ['divisions.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['school_id'], ['schools.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['subject_id'], ['subjects.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user_id', 'title', 'subject_id', 'division_id', 'school_id', name='uq_question_user_title_context')
+    )
+    op.create_table('quiz',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('title', sa.String(length=200), nullable=False),
+    sa.Column('start_date', sa.DateTime(), nullable=False),
+    sa.Column('duration', sa.Integer(), nullable=False),
+    sa.Column('due_date', sa.DateTime(), sa.Computed("start_date + interval '1 minute' * duration"), nullable=False),
+    sa.Column('topic', sa.String(length=50), nullable=False),
+    sa.Column('sub_topic', sa.String(length=50), nullable=False),
+    sa.Column('quiz_type', sa.String(length=50), nullable=False),
+    sa.Column('is_public', sa.Boolean(), server_default=sa.text('true'), nullable=True),
+    sa.Column('instructions', sa.JSON(), nullable=True),
+    sa.Column('total_marks', sa.Integer(), nullable=True),
+    sa.Column('subject_id', sa.Integer(), nullable=False),
+    sa.Column('division_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('school_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['division_id'], ['divisions.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['school_id'], ['schools.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['subject_id'], ['subjects.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('student_divisions',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('student_id', sa.Integer(), nullable=False),
+    sa.Column('division_id', sa.Integer(), nullable=False),
+    sa.Column('is_current', sa.Boolean(), server_default=sa.text('true'), nullable=False),
+    sa.Column('created_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('updated_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['division_id'], ['divisions.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['student_id'], ['students.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('student_id', 'division_id', name='unique_student_division')
+    )
+    op.create_table('student_subject_rel',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('subject_id', sa.Integer(), nullable=False),
+    sa.Column('student_id', sa.Integer(), nullable=False),
+    sa.Column('division_id', sa.Integer(), nullable=True),
+    sa.Column('is_active', sa.Boolean(), server_default=sa.text('true'), nullable=True),
+    sa.ForeignKeyConstraint(['division_id'], ['divisions.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['student_id'], ['students.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['subject_id'], ['subjects.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('subject_id', 'student_id', 'division_id', 'is_active', name='uq_student_subject')
+    )
+    op.create_table('teacher_division_subject_rel',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('division_id', sa.Integer(), nullable=False),
+    sa.Column('teacher_id', sa.Integer(), nullable=False),
+    sa.Column('subject_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['division_id'], ['divisions.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['subject_id'], ['subjects.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['teacher_id'], ['teachers.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('subject_id', 'teacher_id', 'division_id', name='uq_division_subject_teacher')
+    )
+    op.create_table('class_details_rel',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('class_schedule_id', sa.Integer(), nullable=False),
+    sa.Column('subject_topic_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['class_schedule_id'], ['class_schedules.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['subject_topic_id'], ['subject_topics.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('class_schedule_id', 'subject_topic_id', name='uq_schedule_topic')
+    )
+    op.create_table('quiz_question_rel',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('question_number', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('question_id', sa.Integer(), nullable=False),
+    sa.Column('quiz_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['question_id'], ['questions.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['quiz_id'], ['quiz.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('quiz_id', 'question_id', name='uq_quiz_question')
+    )
+    op.create_table('students_quiz_response_rel',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('quiz_detail', sa.JSON(), nullable=True),
+    sa.Column('response', sa.JSON(), nullable=True),
+    sa.Column('quiz_type', sa.String(length=20), nullable=True),
+    sa.Column('start_date', sa.DateTime(), nullable=True),
+    sa.Column('duration', sa.Integer(), nullable=True),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('created_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.Column('updated_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.Column('is_submitted', sa.Boolean(), server_default=sa.text('false'), nullable=False),
+    sa.Column('submitted_at', sa.TIMESTAMP(timezone=True), nullable=True),
+    sa.Column('student_id', sa.Integer(), nullable=False),
+    sa.Column('quiz_rel_id', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['quiz_rel_id'], ['published_quiz.id'], ),
+    sa.ForeignKeyConstraint(['student_id'], ['students.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('teacher_tasks',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('title', sa.String(length=100), nullable=False),
+    sa.Column('task_type', sa.Enum('Classwork', 'Homework', 'Quiz', 'Assignment', 'ReadingMaterial', 'AICheck', 'SlipTest', name='tasktypeenum'), nullable=False),
+    sa.Column('start_date', sa.Date(), nullable=True),
+    sa.Column('end_date', sa.Date(), nullable=True),
+    sa.Column('instructions', sa.JSON(), nullable=True),
+    sa.Column('status', sa.String(), nullable=True),
+    sa.Column('subject_id', sa.Integer(), nullable=False),
+    sa.Column('teacher_id', sa.Integer(), nullable=False),
+    sa.Column('division_id', sa.Integer(), nullable=False),
+    sa.Column('class_schedule_id', sa.Integer(), nullable=True),
+    sa.Column('quiz_id', sa.Integer(), nullable=True),
+    sa.Column('published_quiz_id', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['class_schedule_id'], ['class_schedules.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['division_id'], ['divisions.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['published_quiz_id'], ['published_quiz.id'], ondelete='SET NULL'),
+    sa.ForeignKeyConstraint(['quiz_id'], ['quiz.id'], ondelete='SET NULL'),
+    sa.ForeignKeyConstraint(['subject_id'], ['subjects.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['teacher_id'], ['teachers.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('title', 'task_type', 'subject_id', 'teacher_id', 'division_id', 'class_schedule_id', name='uq_task_subject_teacher')
+    )
+    op.create_index(op.f('ix_published_quiz_id'), 'published_quiz', ['id'], unique=False)
+    op.create_index(op.f('ix_questions_id'), 'questions', ['id'], unique=False)
+    op.create_index(op.f('ix_quiz_id'), 'quiz', ['id'], unique=False)
+    op.create_index(op.f('ix_student_subject_rel_id'), 'student_subject_rel', ['id'], unique=False)
+    op.create_index(op.f('ix_teacher_division_subject_rel_id'), 'teacher_division_subject_rel', ['id'], unique=False)
+    op.create_index(op.f('ix_quiz_question_rel_id'), 'quiz_question_rel', ['id'], unique=False)
+    op.create_index(op.f('ix_students_quiz_response_rel_id'), 'students_quiz_response_rel', ['id'], unique=False)
+    op.create_index(op.f('ix_teacher_tasks_id'), 'teacher_tasks', ['id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_teacher_tasks_id'), table_name='teacher_tasks')
+    op.drop_index(op.f('ix_students_quiz_response_rel_id'), table_name='students_quiz_response_rel')
+    op.drop_index(op.f('ix_quiz_question_rel_id'), table_name='quiz_question_rel')
+    op.drop_index(op.f('ix_teacher_division_subject_rel_id'), table_name='teacher_division_subject_rel')
+    op.drop_index(op.f('ix_student_subject_rel_id'), table_name='student_subject_rel')
+    op.drop_index(op.f('ix_quiz_id'), table_name='quiz')
+    op.drop_index(op.f('ix_questions_id'), table_name='questions')
+    op.drop_index(op.f('ix_published_quiz_id'), table_name='published_quiz')
+    op.drop_table('teacher_tasks')
+    op.drop_table('students_quiz_response_rel')
+    op.drop_table('quiz_question_rel')
+    op.drop_table('class_details_rel')
+    op.drop_table('teacher_division_subject_rel')
+    op.drop_table('student_subject_rel')
+    op.drop_table('student_divisions')
+    op.drop_table('quiz')
+    op.drop_table('questions')
+    op.drop_table('published_quiz')
+    op.drop_table('division_subjects')
+    op.drop_table('class_schedules')
+    op.drop_table('user_roles_rel')
+    op.drop_table('teachers')
+    op.drop_table('subject_topics')
+    op.drop_table('students')
+    op.drop_table('divisions')
+    op.drop_table('users')
+    op.drop_table('user_roles')
+    op.drop_table('subjects')
+    op.drop_table('sections')
+    op.drop_table('schools')
+    op.drop_table('grades')
+    op.drop_table('boards')
+    sa.Enum(name='tasktypeenum').drop(op.get_bind(), checkfirst=True)
+    sa.Enum(name='questionstate').drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,54 @@
+"""indexes for hot lookup paths
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, Sequence[str], None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (name, table, columns, partial index predicate)
+INDEXES = [
+    ('ix_student_divisions_student_id_current', 'student_divisions', ['student_id'], 'is_current'),
+    ('ix_student_divisions_division_id_current', 'student_divisions', ['division_id'], 'is_current'),
+    ('ix_class_schedules_teacher_id_date_start_time', 'class_schedules', ['teacher_id', 'date', 'start_time'], None),
+    ('ix_class_schedules_division_id_date_start_time', 'class_schedules', ['division_id', 'date', 'start_time'], None),
+    ('ix_quiz_question_rel_quiz_id_question_number', 'quiz_question_rel', ['quiz_id', 'question_number'], None),
+    ('ix_students_user_id', 'students', ['user_id'], None),
+    ('ix_teachers_user_id', 'teachers', ['user_id'], None),
+    ('ix_user_roles_rel_user_id', 'user_roles_rel', ['user_id'], None),
+    ('ix_students_quiz_response_rel_student_id', 'students_quiz_response_rel', ['student_id'], None),
+    ('ix_students_quiz_response_rel_quiz_rel_id', 'students_quiz_response_rel', ['quiz_rel_id'], None),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CONCURRENTLY keeps the tables writable while the indexes build; it
+    # cannot run inside the migration transaction
+    with op.get_context().autocommit_block():
+        for name, table, columns, where in INDEXES:
+            op.create_index(
+                name, table, columns,
+                postgresql_where=sa.text(where) if where else None,
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, table, _, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,44 @@
+"""exclusion constraints against overlapping class schedules
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, Sequence[str], None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+SLOT = "tsrange(date + start_time, date + end_time, '[)')"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # btree_gist provides the gist operator class for the integer equality part
+    op.execute("CREATE EXTENSION IF NOT EXISTS btree_gist")
+    # Fails if existing rows already overlap; those must be cleaned up first
+    op.create_check_constraint('ck_class_schedules_time_order', 'class_schedules', 'end_time > start_time')
+    # Written out because create_exclude_constraint only accepts plain columns
+    for name, column in (
+        ('excl_class_schedules_teacher_overlap', 'teacher_id'),
+        ('excl_class_schedules_division_overlap', 'division_id'),
+    ):
+        op.execute(
+            f"ALTER TABLE class_schedules ADD CONSTRAINT {name} "
+            f"EXCLUDE USING gist ({column} WITH =, {SLOT} WITH &&)"
+        )
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('excl_class_schedules_division_overlap', 'class_schedules')
+    op.drop_constraint('excl_class_schedules_teacher_overlap', 'class_schedules')
+    op.drop_constraint('ck_class_schedules_time_order', 'class_schedules', type_='check')
@@ -0,0 +1,88 @@
+"""weekly timetable templates, holidays and per-date overrides
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, Sequence[str], None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('timetable_templates',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('weekday', sa.Integer(), nullable=False),
+    sa.Column('period', sa.Integer(), nullable=False),
+    sa.Column('start_time', sa.Time(), nullable=False),
+    sa.Column('end_time', sa.Time(), nullable=False),
+    sa.Column('valid_from', sa.Date(), nullable=False),
+    sa.Column('valid_until', sa.Date(), nullable=True),
+    sa.Column('division_id', sa.Integer(), nullable=False),
+    sa.Column('subject_id', sa.Integer(), nullable=False),
+    sa.Column('teacher_id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('updated_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.CheckConstraint('weekday BETWEEN 0 AND 6', name='ck_timetable_templates_weekday'),
+    sa.CheckConstraint('end_time > start_time', name='ck_timetable_templates_time_order'),
+    sa.ForeignKeyConstraint(['division_id'], ['divisions.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['subject_id'], ['subjects.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['teacher_id'], ['teachers.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('division_id', 'weekday', 'period', 'valid_from', name='uq_timetable_template_slot')
+    )
+    op.create_index('ix_timetable_templates_teacher_id_weekday', 'timetable_templates', ['teacher_id', 'weekday'], unique=False)
+    op.create_table('holidays',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('date', sa.Date(), nullable=False),
+    sa.Column('name', sa.String(length=100), nullable=False),
+    sa.Column('school_id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('updated_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['school_id'], ['schools.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('school_id', 'date', name='uq_holiday_school_date')
+    )
+    op.create_table('schedule_overrides',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('date', sa.Date(), nullable=False),
+    sa.Column('cancelled', sa.Boolean(), server_default=sa.text('false'), nullable=False),
+    sa.Column('subject_id', sa.Integer(), nullable=True),
+    sa.Column('teacher_id', sa.Integer(), nullable=True),
+    sa.Column('start_time', sa.Time(), nullable=True),
+    sa.Column('end_time', sa.Time(), nullable=True),
+    sa.Column('template_id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('updated_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['subject_id'], ['subjects.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['teacher_id'], ['teachers.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['template_id'], ['timetable_templates.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('template_id', 'date', name='uq_schedule_override_template_date')
+    )
+    op.create_index('ix_schedule_overrides_teacher_id_date', 'schedule_overrides', ['teacher_id', 'date'], unique=False)
+    op.add_column('class_schedules', sa.Column('template_id', sa.Integer(), nullable=True))
+    op.create_foreign_key('class_schedules_template_id_fkey', 'class_schedules', 'timetable_templates', ['template_id'], ['id'], ondelete='SET NULL')
+    op.create_unique_constraint('uq_class_schedules_template_date', 'class_schedules', ['template_id', 'date'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('uq_class_schedules_template_date', 'class_schedules', type_='unique')
+    op.drop_constraint('class_schedules_template_id_fkey', 'class_schedules', type_='foreignkey')
+    op.drop_column('class_schedules', 'template_id')
+    op.drop_index('ix_schedule_overrides_teacher_id_date', table_name='schedule_overrides')
+    op.drop_table('schedule_overrides')
+    op.drop_table('holidays')
+    op.drop_index('ix_timetable_templates_teacher_id_weekday', table_name='timetable_templates')
+    op.drop_table('timetable_templates')
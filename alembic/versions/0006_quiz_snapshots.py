@@ -0,0 +1,44 @@
+"""content-addressed quiz snapshots referenced by published quizzes and student rows
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0006'
+down_revision: Union[str, Sequence[str], None] = '0005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('quiz_snapshots',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('content_hash', sa.String(length=64), nullable=False),
+    sa.Column('quiz_detail', sa.JSON(), nullable=False),
+    sa.Column('created_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('content_hash')
+    )
+    # Existing rows keep their copied quiz_detail; only new publishes reference snapshots
+    op.add_column('published_quiz', sa.Column('snapshot_id', sa.Integer(), nullable=True))
+    op.create_foreign_key('published_quiz_snapshot_id_fkey', 'published_quiz', 'quiz_snapshots', ['snapshot_id'], ['id'])
+    op.add_column('students_quiz_response_rel', sa.Column('snapshot_id', sa.Integer(), nullable=True))
+    op.create_foreign_key('students_quiz_response_rel_snapshot_id_fkey', 'students_quiz_response_rel', 'quiz_snapshots', ['snapshot_id'], ['id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('students_quiz_response_rel_snapshot_id_fkey', 'students_quiz_response_rel', type_='foreignkey')
+    op.drop_column('students_quiz_response_rel', 'snapshot_id')
+    op.drop_constraint('published_quiz_snapshot_id_fkey', 'published_quiz', type_='foreignkey')
+    op.drop_column('published_quiz', 'snapshot_id')
+    op.drop_table('quiz_snapshots')
@@ -0,0 +1,34 @@
+"""auto-grading scores on student quiz responses
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-17 22:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0008'
+down_revision: Union[str, Sequence[str], None] = '0007'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('students_quiz_response_rel', sa.Column('score', sa.Float(), nullable=True))
+    op.add_column('students_quiz_response_rel', sa.Column('max_score', sa.Float(), nullable=True))
+    op.add_column('students_quiz_response_rel', sa.Column('question_scores', sa.JSON(), nullable=True))
+    op.add_column('students_quiz_response_rel', sa.Column('graded_at', sa.TIMESTAMP(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('students_quiz_response_rel', 'graded_at')
+    op.drop_column('students_quiz_response_rel', 'question_scores')
+    op.drop_column('students_quiz_response_rel', 'max_score')
+    op.drop_column('students_quiz_response_rel', 'score')
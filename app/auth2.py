@@ -6,6 +6,7 @@ from fastapi import Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from app.database import get_db
 from app import models, schemas
+from app.cache import TTLCache
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")  
 
@@ -13,13 +14,21 @@ SECRET_KEY = "09d25e094faa6ca2556c818166b7a9563b93f7099f6f0f4caa6cf63b88e8d3e7"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
+# Verified principals keyed by (user id, token issue time), so steady-state
+# authentication skips the users lookup entirely. The cache is per worker and
+# not invalidated: the role comes from the token itself, so the only thing a
+# cached entry can get wrong is that its user still exists, and a deleted
+# user's token keeps authenticating for at most PRINCIPAL_CACHE_SECONDS.
+PRINCIPAL_CACHE_SECONDS = 300
+principal_cache = TTLCache(maxsize=10000, ttl=PRINCIPAL_CACHE_SECONDS)
+
 def create_access_token(data: dict, expires_delta: timedelta | None = None):
     to_encode = data.copy()
     if expires_delta:
         expire = datetime.now(timezone.utc) + expires_delta
     else:
         expire = datetime.now(timezone.utc) + timedelta(minutes=15)
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, "iat": datetime.now(timezone.utc)})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
@@ -31,7 +40,12 @@ def verify_access_token(token: str, credentials_exception):
         if user_id is None:
             raise credentials_exception
 
-        return schemas.TokenData(id=str(user_id))
+        return schemas.TokenData(
+            id=str(user_id),
+            role=payload.get("role"),
+            issued_at=payload.get("iat"),
+            expires_at=payload.get("exp")
+        )
     except PyJWTError:
         raise credentials_exception
     
@@ -48,8 +62,42 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
     if not token_data.id:
         raise credentials_exception
 
-    user = db.query(models.User).filter(models.User.id == int(token_data.id)).first()
+    cache_key = (int(token_data.id), token_data.issued_at)
+    principal = principal_cache.get(cache_key)
+    if principal is not None:
+        return principal
+
+    user = db.query(models.User.id).filter(models.User.id == int(token_data.id)).first()
     if not user:
         raise credentials_exception
-    
-    return user  
\ No newline at end of file
+
+    principal = schemas.Principal(id=user.id, role=token_data.role)
+    # Never keep a principal around longer than its token is valid
+    ttl = None
+    if token_data.expires_at:
+        ttl = token_data.expires_at - datetime.now(timezone.utc).timestamp()
+    if ttl is None or ttl > 0:
+        principal_cache.set(cache_key, principal, ttl=ttl)
+    return principal
+
+
+def require_role(*roles: str, detail: str = "Not enough permissions"):
+    # Authorize from the signed role claim alone, no database round trip
+    allowed_roles = {role.lower() for role in roles}
+
+    def role_checker(token: str = Depends(oauth2_scheme)) -> schemas.Principal:
+        credentials_exception = HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+        token_data = verify_access_token(token, credentials_exception)
+
+        if not token_data.role:
+            raise HTTPException(status_code=403, detail="User does not have a role assigned")
+        if token_data.role.lower() not in allowed_roles:
+            raise HTTPException(status_code=403, detail=detail)
+
+        return schemas.Principal(id=int(token_data.id), role=token_data.role)
+
+    return role_checker
@@ -0,0 +1,231 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from sqlalchemy import Integer, Text, JSON, TIMESTAMP, select, update, func, cast, literal, column, or_
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.asyncio import AsyncSession
+from app import models, notify
+from app.database import AsyncSessionLocal
+
+# Write-behind buffer for quiz autosaves. A save only merges the changed
+# answers into this worker's pending delta of the attempt; every
+# FLUSH_SECONDS the pending deltas of all attempts are written in one
+# transaction, a single UPDATE per FLUSH_BATCH attempts that merges each
+# delta into the stored response (jsonb ||), so the number of commits does
+# not grow with the number of students. A worker that dies loses at most
+# its last FLUSH_SECONDS of autosaves.
+#
+# Each pending answer keeps the time it was accepted. The attempt may be
+# submitted through another worker, or while this worker's flush of it is
+# in flight, so a flush still applies to a submitted attempt the answers
+# accepted before its submitted_at (and drops later ones). Submit on this
+# worker waits for an in-flight flush of the attempt and writes the rest of
+# its pending answers in the same UPDATE that marks it submitted.
+#
+# A submit also tells every worker (app.notify) to forget the attempt, so
+# their next save of it reads the attempt again and is refused with 409.
+# A 202 therefore means the answer was buffered, not that it is kept: a save
+# that reaches another worker after the submit commits but before the
+# notification does is accepted and then dropped by the flush.
+
+FLUSH_SECONDS = 3.0
+FLUSH_BATCH = 1000
+DEADLINE_GRACE_SECONDS = 60
+MAX_ATTEMPTS = 100000
+TOPIC = "autosave"
+
+logger = logging.getLogger("uvicorn.error")
+
+Table = models.StudentQuizResponseRel
+
+Pending = dict[str, tuple[object, datetime]]  # question id -> (answer, accepted at)
+
+
+def merged_response(delta):
+    # The stored response with the answers of `delta` (a jsonb expression) replaced
+    stored = func.coalesce(cast(Table.response, JSONB), cast(literal("{}"), JSONB))
+    return cast(stored.op("||")(delta), JSON)
+
+
+def _merge_statement(batch: list[tuple[int, Pending]]):
+    answers = func.jsonb_to_recordset(literal([
+        {"id": attempt_id, "question_id": question_id, "answer": answer, "accepted_at": accepted_at.isoformat()}
+        for attempt_id, pending in batch
+        for question_id, (answer, accepted_at) in pending.items()
+    ], JSONB)).table_valued(
+        column("id", Integer), column("question_id", Text), column("answer", JSONB),
+        column("accepted_at", TIMESTAMP(timezone=True))
+    ).render_derived(name="answers", with_types=True)
+    stored = Table.__table__.alias("stored")
+    deltas = select(
+        answers.c.id, func.jsonb_object_agg(answers.c.question_id, answers.c.answer).label("delta")
+    ).select_from(answers).join(stored, stored.c.id == answers.c.id).where(
+        or_(stored.c.is_submitted == False, answers.c.accepted_at <= stored.c.submitted_at)
+    ).group_by(answers.c.id).subquery("deltas")
+    return update(Table).where(Table.id == deltas.c.id).values(
+        response=merged_response(deltas.c.delta), updated_at=func.now()
+    )
+
+
+def _answers(pending: Pending) -> dict:
+    return {question_id: answer for question_id, (answer, _) in pending.items()}
+
+
+class Attempt:
+    # What a save needs to know about an attempt, kept so that saves don't query
+    __slots__ = ("id", "user_id", "deadline", "question_ids")
+
+    def __init__(self, attempt_id: int, user_id: int, deadline: datetime, question_ids: frozenset):
+        self.id = attempt_id
+        self.user_id = user_id
+        self.deadline = deadline
+        self.question_ids = question_ids
+
+    def open(self, now: Optional[datetime] = None) -> bool:
+        return (now or datetime.now()) <= self.deadline + timedelta(seconds=DEADLINE_GRACE_SECONDS)
+
+
+class Buffer:
+    def __init__(self, flush_seconds: float = FLUSH_SECONDS):
+        self.flush_seconds = flush_seconds
+        self._attempts: dict[int, Attempt] = {}
+        self._dirty: dict[int, Pending] = {}
+        self._in_flight: set[int] = set()
+        self._flushed = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self.stats = {"saves": 0, "flushes": 0, "attempts_written": 0, "flush_errors": 0}
+
+    def attempt(self, attempt_id: int) -> Optional[Attempt]:
+        return self._attempts.get(attempt_id)
+
+    def remember(self, attempt: Attempt):
+        if len(self._attempts) >= MAX_ATTEMPTS:
+            self._attempts.clear()
+        self._attempts[attempt.id] = attempt
+
+    def forget(self, attempt_id: Optional[int] = None):
+        # No id forgets every attempt; also called from the notification listener's thread
+        if attempt_id is None:
+            self._attempts.clear()
+        else:
+            self._attempts.pop(attempt_id, None)
+
+    def save(self, attempt_id: int, answers: dict):
+        # Later answers to the same question replace earlier ones
+        accepted_at = datetime.now(timezone.utc)
+        pending = self._dirty.setdefault(attempt_id, {})
+        for question_id, answer in answers.items():
+            pending[question_id] = (answer, accepted_at)
+        self.stats["saves"] += 1
+
+    def pending(self, attempt_id: int) -> dict:
+        return _answers(self._dirty.get(attempt_id, {}))
+
+    def _restore(self, attempt_id: int, pending: Pending):
+        # Put back answers that were not written, under any saved meanwhile
+        self._dirty[attempt_id] = {**pending, **self._dirty.get(attempt_id, {})}
+
+    async def flush(self) -> int:
+        if not self._dirty:
+            return 0
+        dirty, self._dirty = self._dirty, {}
+        items = list(dirty.items())
+        self._in_flight = set(dirty)
+        self._flushed = flushed = asyncio.Event()
+        try:
+            async with AsyncSessionLocal() as db:
+                for start in range(0, len(items), FLUSH_BATCH):
+                    await db.execute(_merge_statement(items[start:start + FLUSH_BATCH]))
+                await db.commit()
+        except BaseException:
+            # Also when cancelled at shutdown
+            for attempt_id, pending in items:
+                self._restore(attempt_id, pending)
+            self.stats["flush_errors"] += 1
+            raise
+        finally:
+            self._in_flight = set()
+            flushed.set()
+        self.stats["flushes"] += 1
+        self.stats["attempts_written"] += len(items)
+        return len(items)
+
+    async def submit(self, db: AsyncSession, attempt_id: int, answers: dict):
+        # Marks the attempt submitted with this worker's pending answers and
+        # `answers` (the client's unsaved ones) merged in; returns its
+        # submitted_at and response, or None if it was already submitted
+        while attempt_id in self._in_flight:
+            await self._flushed.wait()
+        pending = self._dirty.pop(attempt_id, {})
+        try:
+            submitted = (await db.execute(
+                update(Table).where(
+                    Table.id == attempt_id,
+                    Table.is_submitted == False
+                ).values(
+                    response=merged_response(literal({**_answers(pending), **answers}, JSONB)),
+                    is_submitted=True,
+                    submitted_at=func.now(),
+                    updated_at=func.now(),
+                    status="submitted"
+                ).returning(Table.submitted_at, Table.response)
+            )).first()
+            if submitted is not None:
+                await notify.async_publish(db, TOPIC, str(attempt_id))
+            await db.commit()
+        except BaseException:
+            self._restore(attempt_id, pending)
+            raise
+        self.forget(attempt_id)
+        return submitted
+
+    def _expire(self):
+        now = datetime.now()
+        for attempt_id, attempt in list(self._attempts.items()):
+            if not attempt.open(now):
+                self._attempts.pop(attempt_id, None)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_seconds)
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("flushing quiz autosaves failed")
+            self._expire()
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        try:
+            await self.flush()
+        except Exception:
+            logger.exception("flushing quiz autosaves at shutdown failed")
+
+    def get_stats(self) -> dict:
+        return {
+            "attempts": len(self._attempts),
+            "pending": len(self._dirty),
+            "pending_answers": sum(len(delta) for delta in self._dirty.values()),
+            **self.stats,
+        }
+
+
+buffer = Buffer()
+
+
+def _on_notification(key: Optional[str]):
+    buffer.forget(int(key) if key is not None else None)
+
+
+notify.subscribe(TOPIC, _on_notification)
@@ -0,0 +1,145 @@
+import enum
+from datetime import date, datetime, time
+from typing import Iterable, Iterator, Sequence, Union
+import orjson
+from sqlalchemy import JSON, Table, insert
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# Bulk writes for fan-out inserts (a row per student, per subject, per
+# imported line). Rows are streamed to Postgres with COPY FROM STDIN on the
+# session's own connection, so they are part of the caller's transaction:
+# CSV through psycopg2 for sync sessions, binary through asyncpg for async
+# ones. COPY can't skip conflicting rows, so writes that name a conflict
+# target use multi-row INSERT ... ON CONFLICT DO NOTHING instead, as do
+# other drivers (plain multi-row INSERT). Server defaults apply to columns
+# the rows leave out.
+
+INSERT_BATCH = 1000
+
+Conflict = Union[str, Sequence[str], None]  # a constraint name or the conflict columns
+
+
+def _table(target) -> Table:
+    return target if isinstance(target, Table) else target.__table__
+
+
+def _columns(rows: list[dict]) -> list[str]:
+    return list(rows[0].keys())
+
+
+def _csv_field(value) -> str:
+    # Every non-null value is quoted, so an empty string stays distinct from NULL
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        text = "true" if value else "false"
+    elif isinstance(value, (dict, list)):
+        text = orjson.dumps(value).decode()
+    elif isinstance(value, (datetime, date, time)):
+        text = value.isoformat()
+    elif isinstance(value, enum.Enum):
+        text = str(value.value)
+    else:
+        text = str(value)
+    return '"' + text.replace('"', '""') + '"'
+
+
+class _CsvStream:
+    # File-like reader over the CSV lines, generated as COPY asks for them
+    def __init__(self, lines: Iterator[str]):
+        self._lines = lines
+        self._buffer = b""
+
+    def read(self, size: int = -1) -> bytes:
+        while size < 0 or len(self._buffer) < size:
+            line = next(self._lines, None)
+            if line is None:
+                break
+            self._buffer += line.encode()
+        if size < 0:
+            data, self._buffer = self._buffer, b""
+        else:
+            data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+
+def _csv_lines(rows: Iterable[dict], columns: list[str]) -> Iterator[str]:
+    for row in rows:
+        yield ",".join(_csv_field(row[column]) for column in columns) + "\n"
+
+
+def _json_columns(table: Table, columns: list[str]) -> set:
+    return {column for column in columns if isinstance(table.c[column].type, JSON)}
+
+
+def _records(rows: Iterable[dict], columns: list[str], json_columns: set) -> Iterator[tuple]:
+    # asyncpg's binary COPY takes json as text and enums as their labels
+    for row in rows:
+        record = []
+        for column in columns:
+            value = row[column]
+            if column in json_columns and value is not None:
+                value = orjson.dumps(value).decode()
+            elif isinstance(value, enum.Enum):
+                value = value.value
+            record.append(value)
+        yield tuple(record)
+
+
+def _insert_statement(table: Table, batch: list[dict], conflict: Conflict):
+    if conflict is None:
+        return insert(table).values(batch)
+    stmt = pg_insert(table).values(batch)
+    if isinstance(conflict, str):
+        return stmt.on_conflict_do_nothing(constraint=conflict)
+    return stmt.on_conflict_do_nothing(index_elements=list(conflict))
+
+
+def _batches(rows: list[dict]) -> Iterator[list[dict]]:
+    for start in range(0, len(rows), INSERT_BATCH):
+        yield rows[start:start + INSERT_BATCH]
+
+
+def insert_rows(db: Session, target, rows: list[dict], conflict: Conflict = None) -> int:
+    # Returns the number of rows written; with a conflict target, rows that
+    # hit it are skipped. All rows must have the same keys. The caller commits.
+    if not rows:
+        return 0
+    table = _table(target)
+    columns = _columns(rows)
+    # Pending ORM changes (e.g. the parent rows) must reach the database first
+    db.flush()
+    if conflict is None and db.get_bind().dialect.driver == "psycopg2":
+        quote = db.get_bind().dialect.identifier_preparer.quote
+        dbapi_connection = db.connection().connection.dbapi_connection
+        with dbapi_connection.cursor() as cursor:
+            cursor.copy_expert(
+                f"COPY {quote(table.name)} ({', '.join(quote(column) for column in columns)}) FROM STDIN WITH (FORMAT csv)",
+                _CsvStream(_csv_lines(rows, columns))
+            )
+        return len(rows)
+    written = 0
+    for batch in _batches(rows):
+        written += db.execute(_insert_statement(table, batch, conflict)).rowcount
+    return written
+
+
+async def async_insert_rows(db: AsyncSession, target, rows: list[dict], conflict: Conflict = None) -> int:
+    if not rows:
+        return 0
+    table = _table(target)
+    columns = _columns(rows)
+    await db.flush()
+    if conflict is None and db.get_bind().dialect.driver == "asyncpg":
+        connection = await db.connection()
+        raw = await connection.get_raw_connection()
+        await raw.driver_connection.copy_records_to_table(
+            table.name, records=_records(rows, columns, _json_columns(table, columns)), columns=columns
+        )
+        return len(rows)
+    written = 0
+    for batch in _batches(rows):
+        written += (await db.execute(_insert_statement(table, batch, conflict))).rowcount
+    return written
@@ -0,0 +1,178 @@
+import bisect
+import threading
+import time
+from datetime import date, time as time_of_day
+from typing import Callable, Optional
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from app import notify, refcache
+
+# In-process day timetables behind the "current class" endpoints. The
+# classes of one division or teacher on one date are loaded once, with every
+# name resolved and the topics attached, and kept sorted by start_time;
+# each poll is then a binary search. The profile lookup that maps a user to
+# their division or teacher id is kept alongside. Writers publish the keys
+# they touch (see app.notify) and every worker drops them. Entries also
+# expire after ENTRY_TTL_SECONDS as a backstop for writes that don't publish.
+
+TOPIC = "daytable"
+ENTRY_TTL_SECONDS = 900
+MAX_ENTRIES = 50000
+MAX_PUBLISHED_KEYS = 100
+
+
+def day_key(kind: str, owner_id: int, day: date) -> str:
+    # kind is "division" or "teacher"
+    return f"{kind}:{owner_id}:{day.isoformat()}"
+
+
+def user_key(user_id: int) -> str:
+    return f"user:{user_id}"
+
+
+class DayTimetable:
+    __slots__ = ("classes", "starts", "boundaries", "loaded_at")
+
+    def __init__(self, classes: list[dict]):
+        self.classes = sorted(classes, key=lambda details: details["start_time"])
+        self.starts = [details["start_time"] for details in self.classes]
+        # Times at which current() can change: a class starts, or ends (it
+        # still counts as current at its end_time, so the change is just after)
+        self.boundaries = sorted(
+            {(details["start_time"], False) for details in self.classes}
+            | {(details["end_time"], True) for details in self.classes}
+        )
+        self.loaded_at = time.monotonic()
+
+    def current(self, now: time_of_day) -> Optional[dict]:
+        # The earliest class with start_time <= now <= end_time. Classes of one
+        # division or teacher never overlap, so only the last class starting
+        # by now, or the one before it when the two touch, can qualify
+        index = bisect.bisect_right(self.starts, now)
+        for candidate in (index - 2, index - 1):
+            if candidate >= 0 and self.classes[candidate]["end_time"] >= now:
+                return self.classes[candidate]
+        return None
+
+    def next_boundary(self, now: time_of_day) -> Optional[time_of_day]:
+        # The time at (or, for an end_time, just after) which current() next
+        # changes, if any
+        index = bisect.bisect_left(self.boundaries, (now, True))
+        if index < len(self.boundaries) and self.boundaries[index] == (now, True):
+            return now
+        index = bisect.bisect_right(self.boundaries, (now, True))
+        return self.boundaries[index][0] if index < len(self.boundaries) else None
+
+
+_lock = threading.Lock()
+_days: dict[str, DayTimetable] = {}
+_profiles: dict[str, tuple[float, int]] = {}
+_version = 0
+_stats = {"hits": 0, "loads": 0}
+_listeners: list[Callable[[tuple], None]] = []
+
+
+def on_invalidate(callback: Callable[[tuple], None]):
+    # Called with the invalidated keys (empty for everything), from whichever
+    # thread invalidated them
+    _listeners.append(callback)
+
+
+def _fresh(loaded_at: float) -> bool:
+    return time.monotonic() - loaded_at < ENTRY_TTL_SECONDS
+
+
+def version() -> int:
+    # Read before loading and pass to put_*: a load that raced with an
+    # invalidation is served once but not kept
+    with _lock:
+        return _version
+
+
+def get_day(key: str) -> Optional[DayTimetable]:
+    with _lock:
+        entry = _days.get(key)
+        if entry is not None and _fresh(entry.loaded_at):
+            _stats["hits"] += 1
+            return entry
+        return None
+
+
+def put_day(key: str, classes: list[dict], loaded_version: int) -> DayTimetable:
+    entry = DayTimetable(classes)
+    with _lock:
+        _stats["loads"] += 1
+        if loaded_version == _version:
+            if len(_days) >= MAX_ENTRIES:
+                _days.clear()
+            _days[key] = entry
+    return entry
+
+
+def get_profile(key: str) -> Optional[int]:
+    with _lock:
+        entry = _profiles.get(key)
+        if entry is not None and _fresh(entry[0]):
+            return entry[1]
+        return None
+
+
+def put_profile(key: str, owner_id: int, loaded_version: int):
+    with _lock:
+        if loaded_version == _version:
+            if len(_profiles) >= MAX_ENTRIES:
+                _profiles.clear()
+            _profiles[key] = (time.monotonic(), owner_id)
+
+
+def invalidate(*keys: Optional[str]):
+    # No keys (or a None key) drops everything
+    global _version
+    if None in keys:
+        keys = ()
+    with _lock:
+        _version += 1
+        if not keys:
+            _days.clear()
+            _profiles.clear()
+        for key in keys:
+            _days.pop(key, None)
+            _profiles.pop(key, None)
+    for callback in _listeners:
+        callback(keys)
+
+
+def _on_notification(key: Optional[str]):
+    invalidate(key)
+
+
+notify.subscribe(TOPIC, _on_notification)
+# School, grade, section and subject names are part of every entry
+notify.subscribe(refcache.TOPIC, lambda key: invalidate())
+
+
+def _published(keys: tuple) -> tuple:
+    # No keys invalidates every entry; so do bulk writes, rather than one notification per key
+    if not keys or len(keys) > MAX_PUBLISHED_KEYS:
+        return (None,)
+    return keys
+
+
+def publish_invalidation(db: Session, *keys: str):
+    # Call before commit, then invalidate() the same keys locally after it
+    for key in _published(keys):
+        notify.publish(db, TOPIC, key)
+
+
+async def async_publish_invalidation(db: AsyncSession, *keys: str):
+    for key in _published(keys):
+        await notify.async_publish(db, TOPIC, key)
+
+
+def class_keys(division_id: int, teacher_id: int, day: date) -> tuple[str, str]:
+    return day_key("division", division_id, day), day_key("teacher", teacher_id, day)
+
+
+def stats() -> dict:
+    with _lock:
+        return {"days": len(_days), "profiles": len(_profiles), **_stats}
@@ -0,0 +1,64 @@
+import hashlib
+from typing import Optional
+from fastapi import Request, Response
+from sqlalchemy import func, DateTime, Select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# Conditional GETs for list and detail endpoints. The tag is derived from a
+# single aggregate over the endpoint's filtered query instead of its rows:
+# count(*) catches inserts and deletes, and max()/sum() of each watermark
+# column catch updates. The sum matters because updated_at is now() at
+# transaction start, so a late-committing update can land below the max.
+
+
+def _aggregates(columns) -> list:
+    aggregates = [func.count()]
+    for column in columns:
+        if isinstance(column.type, DateTime):
+            aggregates.append(func.max(column))
+            aggregates.append(func.sum(func.extract("epoch", column)))
+        else:
+            aggregates.append(func.sum(column))
+    return aggregates
+
+
+def _make_tag(data: bytes) -> str:
+    return f'W/"{hashlib.sha1(data).hexdigest()[:32]}"'
+
+
+def scope_etag(query, *columns) -> str:
+    # `query` is the endpoint's filtered ORM query, before ordering and paging
+    return _make_tag(repr(tuple(query.order_by(None).with_entities(*_aggregates(columns)).one())).encode())
+
+
+async def async_scope_etag(db: AsyncSession, stmt: Select, *columns) -> str:
+    row = (await db.execute(stmt.order_by(None).with_only_columns(*_aggregates(columns)))).one()
+    return _make_tag(repr(tuple(row)).encode())
+
+
+def content_etag(body: bytes) -> str:
+    return _make_tag(body)
+
+
+def etag_matches(request: Request, tag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # Weak comparison (RFC 9110 8.8.3.2): ignore the W/ prefix on both sides
+    wanted = tag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == wanted for candidate in header.split(","))
+
+
+def not_modified(request: Request, response: Response, tag: str) -> Optional[Response]:
+    # Returns the 304 to send when the client's copy is current; otherwise
+    # stamps the tag on the response the endpoint is about to build
+    if etag_matches(request, tag):
+        return Response(status_code=304, headers={"ETag": tag})
+    response.headers["ETag"] = tag
+    return None
+
+
+def combine_etags(*tags: str) -> str:
+    return _make_tag("|".join(tags).encode())
@@ -0,0 +1,68 @@
+import csv
+import io
+from typing import Callable, Iterator, Literal
+import orjson
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+from app.database import SessionLocal
+
+ExportFormat = Literal["ndjson", "csv"]
+
+# Rows fetched per round trip from the server-side cursor
+EXPORT_BATCH_SIZE = 1000
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+
+def _iter_records(build_query: Callable[[Session], object], to_record: Callable) -> Iterator[dict]:
+    # The request's get_db session is closed before the body is sent, so the
+    # export opens its own and keeps it for the lifetime of the stream
+    db = SessionLocal()
+    try:
+        query = build_query(db).execution_options(yield_per=EXPORT_BATCH_SIZE)
+        for row in query:
+            yield to_record(row)
+    finally:
+        db.close()
+
+
+def _ndjson_lines(records: Iterator[dict]) -> Iterator[bytes]:
+    for record in records:
+        yield orjson.dumps(record) + b"\n"
+
+
+def _csv_lines(records: Iterator[dict], fields: list[str]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fields, extrasaction="ignore")
+    writer.writeheader()
+    # Send the header right away, then one chunk per fetched batch
+    yield buffer.getvalue().encode()
+    buffer.seek(0)
+    buffer.truncate()
+    for count, record in enumerate(records, 1):
+        writer.writerow(record)
+        if count % EXPORT_BATCH_SIZE == 0:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def stream_export(
+    fmt: ExportFormat,
+    build_query: Callable[[Session], object],
+    to_record: Callable,
+    fields: list[str],
+    filename: str
+) -> StreamingResponse:
+    records = _iter_records(build_query, to_record)
+    body = _ndjson_lines(records) if fmt == "ndjson" else _csv_lines(records, fields)
+    return StreamingResponse(
+        body,
+        media_type=MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{fmt}"'}
+    )
@@ -0,0 +1,170 @@
+import time
+from typing import NamedTuple
+import numpy as np
+from sqlalchemy import Integer, Float, JSON, select, update, func, cast, literal, column
+from sqlalchemy.dialects.postgresql import JSONB
+from app import models, jobs
+from app.database import SessionLocal
+
+# Auto-grading of objective questions. The answer key of a published quiz
+# and the cohort's responses are encoded as boolean arrays over
+# (student, question, option), and every submission is scored in one
+# vectorized pass. A response picks options by key ("B"), by key list
+# (["A", "C"]) or as a dict keyed by option; choice texts are accepted too.
+# With partial credit a question scores (right picks - wrong picks) / number
+# of correct options, floored at 0, so a single-answer question is all or
+# nothing and guessing every option of a multi-select earns nothing; without
+# it only the exact set of correct options scores. Every question is worth 1.
+
+WRITE_BATCH = 1000
+
+
+class AnswerKey(NamedTuple):
+    question_ids: list[str]  # the gradable questions, in quiz order
+    options: list[dict[str, int]]  # per question: option key or text -> column
+    correct: np.ndarray  # bool, questions x options
+    ungraded: list[str]  # open-ended questions, or ones without a usable key
+
+
+def _chosen(value) -> list:
+    if value is None:
+        return []
+    if isinstance(value, dict):
+        return list(value)
+    if isinstance(value, (list, tuple)):
+        return list(value)
+    return [value]
+
+
+def answer_key(quiz_detail: dict) -> AnswerKey:
+    question_ids, options, keys, ungraded = [], [], [], []
+    for question in quiz_detail.get("questions", []):
+        question_id = str(question["id"])
+        choices = question.get("choice_body") or {}
+        if not question.get("is_objective", True) or not isinstance(choices, dict) or not choices:
+            ungraded.append(question_id)
+            continue
+        lookup = {str(text): column for column, text in enumerate(choices.values())}
+        lookup.update({str(key): column for column, key in enumerate(choices)})
+        answer = question.get("answer")
+        # The key names the correct options, either as its keys or (e.g. {"answer": "B"}) its values
+        correct = {lookup[str(choice)] for choice in _chosen(answer) if str(choice) in lookup}
+        if not correct and isinstance(answer, dict):
+            correct = {lookup[str(choice)] for choice in answer.values() if str(choice) in lookup}
+        if not correct:
+            ungraded.append(question_id)
+            continue
+        question_ids.append(question_id)
+        options.append(lookup)
+        keys.append(correct)
+
+    width = max((max(lookup.values()) + 1 for lookup in options), default=0)
+    matrix = np.zeros((len(question_ids), width), dtype=bool)
+    for row, correct in enumerate(keys):
+        matrix[row, list(correct)] = True
+    return AnswerKey(question_ids, options, matrix, ungraded)
+
+
+def encode(key: AnswerKey, responses: list[dict]) -> tuple[np.ndarray, np.ndarray]:
+    # The options each student picked (bool, students x questions x options)
+    # and how many picks named no option of the question (students x questions)
+    position = {question_id: row for row, question_id in enumerate(key.question_ids)}
+    students, questions, columns = [], [], []
+    unknown = np.zeros((len(responses), len(key.question_ids)), dtype=np.int16)
+    for student, response in enumerate(responses):
+        if not isinstance(response, dict):
+            continue
+        for question_id, value in response.items():
+            row = position.get(question_id)
+            if row is None:
+                continue
+            lookup = key.options[row]
+            for choice in _chosen(value):
+                column_index = lookup.get(str(choice))
+                if column_index is None:
+                    unknown[student, row] += 1
+                else:
+                    students.append(student)
+                    questions.append(row)
+                    columns.append(column_index)
+    selected = np.zeros((len(responses),) + key.correct.shape, dtype=bool)
+    selected[students, questions, columns] = True
+    return selected, unknown
+
+
+def score(key: AnswerKey, selected: np.ndarray, unknown: np.ndarray, partial_credit: bool = True) -> np.ndarray:
+    # Credit per student and question, between 0 and 1
+    correct = key.correct[np.newaxis]
+    right = (selected & correct).sum(axis=2)
+    wrong = (selected & ~correct).sum(axis=2) + unknown
+    needed = key.correct.sum(axis=1)
+    if partial_credit:
+        return np.clip((right - wrong) / needed, 0, 1)
+    return ((right == needed) & (wrong == 0)).astype(np.float64)
+
+
+def _score_statement(batch: list[dict]):
+    scores = func.jsonb_to_recordset(literal(batch, JSONB)).table_valued(
+        column("id", Integer), column("score", Float), column("max_score", Float), column("question_scores", JSONB)
+    ).render_derived(name="scores", with_types=True)
+    table = models.StudentQuizResponseRel
+    return update(table).where(table.id == scores.c.id).values(
+        score=scores.c.score,
+        max_score=scores.c.max_score,
+        question_scores=cast(scores.c.question_scores, JSON),
+        graded_at=func.now(),
+        status="graded"
+    )
+
+
+def grade_published_quiz(job, published_quiz_id: int, partial_credit: bool = True, regrade: bool = False) -> dict:
+    # Job body for POST /api/grade_quiz: scores the submitted (and, unless
+    # regrade is set, not yet graded) responses and writes the scores in bulk
+    started = time.monotonic()
+    table = models.StudentQuizResponseRel
+    with SessionLocal() as db:
+        published = db.get(models.PublishedQuiz, published_quiz_id)
+        if published is None:
+            raise jobs.JobError("Published quiz not found")
+        quiz_detail = published.quiz_detail
+        if published.snapshot_id is not None:
+            quiz_detail = db.get(models.QuizSnapshot, published.snapshot_id).quiz_detail
+        key = answer_key(quiz_detail or {})
+
+        query = select(table.id, table.response).where(table.quiz_rel_id == published_quiz_id, table.is_submitted == True)
+        if not regrade:
+            query = query.where(table.graded_at.is_(None))
+        rows = db.execute(query.order_by(table.id)).all()
+        job.report(20, f"scoring {len(rows)} submissions")
+
+        scoring_started = time.monotonic()
+        selected, unknown = encode(key, [response for _, response in rows])
+        credits = score(key, selected, unknown, partial_credit)
+        totals = credits.sum(axis=1)
+        scoring_ms = round((time.monotonic() - scoring_started) * 1000)
+
+        job.report(60, "writing scores")
+        max_score = float(len(key.question_ids))
+        rounded = np.round(credits, 4).tolist()
+        for start in range(0, len(rows), WRITE_BATCH):
+            db.execute(_score_statement([
+                {
+                    "id": rows[index].id,
+                    "score": round(float(totals[index]), 4),
+                    "max_score": max_score,
+                    "question_scores": dict(zip(key.question_ids, rounded[index])),
+                }
+                for index in range(start, min(start + WRITE_BATCH, len(rows)))
+            ]))
+        db.commit()
+
+    return {
+        "published_quiz_id": published_quiz_id,
+        "graded": len(rows),
+        "questions": len(key.question_ids),
+        "ungraded_questions": key.ungraded,
+        "max_score": max_score,
+        "mean_score": round(float(totals.mean()), 4) if len(rows) else None,
+        "scoring_ms": scoring_ms,
+        "elapsed_ms": round((time.monotonic() - started) * 1000),
+    }
@@ -0,0 +1,254 @@
+import logging
+import os
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from typing import Any, Callable, Optional
+from sqlalchemy import select, update, delete, func, or_, and_
+from sqlalchemy.orm import Session
+from app import models, notify
+from app.database import SessionLocal
+
+# Background jobs for work too long for a request (timetable generation,
+# bulk imports). Jobs are rows of the jobs table, so they outlive the worker
+# that accepted them and any worker can report on them. Every worker runs a
+# Runner that claims queued jobs with SELECT ... FOR UPDATE SKIP LOCKED, so
+# several workers share the queue without taking the same job twice. A
+# running job's heartbeat is refreshed while it runs; a job whose worker died
+# is claimed again once its lease runs out. Failed attempts are retried with
+# exponential backoff up to max_attempts, except for JobError, which means
+# retrying cannot help.
+
+TOPIC = "jobs"
+MAX_WORKERS = 2
+POLL_SECONDS = 5.0
+LEASE_SECONDS = 60
+RETRY_BASE_SECONDS = 10
+RETRY_MAX_SECONDS = 600
+PROGRESS_WRITE_SECONDS = 1.0
+KEEP_FINISHED_DAYS = 7
+
+logger = logging.getLogger("uvicorn.error")
+
+
+class JobError(Exception):
+    # A failure that retrying cannot fix, e.g. invalid input; the message is the job's error
+    pass
+
+
+class JobContext:
+    # What a handler sees of its job
+    def __init__(self, runner: "Runner", job_id: int, attempt: int):
+        self.id = job_id
+        self.attempt = attempt
+        self._runner = runner
+        self._last_write = 0.0
+
+    def report(self, progress: int, message: Optional[str] = None):
+        # Progress writes are throttled; the final state is always written on completion
+        now = time.monotonic()
+        if now - self._last_write < PROGRESS_WRITE_SECONDS:
+            return
+        self._last_write = now
+        self._runner._update(self.id, progress=progress, message=message, heartbeat_at=func.now())
+
+
+Handler = Callable[[JobContext, dict], Optional[dict]]
+
+_handlers: dict[str, Handler] = {}
+
+
+def handler(kind: str):
+    # Registers the function that runs jobs of this kind: fn(job, payload)
+    # returns the job's result (JSON-serializable) and can call
+    # job.report(progress, message) along the way. Every worker must register
+    # the same kinds, i.e. at import time.
+    def register(fn: Handler) -> Handler:
+        _handlers[kind] = fn
+        return fn
+    return register
+
+
+def submit(db: Session, kind: str, user_id: Optional[int], payload: dict, max_attempts: int = 3) -> models.Job:
+    # Queues a job in the caller's transaction; it becomes visible to the
+    # runners (and they are woken up) when the caller commits
+    if kind not in _handlers:
+        raise ValueError(f"No job handler for {kind!r}")
+    job = models.Job(kind=kind, user_id=user_id, payload=payload, max_attempts=max_attempts)
+    db.add(job)
+    db.flush()
+    notify.publish(db, TOPIC, kind)
+    return job
+
+
+def retry_delay(attempt: int) -> float:
+    return min(RETRY_BASE_SECONDS * 2 ** (attempt - 1), RETRY_MAX_SECONDS)
+
+
+class Runner:
+    def __init__(self, workers: int = MAX_WORKERS, poll_interval: float = POLL_SECONDS, lease_seconds: int = LEASE_SECONDS):
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._lock = threading.Lock()
+        self._running: set[int] = set()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._last_prune = 0.0
+        self.stats = {"claimed": 0, "succeeded": 0, "retried": 0, "failed": 0}
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="jobs")
+        self._thread = threading.Thread(target=self._run, name="jobs-runner", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        # Jobs still running are not waited for; their lease runs out and
+        # another worker (or this one, restarted) picks them up again
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout=self.poll_interval + 1)
+        if self._executor:
+            self._executor.shutdown(wait=False)
+
+    def wake(self):
+        self._wake.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.clear()
+            try:
+                self._heartbeat()
+                while not self._stop.is_set() and self._free_slots():
+                    job = self._claim()
+                    if job is None:
+                        break
+                    with self._lock:
+                        self._running.add(job.id)
+                    self._executor.submit(self._execute, job)
+                self._prune()
+            except Exception as e:
+                logger.warning("job runner could not reach the database: %s", e)
+            self._wake.wait(self.poll_interval)
+
+    def _free_slots(self) -> int:
+        with self._lock:
+            return self.workers - len(self._running)
+
+    def _claim(self):
+        # The oldest due job, or a running one whose worker stopped heartbeating
+        lease_expired = func.now() - timedelta(seconds=self.lease_seconds)
+        candidate = select(models.Job.id).where(or_(
+            and_(models.Job.status == "queued", models.Job.run_after <= func.now()),
+            and_(models.Job.status == "running", models.Job.heartbeat_at < lease_expired),
+        )).order_by(models.Job.run_after, models.Job.id).limit(1).with_for_update(skip_locked=True).scalar_subquery()
+        with SessionLocal() as db:
+            job = db.execute(
+                update(models.Job).where(models.Job.id == candidate).values(
+                    status="running",
+                    attempts=models.Job.attempts + 1,
+                    locked_by=self.worker_id,
+                    started_at=func.now(),
+                    heartbeat_at=func.now(),
+                ).returning(models.Job.id, models.Job.kind, models.Job.payload, models.Job.attempts, models.Job.max_attempts)
+            ).first()
+            db.commit()
+        if job is not None:
+            self.stats["claimed"] += 1
+        return job
+
+    def _heartbeat(self):
+        with self._lock:
+            running = list(self._running)
+        if not running:
+            return
+        with SessionLocal() as db:
+            db.execute(
+                update(models.Job)
+                .where(models.Job.id.in_(running), models.Job.locked_by == self.worker_id)
+                .values(heartbeat_at=func.now())
+            )
+            db.commit()
+
+    def _prune(self):
+        if time.monotonic() - self._last_prune < 3600:
+            return
+        self._last_prune = time.monotonic()
+        with SessionLocal() as db:
+            db.execute(delete(models.Job).where(
+                models.Job.finished_at < func.now() - timedelta(days=KEEP_FINISHED_DAYS)
+            ))
+            db.commit()
+
+    def _update(self, job_id: int, **values: Any) -> bool:
+        # Only while this worker holds the job: after a lost lease another
+        # worker owns the row
+        with SessionLocal() as db:
+            updated = db.execute(
+                update(models.Job)
+                .where(models.Job.id == job_id, models.Job.locked_by == self.worker_id, models.Job.status == "running")
+                .values(**values)
+            ).rowcount
+            db.commit()
+        return bool(updated)
+
+    def _finish(self, job_id: int, status: str, **values: Any):
+        self._update(job_id, status=status, finished_at=func.now(), locked_by=None, **values)
+        self.stats[status] += 1
+
+    def _execute(self, job):
+        try:
+            fn = _handlers.get(job.kind)
+            if fn is None:
+                self._finish(job.id, "failed", error=f"No job handler for {job.kind!r}")
+                return
+            if job.attempts > job.max_attempts:
+                # Claimed again after its worker died on the last attempt
+                self._finish(job.id, "failed", error="The worker running the job stopped")
+                return
+            try:
+                result = fn(JobContext(self, job.id, job.attempts), job.payload or {})
+            except JobError as e:
+                self._finish(job.id, "failed", error=str(e))
+            except Exception as e:
+                logger.exception("job %s (%s) attempt %s failed", job.id, job.kind, job.attempts)
+                if job.attempts < job.max_attempts:
+                    self._update(
+                        job.id, status="queued", locked_by=None, error=str(e),
+                        run_after=func.now() + timedelta(seconds=retry_delay(job.attempts))
+                    )
+                    self.stats["retried"] += 1
+                else:
+                    self._finish(job.id, "failed", error=str(e))
+            else:
+                self._finish(job.id, "succeeded", progress=100, result=result, error=None)
+        except Exception:
+            logger.exception("recording the outcome of job %s failed", job.id)
+        finally:
+            with self._lock:
+                self._running.discard(job.id)
+            self.wake()
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            running = len(self._running)
+        return {"worker": self.worker_id, "running": running, **self.stats}
+
+
+runner = Runner()
+
+# A queued job wakes every worker's runner; one of them gets it
+notify.subscribe(TOPIC, lambda key: runner.wake())
+
+
+def get(db: Session, job_id: int) -> Optional[models.Job]:
+    return db.get(models.Job, job_id)
@@ -0,0 +1,143 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Optional
+import orjson
+from app import daytable
+from app.database import AsyncSessionLocal
+
+# Server-sent current-class updates. Subscribers of one division (students)
+# or one teacher share a channel; each channel has a single task that reads
+# the day timetable (app.daytable), sleeps until the next period boundary or
+# until the channel's day timetable is invalidated, and broadcasts the new
+# current class once to all of the channel's subscribers.
+
+logger = logging.getLogger("uvicorn.error")
+
+KEEPALIVE_SECONDS = 25
+MAX_SLEEP_SECONDS = 300
+RETRY_SECONDS = 5
+QUEUE_SIZE = 4
+
+Loader = Callable[..., Awaitable[daytable.DayTimetable]]
+
+
+def _message(current: Optional[dict]) -> bytes:
+    return b"event: current_class\ndata: " + orjson.dumps(current) + b"\n\n"
+
+
+class Broadcaster:
+    def __init__(self, loader: Loader):
+        # loader(db, kind, owner_id, day) returns the day timetable of a
+        # division or teacher, e.g. from the day timetable cache
+        self._loader = loader
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._subscribers: dict[tuple[str, int], set[asyncio.Queue]] = {}
+        self._wakeups: dict[tuple[str, int], asyncio.Event] = {}
+        self._tasks: dict[tuple[str, int], asyncio.Task] = {}
+        self._last: dict[tuple[str, int], bytes] = {}
+        self.broadcasts = 0
+        daytable.on_invalidate(self._on_invalidate)
+
+    def _on_invalidate(self, keys: tuple):
+        if self._loop is None or self._loop.is_closed():
+            return
+        self._loop.call_soon_threadsafe(self._wake, keys)
+
+    def _wake(self, keys: tuple):
+        if not keys:
+            channels = list(self._wakeups)
+        else:
+            channels = []
+            for key in keys:
+                kind, owner_id, *rest = key.split(":")
+                if rest and (kind, int(owner_id)) in self._wakeups:
+                    channels.append((kind, int(owner_id)))
+        for channel in channels:
+            self._wakeups[channel].set()
+
+    def join(self, kind: str, owner_id: int) -> asyncio.Queue:
+        self._loop = asyncio.get_running_loop()
+        channel = (kind, owner_id)
+        queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        self._subscribers.setdefault(channel, set()).add(queue)
+        if channel in self._last:
+            queue.put_nowait(self._last[channel])
+        if channel not in self._tasks:
+            self._wakeups[channel] = asyncio.Event()
+            self._tasks[channel] = asyncio.create_task(self._drive(channel))
+        return queue
+
+    def leave(self, kind: str, owner_id: int, queue: asyncio.Queue):
+        channel = (kind, owner_id)
+        subscribers = self._subscribers.get(channel)
+        if subscribers is None:
+            return
+        subscribers.discard(queue)
+        if not subscribers:
+            del self._subscribers[channel]
+            self._last.pop(channel, None)
+            self._wakeups.pop(channel, None)
+            task = self._tasks.pop(channel, None)
+            if task is not None:
+                task.cancel()
+
+    def _broadcast(self, channel: tuple[str, int], message: bytes):
+        self._last[channel] = message
+        self.broadcasts += 1
+        for queue in self._subscribers.get(channel, ()):
+            if queue.full():
+                # A slow client only needs the latest state
+                queue.get_nowait()
+            queue.put_nowait(message)
+
+    async def _drive(self, channel: tuple[str, int]):
+        kind, owner_id = channel
+        wakeup = self._wakeups[channel]
+        while channel in self._subscribers:
+            wakeup.clear()
+            now = datetime.now()
+            try:
+                async with AsyncSessionLocal() as db:
+                    timetable = await self._loader(db, kind, owner_id, now.date())
+            except Exception:
+                logger.exception("loading the day timetable of %s %s failed", kind, owner_id)
+                await asyncio.sleep(RETRY_SECONDS)
+                continue
+
+            message = _message(timetable.current(now.time()))
+            if message != self._last.get(channel):
+                self._broadcast(channel, message)
+
+            # Sleep until the current class can change: the next period
+            # boundary, midnight, or an invalidation of this day timetable
+            boundary = timetable.next_boundary(now.time())
+            if boundary is not None:
+                wake_at = datetime.combine(now.date(), boundary)
+            else:
+                wake_at = datetime.combine(now.date() + timedelta(days=1), datetime.min.time())
+            # A little past the boundary, so that a class that ends at it is over
+            delay = min(max((wake_at - datetime.now()).total_seconds(), 0) + 0.05, MAX_SLEEP_SECONDS)
+            try:
+                await asyncio.wait_for(wakeup.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+
+    async def stream(self, kind: str, owner_id: int):
+        # The SSE body for one subscriber
+        queue = self.join(kind, owner_id)
+        try:
+            while True:
+                try:
+                    yield await asyncio.wait_for(queue.get(), KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield b": keepalive\n\n"
+        finally:
+            self.leave(kind, owner_id, queue)
+
+    def stats(self) -> dict:
+        return {
+            "channels": len(self._subscribers),
+            "subscribers": sum(len(queues) for queues in self._subscribers.values()),
+            "broadcasts": self.broadcasts,
+        }
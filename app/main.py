@@ -1,16 +1,88 @@
+import time
+_import_started = time.perf_counter()
+
+import asyncio
+import logging
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from app.database import Base, engine
-from app.routers import users,auth,teacher,school,roles,student,divison,subjects,grade,section,board,subject_topic,class_schedule,quiz
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import text
+from app.config import settings
+from app.database import Base, engine, async_engine
+from app.notify import listener
+from app.jobs import runner
+from app.autosave import buffer as autosave_buffer
+from app.routers import users,auth,teacher,school,roles,student,divison,subjects,grade,section,board,subject_topic,class_schedule,timetable_template,quiz,student_quiz,jobs,internal
+
+# uvicorn only configures its own loggers, so report startup through them
+logger = logging.getLogger("uvicorn.error")
+
+startup_timings = {}
+
+
+def _log_phase(phase: str, started: float):
+    startup_timings[phase] = time.perf_counter() - started
+    logger.info("startup phase %s took %.1f ms", phase, startup_timings[phase] * 1000)
+
+
+_log_phase("imports", _import_started)
+
+
+def _warm_up_sync_pool(size: int):
+    connections = [engine.connect() for _ in range(size)]
+    for connection in connections:
+        connection.execute(text("SELECT 1"))
+        connection.close()
+
 
-# Create all tables with error handling
-try:
-    Base.metadata.create_all(bind=engine)
-    print("Connected to the database and ensured all tables are created.")
-except Exception as e:
-    print("Error creating tables:", e)
+async def _warm_up_async_pool(size: int):
+    async def touch():
+        async with async_engine.connect() as connection:
+            await connection.execute(text("SELECT 1"))
+    await asyncio.gather(*(touch() for _ in range(size)))
 
-app = FastAPI()
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # The schema is owned by Alembic (`alembic upgrade head`); workers do no DDL
+    # or reflection at boot unless DB_CREATE_ALL is set for local development
+    if settings.db_create_all:
+        started = time.perf_counter()
+        try:
+            await run_in_threadpool(Base.metadata.create_all, bind=engine)
+        except Exception as e:
+            logger.error("Error creating tables: %s", e)
+        _log_phase("create_all", started)
+
+    if settings.db_pool_warmup > 0:
+        started = time.perf_counter()
+        try:
+            await run_in_threadpool(_warm_up_sync_pool, settings.db_pool_warmup)
+            await _warm_up_async_pool(settings.db_pool_warmup)
+        except Exception as e:
+            logger.warning("Connection pool warm-up failed: %s", e)
+        _log_phase("pool_warmup", started)
+
+    # Cross-worker cache invalidation; connects in the background and retries on its own
+    listener.start()
+    # Background jobs queued by any worker, see app.jobs
+    runner.start()
+    # Quiz autosaves are buffered and written in batches
+    autosave_buffer.start()
+
+    logger.info("startup finished in %.1f ms", sum(startup_timings.values()) * 1000)
+    yield
+
+    await autosave_buffer.stop()
+    await run_in_threadpool(runner.stop)
+    await run_in_threadpool(listener.stop)
+    await async_engine.dispose()
+    engine.dispose()
+
+
+app = FastAPI(lifespan=lifespan)
+
+_routers_started = time.perf_counter()
 app.include_router(users.router)
 app.include_router(auth.router)
 app.include_router(teacher.router)
@@ -24,10 +96,13 @@ app.include_router(section.router)
 app.include_router(board.router)
 app.include_router(subject_topic.router)
 app.include_router(class_schedule.router)
+app.include_router(timetable_template.router)
 app.include_router(quiz.router)
+app.include_router(student_quiz.router)
+app.include_router(jobs.router)
+app.include_router(internal.router)
+_log_phase("router_registration", _routers_started)
 
 @app.get("/")
 def read_root():
     return {"message": "Hello World"}
-
-
@@ -1,5 +1,7 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, TIMESTAMP, text,Text,Date,Boolean,UniqueConstraint,Time,DateTime,JSON,Computed,Enum as SQLEnum
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, TIMESTAMP, text,Text,Date,Boolean,UniqueConstraint,CheckConstraint,Index,Time,DateTime,JSON,Computed,Enum as SQLEnum
 from .database import Base
+from sqlalchemy import event, DDL
+from sqlalchemy.dialects.postgresql import ExcludeConstraint
 import enum
 
 class User(Base):
@@ -20,7 +22,7 @@ class UserRole(Base):
 class UserRoleRel(Base):
     __tablename__ = 'user_roles_rel'
     id = Column(Integer, primary_key=True)
-    user_id = Column(Integer, ForeignKey('users.id', ondelete="CASCADE"), nullable=False)
+    user_id = Column(Integer, ForeignKey('users.id', ondelete="CASCADE"), nullable=False, index=True)
     role_id = Column(Integer, ForeignKey('user_roles.id', ondelete="CASCADE"), nullable=False)
     assigned_at = Column(TIMESTAMP(timezone=True), nullable=False, server_default=text('now()'))
 
@@ -79,7 +81,7 @@ class Student(Base):
     email = Column(String(100), nullable=False, unique=True)  # Added unique constraint
     created_at =  Column(TIMESTAMP(timezone=True), nullable= False, server_default=text('now()'))
     updated_at =  Column(TIMESTAMP(timezone=True), server_default=text('now()'), onupdate=text('now()'))
-    user_id = Column(Integer, ForeignKey('users.id', ondelete="CASCADE"), nullable=False)
+    user_id = Column(Integer, ForeignKey('users.id', ondelete="CASCADE"), nullable=False, index=True)
     school_id = Column(Integer, ForeignKey('schools.id', ondelete="CASCADE"), nullable=False)
 
 
@@ -94,6 +96,9 @@ class StudentDivision(Base):
     
     __table_args__ = (
         UniqueConstraint('student_id', 'division_id', name='unique_student_division'),
+        # Only the current division is looked up on hot paths
+        Index('ix_student_divisions_student_id_current', 'student_id', postgresql_where=text('is_current')),
+        Index('ix_student_divisions_division_id_current', 'division_id', postgresql_where=text('is_current')),
     )
 
 class StudentSubjectRel(Base):
@@ -138,7 +143,7 @@ class Teacher(Base):
     email = Column(String(100), nullable=False, unique=True)  # Added unique constraint
     created_at =  Column(TIMESTAMP(timezone=True), nullable= False, server_default=text('now()'))
     updated_at =  Column(TIMESTAMP(timezone=True), server_default=text('now()'), onupdate=text('now()'))
-    user_id = Column(Integer, ForeignKey('users.id', ondelete="CASCADE"), nullable=False)
+    user_id = Column(Integer, ForeignKey('users.id', ondelete="CASCADE"), nullable=False, index=True)
     school_id = Column(Integer, ForeignKey('schools.id', ondelete="CASCADE"), nullable=False)
 
 class TeacherDivision(Base):
@@ -202,6 +207,86 @@ class ClassSchedule(Base):
     end_time = Column(Time, nullable=False)
     created_at = Column(TIMESTAMP(timezone=True), nullable=False, server_default=text('now()'))
     updated_at = Column(TIMESTAMP(timezone=True), server_default=text('now()'), onupdate=text('now()'))
+    # Set when the row was materialized from a weekly template
+    template_id = Column(Integer, ForeignKey('timetable_templates.id', ondelete="SET NULL"), nullable=True)
+
+    __table_args__ = (
+        UniqueConstraint('template_id', 'date', name='uq_class_schedules_template_date'),
+        Index('ix_class_schedules_teacher_id_date_start_time', 'teacher_id', 'date', 'start_time'),
+        Index('ix_class_schedules_division_id_date_start_time', 'division_id', 'date', 'start_time'),
+        CheckConstraint('end_time > start_time', name='ck_class_schedules_time_order'),
+        # No teacher or division in two classes at once; back-to-back classes are fine ('[)' ranges)
+        ExcludeConstraint(
+            ('teacher_id', '='),
+            (text("tsrange(date + start_time, date + end_time, '[)')"), '&&'),
+            name='excl_class_schedules_teacher_overlap', using='gist'
+        ),
+        ExcludeConstraint(
+            ('division_id', '='),
+            (text("tsrange(date + start_time, date + end_time, '[)')"), '&&'),
+            name='excl_class_schedules_division_overlap', using='gist'
+        ),
+    )
+
+# Weekly timetable: one template row per division, weekday and period. Dates
+# are expanded on the fly and only materialized into class_schedules on demand
+
+class TimetableTemplate(Base):
+    __tablename__ = 'timetable_templates'
+    id = Column(Integer, primary_key=True)
+    weekday = Column(Integer, nullable=False)  # 0 = Monday, as date.weekday()
+    period = Column(Integer, nullable=False)
+    start_time = Column(Time, nullable=False)
+    end_time = Column(Time, nullable=False)
+    valid_from = Column(Date, nullable=False)
+    valid_until = Column(Date, nullable=True)  # open-ended when null
+    division_id = Column(Integer, ForeignKey('divisions.id', ondelete="CASCADE"), nullable=False)
+    subject_id = Column(Integer, ForeignKey('subjects.id', ondelete="CASCADE"), nullable=False)
+    teacher_id = Column(Integer, ForeignKey('teachers.id', ondelete="CASCADE"), nullable=False)
+    created_at = Column(TIMESTAMP(timezone=True), nullable=False, server_default=text('now()'))
+    updated_at = Column(TIMESTAMP(timezone=True), server_default=text('now()'), onupdate=text('now()'))
+
+    __table_args__ = (
+        UniqueConstraint('division_id', 'weekday', 'period', 'valid_from', name='uq_timetable_template_slot'),
+        CheckConstraint('weekday BETWEEN 0 AND 6', name='ck_timetable_templates_weekday'),
+        CheckConstraint('end_time > start_time', name='ck_timetable_templates_time_order'),
+        Index('ix_timetable_templates_teacher_id_weekday', 'teacher_id', 'weekday'),
+    )
+
+class Holiday(Base):
+    __tablename__ = 'holidays'
+    id = Column(Integer, primary_key=True)
+    date = Column(Date, nullable=False)
+    name = Column(String(100), nullable=False)
+    school_id = Column(Integer, ForeignKey('schools.id', ondelete="CASCADE"), nullable=False)
+    created_at = Column(TIMESTAMP(timezone=True), nullable=False, server_default=text('now()'))
+    updated_at = Column(TIMESTAMP(timezone=True), server_default=text('now()'), onupdate=text('now()'))
+
+    __table_args__ = (
+        UniqueConstraint('school_id', 'date', name='uq_holiday_school_date'),
+    )
+
+class ScheduleOverride(Base):
+    # Changes one date of a template: cancel it, or swap teacher, subject or times
+    __tablename__ = 'schedule_overrides'
+    id = Column(Integer, primary_key=True)
+    date = Column(Date, nullable=False)
+    cancelled = Column(Boolean, nullable=False, server_default=text('false'))
+    subject_id = Column(Integer, ForeignKey('subjects.id', ondelete="CASCADE"), nullable=True)
+    teacher_id = Column(Integer, ForeignKey('teachers.id', ondelete="CASCADE"), nullable=True)
+    start_time = Column(Time, nullable=True)
+    end_time = Column(Time, nullable=True)
+    template_id = Column(Integer, ForeignKey('timetable_templates.id', ondelete="CASCADE"), nullable=False)
+    created_at = Column(TIMESTAMP(timezone=True), nullable=False, server_default=text('now()'))
+    updated_at = Column(TIMESTAMP(timezone=True), server_default=text('now()'), onupdate=text('now()'))
+
+    __table_args__ = (
+        UniqueConstraint('template_id', 'date', name='uq_schedule_override_template_date'),
+        Index('ix_schedule_overrides_teacher_id_date', 'teacher_id', 'date'),
+    )
+
+# create_all (DB_CREATE_ALL) needs the extension behind the exclusion constraints; migrations create it themselves
+event.listen(ClassSchedule.__table__, 'before_create', DDL('CREATE EXTENSION IF NOT EXISTS btree_gist').execute_if(dialect='postgresql'))
 
 class ClassDetailsRel(Base):
       __tablename__ = 'class_details_rel'
@@ -234,6 +319,7 @@ class Quiz(Base):
     is_public = Column(Boolean, server_default=text('true'))
     instructions = Column(JSON, nullable=True)
     total_marks = Column(Integer, nullable=True)
+    updated_at = Column(TIMESTAMP(timezone=True), server_default=text('now()'), onupdate=text('now()'))
 
     subject_id = Column(Integer, ForeignKey('subjects.id', ondelete="CASCADE"), nullable=False)
     division_id = Column(Integer, ForeignKey('divisions.id', ondelete="CASCADE"), nullable=False)
@@ -255,6 +341,7 @@ class Question(Base):
     baseline_answer = Column(JSON)
     is_public = Column(Boolean, server_default=text('true'))
     state = Column(SQLEnum(QuestionState), default=QuestionState.active, nullable=True)
+    updated_at = Column(TIMESTAMP(timezone=True), server_default=text('now()'), onupdate=text('now()'))
 
     #Fkey
     user_id = Column(Integer, ForeignKey('users.id', ondelete="CASCADE"), nullable=False)
@@ -279,13 +366,27 @@ class QuizQuestion(Base):
 
     __table_args__ = (
         UniqueConstraint('quiz_id', 'question_id', name='uq_quiz_question'),
+        Index('ix_quiz_question_rel_quiz_id_question_number', 'quiz_id', 'question_number'),
     )
 
+class QuizSnapshot(Base):
+    # Immutable published quiz content, stored once per distinct content
+    # (content_hash is the SHA-256 of its canonical JSON) and referenced by
+    # the published quiz and every student row
+    __tablename__ = 'quiz_snapshots'
+
+    id = Column(Integer, primary_key=True)
+    content_hash = Column(String(64), nullable=False, unique=True)
+    quiz_detail = Column(JSON, nullable=False)
+    created_at = Column(TIMESTAMP(timezone=True), nullable=False, server_default=text('now()'))
+
+
 class PublishedQuiz(Base):
     __tablename__ = 'published_quiz'
     
     id = Column(Integer, primary_key=True, index=True)
-    quiz_detail = Column(JSON)
+    quiz_detail = Column(JSON)  # rows published before quiz_snapshots; newer rows use snapshot_id
+    snapshot_id = Column(Integer, ForeignKey('quiz_snapshots.id'), nullable=True)
     quiz_type = Column(String(20), nullable=False)
     start_time = Column(DateTime, nullable=False)
     duration = Column(Integer, nullable=False)
@@ -306,7 +407,8 @@ class StudentQuizResponseRel(Base):
     __tablename__ = 'students_quiz_response_rel'
 
     id = Column(Integer, primary_key=True, index=True)
-    quiz_detail = Column(JSON) 
+    quiz_detail = Column(JSON)  # rows published before quiz_snapshots; newer rows use snapshot_id
+    snapshot_id = Column(Integer, ForeignKey('quiz_snapshots.id'), nullable=True)
     response = Column(JSON)
     quiz_type = Column(String(20)) # for tasks
     start_date = Column(DateTime) # for tasks
@@ -316,10 +418,15 @@ class StudentQuizResponseRel(Base):
     updated_at = Column(TIMESTAMP(timezone=True), server_default=text('now()'))
     is_submitted = Column(Boolean, server_default=text('false'), nullable=False)
     submitted_at = Column(TIMESTAMP(timezone=True))
+    # Set by auto-grading (app.grading); question_scores maps question id to credit
+    score = Column(Float)
+    max_score = Column(Float)
+    question_scores = Column(JSON)
+    graded_at = Column(TIMESTAMP(timezone=True))
 
     
-    student_id = Column(Integer, ForeignKey('students.id', ondelete="CASCADE"), nullable=False)
-    quiz_rel_id = Column(Integer, ForeignKey('published_quiz.id'))
+    student_id = Column(Integer, ForeignKey('students.id', ondelete="CASCADE"), nullable=False, index=True)
+    quiz_rel_id = Column(Integer, ForeignKey('published_quiz.id'), index=True)
 
 
 # Teacher task
@@ -354,4 +461,32 @@ class TeacherTasks(Base):
     __table_args__ = (UniqueConstraint('title','task_type','subject_id', 'teacher_id','division_id', 'class_schedule_id', name='uq_task_subject_teacher'),)
 
 
-    
\ No newline at end of file
+# Background jobs (see app.jobs)
+
+class Job(Base):
+    __tablename__ = 'jobs'
+
+    id = Column(Integer, primary_key=True)
+    kind = Column(String(50), nullable=False)
+    payload = Column(JSON, nullable=False)
+    status = Column(String(20), nullable=False, server_default='queued')  # queued, running, succeeded, failed
+    progress = Column(Integer, nullable=False, server_default=text('0'))
+    message = Column(Text)
+    result = Column(JSON)
+    error = Column(Text)
+    attempts = Column(Integer, nullable=False, server_default=text('0'))
+    max_attempts = Column(Integer, nullable=False, server_default=text('3'))
+    run_after = Column(TIMESTAMP(timezone=True), nullable=False, server_default=text('now()'))
+    locked_by = Column(String(100))
+    heartbeat_at = Column(TIMESTAMP(timezone=True))
+    created_at = Column(TIMESTAMP(timezone=True), nullable=False, server_default=text('now()'))
+    started_at = Column(TIMESTAMP(timezone=True))
+    finished_at = Column(TIMESTAMP(timezone=True))
+
+    user_id = Column(Integer, ForeignKey('users.id', ondelete="SET NULL"), nullable=True)
+
+    __table_args__ = (
+        # What the runners scan: due queued jobs and leases of running ones
+        Index('ix_jobs_queued_run_after', 'run_after', postgresql_where=text("status = 'queued'")),
+        Index('ix_jobs_running_heartbeat_at', 'heartbeat_at', postgresql_where=text("status = 'running'")),
+    )
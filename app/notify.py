@@ -0,0 +1,119 @@
+import logging
+import select
+import threading
+from collections import defaultdict
+from typing import Callable, Optional
+import orjson
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import engine
+
+# Cross-worker invalidation over Postgres LISTEN/NOTIFY. Writers call publish()
+# inside their transaction, so the message is delivered only if it commits;
+# every worker (including the sender) runs one listener connection that
+# dispatches incoming messages to the callbacks subscribed to their topic.
+
+CHANNEL = "app_invalidate"
+
+logger = logging.getLogger("uvicorn.error")
+
+_subscribers: dict[str, list[Callable[[Optional[str]], None]]] = defaultdict(list)
+
+
+def subscribe(topic: str, callback: Callable[[Optional[str]], None]):
+    # The callback gets the message key, or None when every key of the topic
+    # must be dropped (e.g. after the listener reconnects and may have missed messages)
+    _subscribers[topic].append(callback)
+
+
+def _notify_params(topic: str, key: Optional[str]) -> dict:
+    return {"channel": CHANNEL, "payload": orjson.dumps({"topic": topic, "key": key}).decode()}
+
+
+def publish(db: Session, topic: str, key: Optional[str] = None):
+    db.execute(text("SELECT pg_notify(:channel, :payload)"), _notify_params(topic, key))
+
+
+async def async_publish(db: AsyncSession, topic: str, key: Optional[str] = None):
+    await db.execute(text("SELECT pg_notify(:channel, :payload)"), _notify_params(topic, key))
+
+
+def _dispatch(topic: str, key: Optional[str]):
+    for callback in _subscribers.get(topic, []):
+        try:
+            callback(key)
+        except Exception:
+            logger.exception("invalidation callback for %s failed", topic)
+
+
+def _dispatch_all():
+    for topic in list(_subscribers):
+        _dispatch(topic, None)
+
+
+class Listener:
+    def __init__(self, poll_interval: float = 5.0, reconnect_delay: float = 1.0, max_reconnect_delay: float = 30.0):
+        self.poll_interval = poll_interval
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="notify-listener", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=self.poll_interval + 1)
+
+    def _connect(self):
+        # A dedicated DBAPI connection outside the pool: it sits in LISTEN for
+        # the lifetime of the worker and must not hold a pool slot
+        cargs, cparams = engine.dialect.create_connect_args(engine.url)
+        connection = engine.dialect.loaded_dbapi.connect(*cargs, **cparams)
+        connection.autocommit = True
+        with connection.cursor() as cursor:
+            cursor.execute(f"LISTEN {CHANNEL}")
+        return connection
+
+    def _run(self):
+        delay = self.reconnect_delay
+        while not self._stop.is_set():
+            connection = None
+            try:
+                connection = self._connect()
+                delay = self.reconnect_delay
+                # Messages sent while we were not listening are lost, so start from a clean slate
+                _dispatch_all()
+                while not self._stop.is_set():
+                    ready, _, _ = select.select([connection], [], [], self.poll_interval)
+                    if not ready:
+                        continue
+                    connection.poll()
+                    while connection.notifies:
+                        notification = connection.notifies.pop(0)
+                        try:
+                            message = orjson.loads(notification.payload)
+                        except orjson.JSONDecodeError:
+                            logger.warning("ignoring malformed notification %r", notification.payload)
+                            continue
+                        _dispatch(message.get("topic"), message.get("key"))
+            except Exception as e:
+                logger.warning("notification listener disconnected: %s", e)
+                self._stop.wait(delay)
+                delay = min(delay * 2, self.max_reconnect_delay)
+            finally:
+                if connection is not None:
+                    try:
+                        connection.close()
+                    except Exception:
+                        pass
+
+
+listener = Listener()
@@ -0,0 +1,27 @@
+from typing import Optional, Callable
+from fastapi import Query, Response
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+class PageParams:
+    # Keyset pagination on the primary key: pass the X-Next-Cursor header of
+    # the previous page back as `after_id` to fetch the next one
+    def __init__(
+        self,
+        after_id: Optional[int] = Query(None, ge=0, description="Return rows with an id greater than this cursor"),
+        limit: int = Query(100, ge=1, le=1000)
+    ):
+        self.after_id = after_id
+        self.limit = limit
+
+
+def paginate(query, id_column, page: PageParams, response: Response, row_id: Callable = lambda row: row.id):
+    if page.after_id is not None:
+        query = query.filter(id_column > page.after_id)
+    # Fetch one extra row to know whether another page exists
+    rows = query.order_by(id_column).limit(page.limit + 1).all()
+    if len(rows) > page.limit:
+        rows = rows[:page.limit]
+        response.headers[NEXT_CURSOR_HEADER] = str(row_id(rows[-1]))
+    return rows
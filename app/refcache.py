@@ -0,0 +1,122 @@
+import bisect
+import threading
+from typing import Callable, Optional
+import orjson
+from pydantic import BaseModel
+from sqlalchemy.orm import Session
+from app import models, schemas, notify
+from app.etag import content_etag
+from app.database import SessionLocal
+
+# In-process copies of small, rarely written reference tables. Each table is
+# loaded once per worker on first read and kept both as serialized dicts and
+# as the ready-to-send JSON body of the full list and its ETag. Writers publish an
+# invalidation inside their transaction (see app.notify) and every worker
+# drops its copy when the notification arrives.
+
+TOPIC = "refcache"
+
+
+class ReferenceTable:
+    def __init__(self, name: str, model, schema: type[BaseModel]):
+        self.name = name
+        self.model = model
+        self.schema = schema
+        self._lock = threading.Lock()
+        self._rows: Optional[list[dict]] = None
+        self._ids: list[int] = []
+        self._body: bytes = b"[]"
+        self._etag = content_etag(self._body)
+        self._version = 0
+        self.loads = 0
+        self.hits = 0
+
+    def _load(self):
+        with self._lock:
+            if self._rows is not None:
+                self.hits += 1
+                return self._rows, self._ids, self._body, self._etag
+            version = self._version
+        db = SessionLocal()
+        try:
+            objects = db.query(self.model).order_by(self.model.id).all()
+            rows = [self.schema.model_validate(obj, from_attributes=True).model_dump(mode="json") for obj in objects]
+        finally:
+            db.close()
+        ids = [row["id"] for row in rows]
+        body = orjson.dumps(rows)
+        etag = content_etag(body)
+        with self._lock:
+            self.loads += 1
+            # An invalidation that raced with the load means the rows may be stale: serve them once, don't keep them
+            if version == self._version:
+                self._rows, self._ids, self._body, self._etag = rows, ids, body, etag
+        return rows, ids, body, etag
+
+    def rows(self) -> list[dict]:
+        return self._load()[0]
+
+    def body(self) -> bytes:
+        return self._load()[2]
+
+    def etag(self) -> str:
+        # Changes whenever any row of the table does, so it also covers filtered pages
+        return self._load()[3]
+
+    def page(self, after_id: Optional[int], limit: int, predicate: Optional[Callable[[dict], bool]] = None):
+        # Keyset page over the cached rows, matching app.pagination.paginate
+        rows, ids, _, _ = self._load()
+        start = bisect.bisect_right(ids, after_id) if after_id is not None else 0
+        selected = []
+        for row in rows[start:]:
+            if predicate is None or predicate(row):
+                selected.append(row)
+                if len(selected) > limit:
+                    break
+        next_cursor = None
+        if len(selected) > limit:
+            selected = selected[:limit]
+            next_cursor = selected[-1]["id"]
+        return selected, next_cursor
+
+    def invalidate(self, key: Optional[str] = None):
+        with self._lock:
+            self._rows = None
+            self._ids = []
+            self._body = b"[]"
+            self._etag = content_etag(self._body)
+            self._version += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"cached": self._rows is not None, "rows": len(self._ids), "loads": self.loads, "hits": self.hits}
+
+
+grades = ReferenceTable("grades", models.Grade, schemas.GradeOut)
+sections = ReferenceTable("sections", models.Section, schemas.SectionOut)
+boards = ReferenceTable("boards", models.Board, schemas.BoardOut)
+subjects = ReferenceTable("subjects", models.Subject, schemas.SubjectOut)
+schools = ReferenceTable("schools", models.School, schemas.SchoolOut)
+roles = ReferenceTable("roles", models.UserRole, schemas.RoleOut)
+
+tables = {table.name: table for table in (grades, sections, boards, subjects, schools, roles)}
+
+
+def _on_notification(key: Optional[str]):
+    if key is None:
+        for table in tables.values():
+            table.invalidate()
+    elif key in tables:
+        tables[key].invalidate()
+
+
+notify.subscribe(TOPIC, _on_notification)
+
+
+def publish_invalidation(db: Session, table: ReferenceTable):
+    # Call before commit: the notification is sent only if the write commits
+    notify.publish(db, TOPIC, table.name)
+
+
+def stats() -> dict:
+    return {name: table.stats() for name, table in tables.items()}
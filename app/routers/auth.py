@@ -14,25 +14,32 @@ def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
     db: Session = Depends(get_db)
 ):
-    # Get user by email (username is used for email in this case)
-    user = db.query(models.User).filter(models.User.email == form_data.username).first()
+    # Get user and role in a single round trip (username is used for email in this case)
+    row = db.query(
+        models.User,
+        models.UserRole.name.label("role_name")
+    ).outerjoin(
+        models.UserRoleRel, models.UserRoleRel.user_id == models.User.id
+    ).outerjoin(
+        models.UserRole, models.UserRole.id == models.UserRoleRel.role_id
+    ).filter(models.User.email == form_data.username).first()
 
+    user = row.User if row else None
     if not user or not utils.verify(form_data.password, user.password):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Invalid credentials"
         )
 
-    # Generate JWT token
-    access_token = auth2.create_access_token(data={"id": user.id})
+    # Generate JWT token carrying the role as a verified claim
+    access_token = auth2.create_access_token(data={
+        "id": user.id,
+        "role": row.role_name.lower() if row.role_name else None
+    })
 
-    # Fetch user role
-    user_role = db.query(models.UserRole.name).join(
-        models.UserRoleRel, models.UserRole.id == models.UserRoleRel.role_id
-    ).filter(models.UserRoleRel.user_id == user.id).first()
     message = "login successful"
-    if user_role:
-        role_name = user_role.name.lower()
+    if row.role_name:
+        role_name = row.role_name.lower()
         if role_name == "admin":
             message = "admin login successful"
         elif role_name == "teacher":
@@ -1,9 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Response
 from sqlalchemy.orm import Session
 from app import models, schemas
 from app.database import get_db
 from sqlalchemy.exc import IntegrityError
-from app.auth2 import get_current_user
+from app.auth2 import require_role
+from app import refcache
 from typing import List
 
 router = APIRouter()
@@ -12,39 +13,22 @@ router = APIRouter()
 def add_board(
     board: schemas.BoardCreate,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    current_user: schemas.Principal = Depends(require_role("admin", detail="Only admin users can create boards"))
 ):
-    # Role check - only admin can add board
-    user_role_rel = db.query(models.UserRoleRel).filter(models.UserRoleRel.user_id == current_user.id).first()
-    if not user_role_rel:
-        raise HTTPException(status_code=403, detail="User does not have a role assigned")
-    
-    role = db.query(models.UserRole).filter(models.UserRole.id == user_role_rel.role_id).first()
-    if not role or role.name.lower() not in ["admin"]:
-        raise HTTPException(status_code=403, detail="Only admin users can create boards")
-    
     new_board = models.Board(**board.model_dump())
     try:
         db.add(new_board)
+        refcache.publish_invalidation(db, refcache.boards)
         db.commit()
         db.refresh(new_board)
     except IntegrityError:
         db.rollback()
         raise HTTPException(status_code=400, detail="A board with this name already exists.")
+    refcache.boards.invalidate()
     return new_board
 
 @router.get("/api/get_boards", response_model=List[schemas.BoardOut])
 def get_boards(
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    current_user: schemas.Principal = Depends(require_role("admin", "teacher", detail="Only admin users can view boards"))
 ):
-    # Role check - only admin can view boards
-    user_role_rel = db.query(models.UserRoleRel).filter(models.UserRoleRel.user_id == current_user.id).first()
-    if not user_role_rel:
-        raise HTTPException(status_code=403, detail="User does not have a role assigned")
-    
-    role = db.query(models.UserRole).filter(models.UserRole.id == user_role_rel.role_id).first()
-    if not role or role.name.lower() not in ["admin", "teacher"]:
-        raise HTTPException(status_code=403, detail="Only admin users can view boards")
-    
-    return db.query(models.Board).all()
+    return Response(content=refcache.boards.body(), media_type="application/json")
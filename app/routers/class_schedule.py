@@ -1,10 +1,24 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import ValidationError
 from sqlalchemy.orm import Session
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy import select, insert, or_
+from sqlalchemy.ext.asyncio import AsyncSession
 from app import models, schemas
-from app.database import get_db
-from app.auth2 import get_current_user
+from app.database import get_db, get_async_db, SessionLocal
+from app.auth2 import get_current_user, require_role
 from typing import List, Optional
-from datetime import datetime, date
+from app.pagination import PageParams, paginate
+from app.etag import scope_etag, not_modified, combine_etags
+from app import refcache, daytable, live, jobs
+from app.timetable import schedule_conflict, Slot, find_overlaps, expand_templates, templates_etag, occurrence_out, materialize
+from datetime import datetime, date, timedelta
+from collections import defaultdict
+import csv
+import io
+import orjson
 
 router = APIRouter()
 
@@ -12,17 +26,8 @@ router = APIRouter()
 def create_class_schedule(
     class_schedule: schemas.ClassScheduleCreate, 
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    current_user: schemas.Principal = Depends(require_role("admin", detail="Only admin is allowed to add class schedules"))
 ):
-    # Get the user's role relationship from the database
-    user_role_rel = db.query(models.UserRoleRel).filter(models.UserRoleRel.user_id == current_user.id).first()
-    if not user_role_rel:
-        raise HTTPException(status_code=403, detail="User does not have a role assigned")
-    role = db.query(models.UserRole).filter(models.UserRole.id == user_role_rel.role_id).first()
-    # Allow access if the user is admin 
-    if not role or role.name.lower() not in ["admin"]:
-        raise HTTPException(status_code=403, detail="Only admin is allowed to add class schedules")
-
     # Validate that subject exists
     subject = db.query(models.Subject).filter(models.Subject.id == class_schedule.subject_id).first()
     if not subject:
@@ -70,17 +75,8 @@ def create_class_schedule(
         end_time = class_schedule.end_time
     except ValueError as e:
         raise HTTPException(status_code=400, detail=f"Invalid date/time format: {str(e)}")
-
-
-    # Check for teacher time conflicts (allow back-to-back classes)
-    teacher_conflict = db.query(models.ClassSchedule).filter(
-        models.ClassSchedule.teacher_id == class_schedule.teacher_id,
-        models.ClassSchedule.date == schedule_date,
-        models.ClassSchedule.start_time < end_time,
-        models.ClassSchedule.end_time > start_time
-    ).first()
-    if teacher_conflict:
-        raise HTTPException(status_code=400, detail="Teacher is already assigned to another class at this time")
+    if end_time <= start_time:
+        raise HTTPException(status_code=400, detail="end_time must be after start_time")
 
     # Create the class schedule
     db_class_schedule = models.ClassSchedule(
@@ -93,8 +89,19 @@ def create_class_schedule(
         end_time=end_time
     )
     
-    db.add(db_class_schedule)
-    db.commit()
+    # Teacher and division overlaps are rejected by exclusion constraints in the insert itself
+    day_keys = daytable.class_keys(class_schedule.division_id, class_schedule.teacher_id, schedule_date)
+    try:
+        db.add(db_class_schedule)
+        daytable.publish_invalidation(db, *day_keys)
+        db.commit()
+    except IntegrityError as e:
+        db.rollback()
+        conflict = schedule_conflict(e)
+        if conflict:
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=conflict)
+        raise
+    daytable.invalidate(*day_keys)
     db.refresh(db_class_schedule)
     
     # Get related data for response
@@ -120,22 +127,188 @@ def create_class_schedule(
     
     return response_data
 
+MAX_IMPORT_ROWS = 20000
+
+
+def _parse_import_rows(content_type: str, body: bytes) -> list:
+    if content_type.startswith("text/csv"):
+        reader = csv.DictReader(io.StringIO(body.decode("utf-8-sig")))
+        # Empty cells mean "not given", e.g. a blank date defaults to today
+        return [{key: value for key, value in row.items() if value not in ("", None)} for row in reader]
+    payload = orjson.loads(body)
+    if isinstance(payload, dict):
+        payload = payload.get("rows")
+    if not isinstance(payload, list):
+        raise ValueError("expected a list of rows or an object with a 'rows' list")
+    return payload
+
+
+@router.post("/api/import_class_schedules", response_model=schemas.ClassScheduleImportResult, status_code=status.HTTP_201_CREATED, responses={202: {"model": schemas.JobOut}})
+async def import_class_schedules(
+    request: Request,
+    dry_run: bool = False,
+    background: bool = False,
+    db: Session = Depends(get_db),
+    current_user: schemas.Principal = Depends(require_role("admin", detail="Only admin is allowed to add class schedules"))
+):
+    # Bulk version of add_class_schedule for a whole timetable, as a JSON list
+    # (or {"rows": [...]}) or as CSV with the same column names. Rows are
+    # checked in memory; if any row fails nothing is inserted and the
+    # per-row report comes back with a 422. With background=true the import
+    # runs as a job instead: a 202 with the job, whose result is the report.
+    try:
+        raw_rows = _parse_import_rows(request.headers.get("content-type", ""), await request.body())
+    except (ValueError, UnicodeDecodeError, csv.Error) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid timetable payload: {e}")
+    if len(raw_rows) > MAX_IMPORT_ROWS:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_IMPORT_ROWS} rows can be imported at once")
+    if background:
+        return await run_in_threadpool(_submit_import, db, current_user.id, raw_rows, dry_run)
+    return await run_in_threadpool(_import_class_schedules, db, raw_rows, dry_run)
+
+
+def _submit_import(db: Session, user_id: int, raw_rows: list, dry_run: bool):
+    job = jobs.submit(db, "import_class_schedules", user_id, {"rows": raw_rows, "dry_run": dry_run})
+    db.commit()
+    db.refresh(job)
+    return JSONResponse(
+        status_code=status.HTTP_202_ACCEPTED,
+        content=schemas.JobOut.model_validate(job).model_dump(mode="json")
+    )
+
+
+@jobs.handler("import_class_schedules")
+def _import_class_schedules_job(job: jobs.JobContext, payload: dict) -> dict:
+    # Rows that fail validation are part of the result, not a job failure
+    with SessionLocal() as db:
+        try:
+            result = _import_class_schedules(db, payload["rows"], payload["dry_run"])
+        except HTTPException as e:
+            raise jobs.JobError(e.detail)
+    if isinstance(result, JSONResponse):
+        return orjson.loads(result.body)
+    return result.model_dump(mode="json")
+
+
+def _import_class_schedules(db: Session, raw_rows: list, dry_run: bool):
+    errors: dict[int, list[str]] = {}
+    rows: dict[int, dict] = {}
+    today = date.today()
+
+    for number, raw in enumerate(raw_rows, 1):
+        try:
+            item = schemas.ClassScheduleCreate.model_validate(raw)
+            schedule_date = datetime.strptime(item.date, "%Y-%m-%d").date() if item.date else today
+        except ValidationError as e:
+            errors[number] = [f"{'.'.join(str(loc) for loc in err['loc'])}: {err['msg']}" for err in e.errors()]
+            continue
+        except ValueError as e:
+            errors[number] = [f"Invalid date/time format: {str(e)}"]
+            continue
+        if item.end_time <= item.start_time:
+            errors[number] = ["end_time must be after start_time"]
+            continue
+        rows[number] = {
+            "period": item.period,
+            "date": schedule_date,
+            "subject_id": item.subject_id,
+            "division_id": item.division_id,
+            "teacher_id": item.teacher_id,
+            "start_time": item.start_time,
+            "end_time": item.end_time,
+        }
+
+    # Preload the assignments the rows can refer to: one query each instead of several per row
+    division_ids = {row["division_id"] for row in rows.values()}
+    teacher_ids = {row["teacher_id"] for row in rows.values()}
+    teacher_assignments = set(db.query(
+        models.TeacherDivision.teacher_id, models.TeacherDivision.division_id, models.TeacherDivision.subject_id
+    ).filter(models.TeacherDivision.division_id.in_(division_ids)).all()) if division_ids else set()
+    division_subjects = set(db.query(
+        models.DivisionSubject.division_id, models.DivisionSubject.subject_id
+    ).filter(models.DivisionSubject.division_id.in_(division_ids)).all()) if division_ids else set()
+
+    for number, row in list(rows.items()):
+        row_errors = []
+        if (row["teacher_id"], row["division_id"], row["subject_id"]) not in teacher_assignments:
+            row_errors.append("Teacher is not assigned to teach this subject in this division")
+        if (row["division_id"], row["subject_id"]) not in division_subjects:
+            row_errors.append("Subject is not assigned to this division")
+        if row_errors:
+            errors[number] = row_errors
+            del rows[number]
+
+    # Overlaps, both within the payload and against classes already stored on those dates
+    slots = []
+    for number, row in rows.items():
+        slots.append(Slot(("teacher", row["teacher_id"], row["date"]), row["start_time"], row["end_time"], row=number))
+        slots.append(Slot(("division", row["division_id"], row["date"]), row["start_time"], row["end_time"], row=number))
+    if rows:
+        dates = [row["date"] for row in rows.values()]
+        stored = db.query(
+            models.ClassSchedule.id, models.ClassSchedule.teacher_id, models.ClassSchedule.division_id,
+            models.ClassSchedule.date, models.ClassSchedule.start_time, models.ClassSchedule.end_time
+        ).filter(
+            models.ClassSchedule.date.between(min(dates), max(dates)),
+            or_(models.ClassSchedule.teacher_id.in_(teacher_ids), models.ClassSchedule.division_id.in_(division_ids))
+        ).all()
+        for class_id, teacher_id, division_id, schedule_date, start_time, end_time in stored:
+            slots.append(Slot(("teacher", teacher_id, schedule_date), start_time, end_time, class_id=class_id))
+            slots.append(Slot(("division", division_id, schedule_date), start_time, end_time, class_id=class_id))
+
+    for slot, other in find_overlaps(slots):
+        subject = "Teacher" if slot.key[0] == "teacher" else "Division"
+        for mine, theirs in ((slot, other), (other, slot)):
+            if mine.row is None:
+                continue
+            with_what = f"row {theirs.row}" if theirs.row is not None else f"existing class {theirs.class_id}"
+            errors.setdefault(mine.row, []).append(f"{subject} has an overlapping class ({with_what})")
+
+    inserted = 0
+    if not errors and rows and not dry_run:
+        # One multi-row insert in one transaction; the exclusion constraints
+        # still catch classes added concurrently since the check above
+        day_keys = {
+            key for row in rows.values()
+            for key in daytable.class_keys(row["division_id"], row["teacher_id"], row["date"])
+        }
+        try:
+            db.execute(insert(models.ClassSchedule), list(rows.values()))
+            daytable.publish_invalidation(db, *day_keys)
+            db.commit()
+        except IntegrityError as e:
+            db.rollback()
+            conflict = schedule_conflict(e)
+            if conflict:
+                raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=conflict)
+            raise
+        daytable.invalidate(*day_keys)
+        inserted = len(rows)
+
+    result = schemas.ClassScheduleImportResult(
+        received=len(raw_rows),
+        inserted=inserted,
+        dry_run=dry_run,
+        errors=[schemas.ClassScheduleImportError(row=number, errors=messages) for number, messages in sorted(errors.items())]
+    )
+    if errors:
+        return JSONResponse(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, content=result.model_dump())
+    return result
+
 @router.get("/api/get_class_schedules", response_model=List[schemas.ClassScheduleOut])
 def get_class_schedules(
+    request: Request,
+    response: Response,
+    school_id: Optional[int] = None,
+    division_id: Optional[int] = None,
+    teacher_id: Optional[int] = None,
+    on_date: Optional[date] = None,
+    page: PageParams = Depends(),
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    current_user: schemas.Principal = Depends(require_role("admin", "teacher", detail="Only admin and teacher users can view class schedules"))
 ):
-    # Role check - only admin and teacher can view class schedules
-    user_role_rel = db.query(models.UserRoleRel).filter(models.UserRoleRel.user_id == current_user.id).first()
-    if not user_role_rel:
-        raise HTTPException(status_code=403, detail="User does not have a role assigned")
-    
-    role = db.query(models.UserRole).filter(models.UserRole.id == user_role_rel.role_id).first()
-    if not role or role.name.lower() not in ["admin", "teacher"]:
-        raise HTTPException(status_code=403, detail="Only admin and teacher users can view class schedules")
-
-    # fetch all data
-    class_schedules = db.query(
+    # fetch one page, with filters applied in SQL
+    query = db.query(
         models.ClassSchedule,
         models.Subject,
         models.Division,
@@ -146,7 +319,19 @@ def get_class_schedules(
         models.Division, models.ClassSchedule.division_id == models.Division.id
     ).join(
         models.Teacher, models.ClassSchedule.teacher_id == models.Teacher.id
-    ).all()
+    )
+    if school_id is not None:
+        query = query.filter(models.Division.school_id == school_id)
+    if division_id is not None:
+        query = query.filter(models.ClassSchedule.division_id == division_id)
+    if teacher_id is not None:
+        query = query.filter(models.ClassSchedule.teacher_id == teacher_id)
+    if on_date is not None:
+        query = query.filter(models.ClassSchedule.date == on_date)
+    cached = not_modified(request, response, scope_etag(query, models.ClassSchedule.updated_at, models.Subject.updated_at, models.Teacher.updated_at))
+    if cached:
+        return cached
+    class_schedules = paginate(query, models.ClassSchedule.id, page, response, row_id=lambda row: row.ClassSchedule.id)
 
     result = []
     for schedule, subject, division, teacher in class_schedules:
@@ -168,10 +353,40 @@ def get_class_schedules(
     
     return result
 
+# Template occurrences are expanded for this many days when no window is given
+DEFAULT_EXPANSION_DAYS = 7
+
+
+def _expansion_window(start_date: Optional[date], end_date: Optional[date]):
+    window_start = start_date or date.today()
+    window_end = end_date or window_start + timedelta(days=DEFAULT_EXPANSION_DAYS - 1)
+    if window_end < window_start:
+        raise HTTPException(status_code=400, detail="end_date must not be before start_date")
+    return window_start, window_end
+
+
+def _merge_occurrences(db: Session, result: list, occurrences: list, teacher_names: dict) -> list:
+    # Adds the template occurrences that are not materialized yet to the stored rows
+    materialized = {(row["template_id"], row["date"]) for row in result if row["template_id"] is not None}
+    pending = [o for o in occurrences if (o["template_id"], o["date"].isoformat()) not in materialized]
+    if pending:
+        subject_names = {row["id"]: row["name"] for row in refcache.subjects.rows()}
+        divisions = {
+            division.id: division
+            for division in db.query(models.Division).filter(models.Division.id.in_({o["division_id"] for o in pending}))
+        }
+        result.extend(occurrence_out(o, subject_names, teacher_names, divisions) for o in pending)
+    result.sort(key=lambda row: (row["date"], row["start_time"]))
+    return result
+
 @router.get("/api/teacher_class_schedule", response_model=List[schemas.ClassScheduleOut])
 def get_teacher_class_schedule(
+    request: Request,
+    response: Response,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    current_user: schemas.Principal = Depends(get_current_user)
 ):
     # Find the teacher profile for the current user
     teacher = db.query(models.Teacher).filter(models.Teacher.user_id == current_user.id).first()
@@ -179,7 +394,7 @@ def get_teacher_class_schedule(
         raise HTTPException(status_code=404, detail="Teacher profile not found")
 
     # fetch all data
-    class_schedules = db.query(
+    query = db.query(
         models.ClassSchedule,
         models.Subject,
         models.Division
@@ -189,13 +404,29 @@ def get_teacher_class_schedule(
         models.Division, models.ClassSchedule.division_id == models.Division.id
     ).filter(
         models.ClassSchedule.teacher_id == teacher.id
-    ).all()
+    )
+    # Without a window every stored class is returned, as before; weekly
+    # templates are expanded for the window (default: the coming week)
+    window_start, window_end = _expansion_window(start_date, end_date)
+    if start_date or end_date:
+        query = query.filter(models.ClassSchedule.date.between(window_start, window_end))
+    # The teacher's own name is in every row, so its updated_at is part of the tag
+    tag_query = query.join(models.Teacher, models.ClassSchedule.teacher_id == models.Teacher.id)
+    etag = combine_etags(
+        scope_etag(tag_query, models.ClassSchedule.updated_at, models.Subject.updated_at, models.Teacher.updated_at),
+        templates_etag(db, window_start, window_end, teacher_id=teacher.id)
+    )
+    cached = not_modified(request, response, etag)
+    if cached:
+        return cached
+    class_schedules = query.all()
 
     result = []
     for schedule, subject, division in class_schedules:
         teacher_name = f"{teacher.first_name} {teacher.last_name}"
         result.append({
             "id": schedule.id,
+            "template_id": schedule.template_id,
             "period": schedule.period,
             "date": schedule.date.isoformat(),
             "subject_id": schedule.subject_id,
@@ -209,36 +440,22 @@ def get_teacher_class_schedule(
             "division_name": f"Grade {division.grade_id} Section {division.section_id}" if division else None,
             "teacher_name": teacher_name
         })
-    return result
+    occurrences = expand_templates(db, window_start, window_end, teacher_id=teacher.id)
+    return _merge_occurrences(db, result, occurrences, {teacher.id: f"{teacher.first_name} {teacher.last_name}"})
 
 @router.post("/api/set_class_topic", status_code=status.HTTP_201_CREATED, response_model=schemas.SetClassTopicOut)
 async def set_class_topic(
     class_topic: schemas.SetClassTopic, 
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.Principal = Depends(require_role("teacher", detail="Must be a Teacher to set class topics"))
 ):
-    # Get the user's role relationship from the database
-    user_role_rel = db.query(models.UserRoleRel).filter(models.UserRoleRel.user_id == current_user.id).first()
-    if not user_role_rel:
-        raise HTTPException(status_code=403, detail="User does not have a role assigned")
-    
-    role = db.query(models.UserRole).filter(models.UserRole.id == user_role_rel.role_id).first()
-    
-    # Allow access if the user is Teacher, Administrator
-    allowed_roles = ["teacher"]
-    if not role or role.name not in allowed_roles:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Must be a Teacher to set class topics"
-        )
-    
     # Validate that class schedule exists
-    class_schedule = db.query(models.ClassSchedule).filter(models.ClassSchedule.id == class_topic.class_schedule_id).first()
+    class_schedule = await db.scalar(select(models.ClassSchedule).where(models.ClassSchedule.id == class_topic.class_schedule_id))
     if not class_schedule:
         raise HTTPException(status_code=404, detail="Class schedule not found")
     
     # Validate that subject topic exists
-    subject_topic = db.query(models.SubjectTopic).filter(models.SubjectTopic.id == class_topic.subject_topic_id).first()
+    subject_topic = await db.scalar(select(models.SubjectTopic).where(models.SubjectTopic.id == class_topic.subject_topic_id))
     if not subject_topic:
         raise HTTPException(status_code=404, detail="Subject topic not found")
     
@@ -250,10 +467,10 @@ async def set_class_topic(
         )
 
     # Check if the topic is already assigned to this class schedule
-    existing_topic = db.query(models.ClassDetailsRel).filter(
+    existing_topic = await db.scalar(select(models.ClassDetailsRel).where(
         models.ClassDetailsRel.class_schedule_id == class_topic.class_schedule_id,
         models.ClassDetailsRel.subject_topic_id == class_topic.subject_topic_id
-    ).first()
+    ))
     
     if existing_topic:
         raise HTTPException(
@@ -267,16 +484,19 @@ async def set_class_topic(
         subject_topic_id=class_topic.subject_topic_id
     )
     
+    day_keys = daytable.class_keys(class_schedule.division_id, class_schedule.teacher_id, class_schedule.date)
     db.add(new_class_topic)
-    db.commit()
-    db.refresh(new_class_topic)
+    await daytable.async_publish_invalidation(db, *day_keys)
+    await db.commit()
+    daytable.invalidate(*day_keys)
+    await db.refresh(new_class_topic)
     
     # Get related data for detailed response
-    subject = db.query(models.Subject).filter(models.Subject.id == class_schedule.subject_id).first()
-    teacher = db.query(models.Teacher).filter(models.Teacher.id == class_schedule.teacher_id).first()
-    division = db.query(models.Division).filter(models.Division.id == class_schedule.division_id).first()
-    grade = db.query(models.Grade).filter(models.Grade.id == subject_topic.grade_id).first()
-    board = db.query(models.Board).filter(models.Board.id == subject_topic.board_id).first()
+    subject = await db.scalar(select(models.Subject).where(models.Subject.id == class_schedule.subject_id))
+    teacher = await db.scalar(select(models.Teacher).where(models.Teacher.id == class_schedule.teacher_id))
+    division = await db.scalar(select(models.Division).where(models.Division.id == class_schedule.division_id))
+    grade = await db.scalar(select(models.Grade).where(models.Grade.id == subject_topic.grade_id))
+    board = await db.scalar(select(models.Board).where(models.Board.id == subject_topic.board_id))
     
     # Create detailed response
     response_data = {
@@ -305,8 +525,12 @@ async def set_class_topic(
 
 @router.get("/api/student_class_schedule", response_model=List[schemas.ClassScheduleOut])
 def get_student_class_schedule(
+    request: Request,
+    response: Response,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    current_user: schemas.Principal = Depends(get_current_user)
 ):
     # Find the student profile for the current user
     student = db.query(models.Student).filter(models.Student.user_id == current_user.id).first()
@@ -322,7 +546,7 @@ def get_student_class_schedule(
         raise HTTPException(status_code=404, detail="Current division for student not found")
 
     # fetch all data
-    class_schedules = db.query(
+    query = db.query(
         models.ClassSchedule,
         models.Subject,
         models.Division,
@@ -335,13 +559,28 @@ def get_student_class_schedule(
         models.Teacher, models.ClassSchedule.teacher_id == models.Teacher.id
     ).filter(
         models.ClassSchedule.division_id == student_division.division_id
-    ).all()
+    )
+    # Without a window every stored class is returned, as before; weekly
+    # templates are expanded for the window (default: the coming week)
+    window_start, window_end = _expansion_window(start_date, end_date)
+    if start_date or end_date:
+        query = query.filter(models.ClassSchedule.date.between(window_start, window_end))
+    division_ids = [student_division.division_id]
+    etag = combine_etags(
+        scope_etag(query, models.ClassSchedule.updated_at, models.Subject.updated_at, models.Teacher.updated_at),
+        templates_etag(db, window_start, window_end, division_ids=division_ids)
+    )
+    cached = not_modified(request, response, etag)
+    if cached:
+        return cached
+    class_schedules = query.all()
 
     result = []
     for schedule, subject, division, teacher in class_schedules:
         teacher_name = f"{teacher.first_name} {teacher.last_name}" if teacher.first_name and teacher.last_name else None
         result.append({
             "id": schedule.id,
+            "template_id": schedule.template_id,
             "period": schedule.period,
             "date": schedule.date.isoformat(),
             "subject_id": schedule.subject_id,
@@ -355,36 +594,39 @@ def get_student_class_schedule(
             "division_name": f"Grade {division.grade_id} Section {division.section_id}" if division else None,
             "teacher_name": teacher_name
         })
-    return result
-
-@router.get("/api/current_student_class")
-async def get_current_student_class(
-    date_str: str,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
-):
-    student = db.query(models.Student).filter(models.Student.user_id == current_user.id).first()
-    if not student:
-        raise HTTPException(status_code=404, detail="Student profile not found")
-
-    student_division = db.query(models.StudentDivision).filter(
-        models.StudentDivision.student_id == student.id,
-        models.StudentDivision.is_current == True
-    ).first()
-    if not student_division:
-        raise HTTPException(status_code=404, detail="Current division for student not found")
-
+    occurrences = expand_templates(db, window_start, window_end, division_ids=division_ids)
+    teacher_names = {
+        teacher.id: f"{teacher.first_name} {teacher.last_name}"
+        for teacher in db.query(models.Teacher).filter(models.Teacher.id.in_({o["teacher_id"] for o in occurrences}))
+    } if occurrences else {}
+    return _merge_occurrences(db, result, occurrences, teacher_names)
+
+async def _materialize_day(db: AsyncSession, day: date, division_ids: Optional[list] = None, teacher_id: Optional[int] = None):
     try:
-        if date_str:
-            query_date = datetime.strptime(date_str, "%Y-%m-%d").date()
-        else:
-            query_date = date.today()
-    except ValueError:
-        raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD.")
-
-    current_time = datetime.now().time()
-
-    class_details = db.query(
+        await db.run_sync(lambda session: materialize(session, day, day, division_ids=division_ids, teacher_id=teacher_id))
+        await db.commit()
+    except IntegrityError:
+        # Lost a race with a concurrent write; the stored classes are still served
+        await db.rollback()
+
+async def _load_day(db: AsyncSession, kind: str, owner_id: int, day: date) -> daytable.DayTimetable:
+    # Every class of the division or teacher on `day`, names resolved and
+    # topics attached, in the shape the current-class endpoints return
+    key = daytable.day_key(kind, owner_id, day)
+    entry = daytable.get_day(key)
+    if entry is not None:
+        return entry
+    loaded_version = daytable.version()
+
+    # The current class needs an id (topics, tasks), so the day's template occurrences are materialized first
+    if kind == "division":
+        await _materialize_day(db, day, division_ids=[owner_id])
+        owner_filter = models.ClassSchedule.division_id == owner_id
+    else:
+        await _materialize_day(db, day, teacher_id=owner_id)
+        owner_filter = models.ClassSchedule.teacher_id == owner_id
+
+    class_rows = (await db.execute(select(
         models.ClassSchedule,
         models.School,
         models.Division,
@@ -404,152 +646,144 @@ async def get_current_student_class(
         models.Subject, models.ClassSchedule.subject_id == models.Subject.id
     ).join(
         models.Teacher, models.ClassSchedule.teacher_id == models.Teacher.id
-    ).filter(
-        models.ClassSchedule.division_id == student_division.division_id,
-        models.ClassSchedule.date == query_date,
-        models.ClassSchedule.start_time <= current_time,
-        models.ClassSchedule.end_time >= current_time
-    ).order_by(models.ClassSchedule.start_time).first()
-
-    if not class_details:
-        raise HTTPException(status_code=404, detail="No Current Class found")
-
-    class_schedule, school, division, grade, section, subject, teacher = class_details
-
-    details = db.query(
-        models.ClassDetailsRel,
-        models.SubjectTopic.topic,
-        models.SubjectTopic.sub_topic
-    ).join(
-        models.SubjectTopic, models.SubjectTopic.id == models.ClassDetailsRel.subject_topic_id
-    ).filter(
-        models.ClassDetailsRel.class_schedule_id == class_schedule.id
-    ).all()
-
-    topics_dict = {}
-    for rel in details:
-        topic_name = rel.topic
-        subtopic_name = rel.sub_topic
-        if topic_name not in topics_dict:
-            topics_dict[topic_name] = []
-        if subtopic_name:
-            topics_dict[topic_name].append(subtopic_name)
-    detail_list = [
-        {"topic": topic, "sub_topic": subtopics}
-        for topic, subtopics in topics_dict.items()
-    ]
-
-    return {
-        "class_schedule_id": class_schedule.id,
-        "date": class_schedule.date,
-        "period": class_schedule.period,
-        "start_time": class_schedule.start_time,
-        "end_time": class_schedule.end_time,
-        "school_name": school.name if school else None,
-        "school_id": school.id if school else None,
-        "division_id": division.id if division else None,
-        "grade_id": grade.id if grade else None,
-        "grade_name": grade.name if grade else None,
-        "section_id": section.id if section else None,
-        "section_name": section.name if section else None,
-        "subject_name": subject.name if subject else None,
-        "teacher_name": f"{teacher.first_name} {teacher.last_name}" if teacher else None,
-        "class_details": detail_list,
-        "subject_id": subject.id if subject else None,
-        "teacher_id": teacher.id if teacher else None
-    }
-
-@router.get("/api/current_teacher_class")
-async def get_current_teacher_class(
-    date_str: str,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
-):
-    teacher = db.query(models.Teacher).filter(models.Teacher.user_id == current_user.id).first()
-    if not teacher:
-        raise HTTPException(status_code=404, detail="Teacher profile not found")
+    ).where(
+        owner_filter,
+        models.ClassSchedule.date == day
+    ).order_by(models.ClassSchedule.start_time))).all()
+
+    topics = defaultdict(dict)
+    if class_rows:
+        details = (await db.execute(select(
+            models.ClassDetailsRel.class_schedule_id,
+            models.SubjectTopic.topic,
+            models.SubjectTopic.sub_topic
+        ).join(
+            models.SubjectTopic, models.SubjectTopic.id == models.ClassDetailsRel.subject_topic_id
+        ).where(
+            models.ClassDetailsRel.class_schedule_id.in_([row[0].id for row in class_rows])
+        ).order_by(models.ClassDetailsRel.id))).all()
+        for class_schedule_id, topic_name, subtopic_name in details:
+            subtopics = topics[class_schedule_id].setdefault(topic_name, [])
+            if subtopic_name:
+                subtopics.append(subtopic_name)
+
+    classes = []
+    for class_schedule, school, division, grade, section, subject, teacher in class_rows:
+        classes.append({
+            "class_schedule_id": class_schedule.id,
+            "date": class_schedule.date,
+            "period": class_schedule.period,
+            "start_time": class_schedule.start_time,
+            "end_time": class_schedule.end_time,
+            "school_name": school.name if school else None,
+            "school_id": school.id if school else None,
+            "division_id": division.id if division else None,
+            "grade_id": grade.id if grade else None,
+            "grade_name": grade.name if grade else None,
+            "section_id": section.id if section else None,
+            "section_name": section.name if section else None,
+            "subject_name": subject.name if subject else None,
+            "teacher_name": f"{teacher.first_name} {teacher.last_name}" if teacher else None,
+            "class_details": [
+                {"topic": topic, "sub_topic": subtopics}
+                for topic, subtopics in topics[class_schedule.id].items()
+            ],
+            "subject_id": subject.id if subject else None,
+            "teacher_id": teacher.id if teacher else None
+        })
+    return daytable.put_day(key, classes, loaded_version)
 
+def _query_date(date_str: str) -> date:
     try:
         if date_str:
-            query_date = datetime.strptime(date_str, "%Y-%m-%d").date()
-        else:
-            query_date = date.today()
+            return datetime.strptime(date_str, "%Y-%m-%d").date()
+        return date.today()
     except ValueError:
         raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD.")
 
-    current_time = datetime.now().time()
+async def _student_division_id(db: AsyncSession, current_user: schemas.Principal) -> int:
+    profile_key = daytable.user_key(current_user.id)
+    division_id = daytable.get_profile(profile_key)
+    if division_id is None:
+        loaded_version = daytable.version()
+        student = await db.scalar(select(models.Student).where(models.Student.user_id == current_user.id))
+        if not student:
+            raise HTTPException(status_code=404, detail="Student profile not found")
+
+        student_division = await db.scalar(select(models.StudentDivision).where(
+            models.StudentDivision.student_id == student.id,
+            models.StudentDivision.is_current == True
+        ))
+        if not student_division:
+            raise HTTPException(status_code=404, detail="Current division for student not found")
+        division_id = student_division.division_id
+        daytable.put_profile(profile_key, division_id, loaded_version)
+    return division_id
+
+async def _teacher_id(db: AsyncSession, current_user: schemas.Principal) -> int:
+    profile_key = daytable.user_key(current_user.id)
+    teacher_id = daytable.get_profile(profile_key)
+    if teacher_id is None:
+        loaded_version = daytable.version()
+        teacher = await db.scalar(select(models.Teacher).where(models.Teacher.user_id == current_user.id))
+        if not teacher:
+            raise HTTPException(status_code=404, detail="Teacher profile not found")
+        teacher_id = teacher.id
+        daytable.put_profile(profile_key, teacher_id, loaded_version)
+    return teacher_id
 
-    class_details = db.query(
-        models.ClassSchedule,
-        models.School,
-        models.Division,
-        models.Grade,
-        models.Section,
-        models.Subject,
-        models.Teacher
-    ).join(
-        models.Division, models.ClassSchedule.division_id == models.Division.id
-    ).join(
-        models.School, models.Division.school_id == models.School.id
-    ).join(
-        models.Grade, models.Division.grade_id == models.Grade.id
-    ).join(
-        models.Section, models.Division.section_id == models.Section.id
-    ).join(
-        models.Subject, models.ClassSchedule.subject_id == models.Subject.id
-    ).join(
-        models.Teacher, models.ClassSchedule.teacher_id == models.Teacher.id
-    ).filter(
-        models.ClassSchedule.teacher_id == teacher.id,
-        models.ClassSchedule.date == query_date,
-        models.ClassSchedule.start_time <= current_time,
-        models.ClassSchedule.end_time >= current_time
-    ).order_by(models.ClassSchedule.start_time).first()
+@router.get("/api/current_student_class")
+async def get_current_student_class(
+    date_str: str,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.Principal = Depends(get_current_user)
+):
+    # Polled by every student at each period start: served from the day
+    # timetable cache, with no queries once the day is loaded
+    division_id = await _student_division_id(db, current_user)
+    query_date = _query_date(date_str)
+    timetable = await _load_day(db, "division", division_id, query_date)
+    current_class = timetable.current(datetime.now().time())
+    if current_class is None:
+        raise HTTPException(status_code=404, detail="No Current Class found")
+    return current_class
 
-    if not class_details:
+@router.get("/api/current_teacher_class")
+async def get_current_teacher_class(
+    date_str: str,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.Principal = Depends(get_current_user)
+):
+    teacher_id = await _teacher_id(db, current_user)
+    query_date = _query_date(date_str)
+    timetable = await _load_day(db, "teacher", teacher_id, query_date)
+    current_class = timetable.current(datetime.now().time())
+    if current_class is None:
         raise HTTPException(status_code=404, detail="No Current Class found")
+    return current_class
 
-    class_schedule, school, division, grade, section, subject, teacher_obj = class_details
+live_classes = live.Broadcaster(_load_day)
 
-    details = db.query(
-        models.ClassDetailsRel,
-        models.SubjectTopic.topic,
-        models.SubjectTopic.sub_topic
-    ).join(
-        models.SubjectTopic, models.SubjectTopic.id == models.ClassDetailsRel.subject_topic_id
-    ).filter(
-        models.ClassDetailsRel.class_schedule_id == class_schedule.id
-    ).all()
-
-    topics_dict = {}
-    for rel in details:
-        topic_name = rel.topic
-        subtopic_name = rel.sub_topic
-        if topic_name not in topics_dict:
-            topics_dict[topic_name] = []
-        if subtopic_name:
-            topics_dict[topic_name].append(subtopic_name)
-    detail_list = [
-        {"topic": topic, "sub_topic": subtopics}
-        for topic, subtopics in topics_dict.items()
-    ]
-
-    return {
-        "class_schedule_id": class_schedule.id,
-        "date": class_schedule.date,
-        "period": class_schedule.period,
-        "start_time": class_schedule.start_time,
-        "end_time": class_schedule.end_time,
-        "school_name": school.name if school else None,
-        "school_id": school.id if school else None,
-        "division_id": division.id if division else None,
-        "grade_id": grade.id if grade else None,
-        "grade_name": grade.name if grade else None,
-        "section_id": section.id if section else None,
-        "section_name": section.name if section else None,
-        "subject_name": subject.name if subject else None,
-        "teacher_name": f"{teacher_obj.first_name} {teacher_obj.last_name}" if teacher_obj else None,
-        "subject_id": subject.id if subject else None,
-        "teacher_id": teacher_obj.id if teacher_obj else None,
-        "class_details": detail_list
-    }
+def _event_stream(kind: str, owner_id: int) -> StreamingResponse:
+    return StreamingResponse(
+        live_classes.stream(kind, owner_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/api/current_student_class/stream")
+async def stream_current_student_class(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.Principal = Depends(get_current_user)
+):
+    # Server-sent events replacing the current_student_class poll: a
+    # current_class event (the same body, or null between classes) on
+    # connect, at each period boundary and when the class's topics change
+    return _event_stream("division", await _student_division_id(db, current_user))
+
+@router.get("/api/current_teacher_class/stream")
+async def stream_current_teacher_class(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.Principal = Depends(get_current_user)
+):
+    return _event_stream("teacher", await _teacher_id(db, current_user))
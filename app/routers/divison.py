@@ -1,9 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Body
+from fastapi import APIRouter, Depends, HTTPException, status, Body, Request, Response
 from sqlalchemy.orm import Session
-from app import models, schemas
+from app import models, schemas, bulk
 from app.database import get_db
-from app.auth2 import get_current_user
-from typing import List
+from app.auth2 import require_role
+from typing import List, Optional
+from app.pagination import PageParams, paginate
+from app.etag import scope_etag, not_modified
 from sqlalchemy import select
 
 router = APIRouter()
@@ -12,17 +14,8 @@ router = APIRouter()
 def create_division(
     division: schemas.DivisionCreate, 
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    current_user: schemas.Principal = Depends(require_role("admin", detail="Only admin users are allowed to add division details"))
 ):
-    # Get the user's role relationship from the database
-    user_role_rel = db.query(models.UserRoleRel).filter(models.UserRoleRel.user_id == current_user.id).first()
-    if not user_role_rel:
-        raise HTTPException(status_code=403, detail="User does not have a role assigned")
-    role = db.query(models.UserRole).filter(models.UserRole.id == user_role_rel.role_id).first()
-    # Allow access if the user is admin
-    if not role or role.name.lower() != "admin":
-        raise HTTPException(status_code=403, detail="Only admin users are allowed to add division details")
-
     # Check for existing division with same details
     existing = db.query(models.Division).filter(
         models.Division.grade_id == division.grade_id,
@@ -40,8 +33,16 @@ def create_division(
     return db_division
 
 @router.get("/api/get_divisions", response_model=List[schemas.DivisionOutWithNames])
-def get_divisions(db: Session = Depends(get_db)):
-    divisions = db.query(
+def get_divisions(
+    request: Request,
+    response: Response,
+    school_id: Optional[int] = None,
+    grade_id: Optional[int] = None,
+    academic_year: Optional[str] = None,
+    page: PageParams = Depends(),
+    db: Session = Depends(get_db)
+):
+    query = db.query(
         models.Division,
         models.Grade,
         models.Section,
@@ -52,7 +53,17 @@ def get_divisions(db: Session = Depends(get_db)):
         models.Section, models.Division.section_id == models.Section.id
     ).join(
         models.School, models.Division.school_id == models.School.id
-    ).all()
+    )
+    if school_id is not None:
+        query = query.filter(models.Division.school_id == school_id)
+    if grade_id is not None:
+        query = query.filter(models.Division.grade_id == grade_id)
+    if academic_year:
+        query = query.filter(models.Division.academic_year == academic_year)
+    cached = not_modified(request, response, scope_etag(query, models.Division.updated_at, models.Grade.updated_at, models.Section.updated_at, models.School.updated_at))
+    if cached:
+        return cached
+    divisions = paginate(query, models.Division.id, page, response, row_id=lambda row: row.Division.id)
     result = []
     for division, grade, section, school in divisions:
         result.append({
@@ -73,16 +84,8 @@ def get_divisions(db: Session = Depends(get_db)):
 def assign_division_subject(
     payload: schemas.DivisionSubjectBulkCreate,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    current_user: schemas.Principal = Depends(require_role("admin", detail="Only admin users can assign division subjects"))
 ):
-    # Enforce admin-only access
-    user_role_rel = db.query(models.UserRoleRel).filter(models.UserRoleRel.user_id == current_user.id).first()
-    if not user_role_rel:
-        raise HTTPException(status_code=403, detail="User does not have a role assigned")
-    role = db.query(models.UserRole).filter(models.UserRole.id == user_role_rel.role_id).first()
-    if not role or role.name.lower() != "admin":
-        raise HTTPException(status_code=403, detail="Only admin users can assign division subjects")
-
     # Get division and school
     division = db.query(models.Division).filter(models.Division.id == payload.division_id).first()
     if not division:
@@ -104,11 +107,11 @@ def assign_division_subject(
 
     # Prepare new assignments
     new_subjects = [
-        models.DivisionSubject(
-            school_id=school_id,
-            division_id=payload.division_id,
-            subject_id=sid
-        )
+        {
+            "school_id": school_id,
+            "division_id": payload.division_id,
+            "subject_id": sid
+        }
         for _, sid in payload.subjects.items()
         if sid not in existing_ids
     ]
@@ -116,7 +119,8 @@ def assign_division_subject(
     if not new_subjects:
         raise HTTPException(status_code=400, detail="All subjects already assigned to this division.")
 
-    db.bulk_save_objects(new_subjects)
+    # A concurrent assignment of the same subject is skipped rather than failing the request
+    bulk.insert_rows(db, models.DivisionSubject, new_subjects, conflict="unique_division_subject")
     db.commit()
 
     # Return all assignments for this division
@@ -127,16 +131,17 @@ def assign_division_subject(
 
 @router.get("/api/get_division_subjects", response_model=List[schemas.DivisionSubjectOut])
 def get_division_subjects(
+    response: Response,
+    school_id: Optional[int] = None,
+    division_id: Optional[int] = None,
+    page: PageParams = Depends(),
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    current_user: schemas.Principal = Depends(require_role("admin", detail="Only admin users can view division-subject assignments"))
 ):
-    # Enforce admin-only access
-    user_role_rel = db.query(models.UserRoleRel).filter(models.UserRoleRel.user_id == current_user.id).first()
-    if not user_role_rel:
-        raise HTTPException(status_code=403, detail="User does not have a role assigned")
-    role = db.query(models.UserRole).filter(models.UserRole.id == user_role_rel.role_id).first()
-    if not role or role.name.lower() != "admin":
-        raise HTTPException(status_code=403, detail="Only admin users can view division-subject assignments")
-
-    division_subjects = db.query(models.DivisionSubject).all()
+    query = db.query(models.DivisionSubject)
+    if school_id is not None:
+        query = query.filter(models.DivisionSubject.school_id == school_id)
+    if division_id is not None:
+        query = query.filter(models.DivisionSubject.division_id == division_id)
+    division_subjects = paginate(query, models.DivisionSubject.id, page, response)
     return division_subjects
\ No newline at end of file
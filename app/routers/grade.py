@@ -1,9 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Response
 from sqlalchemy.orm import Session
 from app import models, schemas
 from app.database import get_db
 from sqlalchemy.exc import IntegrityError
-from app.auth2 import get_current_user
+from app.auth2 import require_role
+from app import refcache
 from typing import List
 
 router = APIRouter()
@@ -12,21 +13,20 @@ router = APIRouter()
 def add_grade(
     grade: schemas.GradeCreate,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    current_user: schemas.Principal = Depends(require_role("admin", detail="Not authorized"))
 ):
-    # Only admin can add grade
-    if current_user.role != "admin":
-        raise HTTPException(status_code=403, detail="Not authorized")
     new_grade = models.Grade(**grade.model_dump())
     try:
         db.add(new_grade)
+        refcache.publish_invalidation(db, refcache.grades)
         db.commit()
         db.refresh(new_grade)
     except IntegrityError:
         db.rollback()
         raise HTTPException(status_code=400, detail="A grade with this name already exists.")
+    refcache.grades.invalidate()
     return new_grade
 
 @router.get("/api/get_grades", response_model=List[schemas.GradeOut])
-def get_grades(db: Session = Depends(get_db)):
-    return db.query(models.Grade).all()
+def get_grades():
+    return Response(content=refcache.grades.body(), media_type="application/json")
@@ -0,0 +1,65 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from app import models, schemas, utils, database, refcache, daytable, jobs, autosave
+from app.auth2 import require_role, principal_cache
+from app.routers import class_schedule
+
+router = APIRouter(
+    tags=['Internal']
+)
+
+
+@router.get("/internal/auth_cache")
+def get_auth_cache_stats(
+    current_user: schemas.Principal = Depends(require_role("admin", detail="Only admin users can view internal metrics"))
+):
+    return principal_cache.stats()
+
+
+@router.get("/internal/hash_pool")
+def get_hash_pool_stats(
+    current_user: schemas.Principal = Depends(require_role("admin", detail="Only admin users can view internal metrics"))
+):
+    return utils.hash_pool_stats()
+
+
+@router.get("/internal/pool")
+def get_pool_stats(
+    current_user: schemas.Principal = Depends(require_role("admin", detail="Only admin users can view internal metrics"))
+):
+    return {
+        "sync": database.sync_pool_metrics.snapshot(database.engine.pool),
+        "async": database.async_pool_metrics.snapshot(database.async_engine.sync_engine.pool),
+    }
+
+
+@router.get("/internal/refcache")
+def get_refcache_stats(
+    current_user: schemas.Principal = Depends(require_role("admin", detail="Only admin users can view internal metrics"))
+):
+    return refcache.stats()
+
+
+@router.get("/internal/daytable")
+def get_daytable_stats(
+    current_user: schemas.Principal = Depends(require_role("admin", detail="Only admin users can view internal metrics"))
+):
+    return {**daytable.stats(), "live": class_schedule.live_classes.stats()}
+
+
+@router.get("/internal/jobs")
+def get_job_stats(
+    db: Session = Depends(database.get_db),
+    current_user: schemas.Principal = Depends(require_role("admin", detail="Only admin users can view internal metrics"))
+):
+    # This worker's runner, and the queue as a whole
+    counts = db.query(models.Job.status, func.count()).group_by(models.Job.status).all()
+    return {**jobs.runner.get_stats(), "jobs": {job_status: count for job_status, count in counts}}
+
+
+@router.get("/internal/autosave")
+def get_autosave_stats(
+    current_user: schemas.Principal = Depends(require_role("admin", detail="Only admin users can view internal metrics"))
+):
+    return autosave.buffer.get_stats()
@@ -0,0 +1,21 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from app import schemas, jobs
+from app.auth2 import require_role
+from app.database import get_db
+
+router = APIRouter(
+    tags=['Jobs']
+)
+
+
+@router.get("/api/jobs/{job_id}", response_model=schemas.JobOut)
+def get_job(
+    job_id: int,
+    db: Session = Depends(get_db),
+    current_user: schemas.Principal = Depends(require_role("admin", "teacher", detail="Only admin and teacher users can view jobs"))
+):
+    job = jobs.get(db, job_id)
+    if job is None or (current_user.role != "admin" and job.user_id != current_user.id):
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
@@ -1,14 +1,20 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Request, Response
+from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
+from pydantic import ValidationError
 from typing import Optional, Dict, Any, List
 from app import models, schemas
-from app.database import get_db
-from app.auth2 import get_current_user
+from app.database import get_db, get_async_db, SessionLocal
+from app.auth2 import get_current_user, require_role
 from app.models import QuizQuestion, Quiz, Question
-from sqlalchemy import insert
+from sqlalchemy import select, func, literal, or_, exists, Integer
+from sqlalchemy.dialects.postgresql import insert as pg_insert, ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
 from app import schemas 
 from app.models import PublishedQuiz, StudentQuizResponseRel
+from app.etag import async_scope_etag, not_modified
+from app import snapshots, bulk, jobs, grading
 
 router = APIRouter()
 
@@ -17,7 +23,7 @@ router = APIRouter()
 def create_quiz(
     quiz: schemas.QuizCreate,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    current_user: schemas.Principal = Depends(get_current_user)
 ):
     # Validate each ID individually
     school_exists = db.query(models.School).filter(models.School.id == quiz.school_id).first()
@@ -44,7 +50,7 @@ def create_quiz(
 def create_question(
     question: schemas.QuestionCreate,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    current_user: schemas.Principal = Depends(get_current_user)
 ):
     # Validate each ID 
     school_exists = db.query(models.School).filter(models.School.id == question.school_id).first()
@@ -65,65 +71,156 @@ def create_question(
             detail="A question with this title already exists for this user in the same subject, division, and school."
         )
 
-@router.post("/api/add_questions_bulk", response_model=List[schemas.QuestionCreate])
+MAX_QUESTION_IMPORT_ROWS = 10000
+QUESTION_INSERT_BATCH = 1000
+QUESTION_STATES = {state.value for state in models.QuestionState}
+
+
+def _question_row_errors(question: schemas.QuestionCreate) -> list:
+    # Checks the database would otherwise fail the whole batch on
+    errors = []
+    for field, limit in (("title", 200), ("topic", 50), ("sub_topic", 50)):
+        if len(getattr(question, field)) > limit:
+            errors.append(f"{field}: at most {limit} characters")
+    if question.state is not None and question.state not in QUESTION_STATES:
+        errors.append(f"state: must be one of {sorted(QUESTION_STATES)}")
+    return errors
+
+
+@router.post("/api/add_questions_bulk", response_model=schemas.QuestionImportResult, responses={202: {"model": schemas.JobOut}})
 def create_questions_bulk(
     data: schemas.BulkQuestionCreate,
+    background: bool = False,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    current_user: schemas.Principal = Depends(get_current_user)
 ):
-    created_questions = []
-    for question in data.questions:
-        # Validate each ID individually
-        school_exists = db.query(models.School).filter(models.School.id == question.school_id).first()
-        division_exists = db.query(models.Division).filter(models.Division.id == question.division_id).first()
-        subject_exists = db.query(models.Subject).filter(models.Subject.id == question.subject_id).first()
-        if not (school_exists and division_exists and subject_exists):
-            raise HTTPException(status_code=400, detail=f"Invalid school_id, division_id, or subject_id for question {question.title}")
-        db_question = models.Question(**question.model_dump(exclude={"user_id"}), user_id=current_user.id)
+    # Question bank import: every row is validated, rows whose title the
+    # teacher already uses in the same school, division and subject are
+    # reported as duplicates, and the rest are inserted in multi-row batches.
+    # The report has one entry per row, in request order. With
+    # background=true the import runs as a job and the report is its result.
+    if len(data.questions) > MAX_QUESTION_IMPORT_ROWS:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_QUESTION_IMPORT_ROWS} questions can be imported at once")
+    if background:
+        job = jobs.submit(db, "import_questions", current_user.id, {"user_id": current_user.id, "questions": data.questions})
+        db.commit()
+        db.refresh(job)
+        return JSONResponse(
+            status_code=status.HTTP_202_ACCEPTED,
+            content=schemas.JobOut.model_validate(job).model_dump(mode="json")
+        )
+    return _import_questions(db, current_user.id, data.questions)
+
+
+@jobs.handler("import_questions")
+def _import_questions_job(job: jobs.JobContext, payload: dict) -> dict:
+    with SessionLocal() as db:
+        return _import_questions(db, payload["user_id"], payload["questions"], report_progress=job.report).model_dump(mode="json")
+
+
+def _import_questions(db: Session, user_id: int, questions: List[Dict[str, Any]], report_progress=None) -> schemas.QuestionImportResult:
+    report: dict[int, schemas.QuestionImportRow] = {}
+    rows: dict[int, dict] = {}
+    for number, raw in enumerate(questions, 1):
         try:
-            db.add(db_question)
-            db.commit()
-            db.refresh(db_question)
-            created_questions.append(db_question)
-        except IntegrityError:
-            db.rollback()
-            raise HTTPException(
-                status_code=400,
-                detail=f"A question with this title already exists for this user in the same subject, division, and school for question {question.title}"
-            )
-    return created_questions
+            question = schemas.QuestionCreate.model_validate(raw)
+        except ValidationError as e:
+            report[number] = schemas.QuestionImportRow(row=number, status="invalid", errors=[
+                f"{'.'.join(str(loc) for loc in err['loc'])}: {err['msg']}" for err in e.errors()
+            ])
+            continue
+        errors = _question_row_errors(question)
+        if errors:
+            report[number] = schemas.QuestionImportRow(row=number, status="invalid", errors=errors)
+            continue
+        rows[number] = {**question.model_dump(), "user_id": user_id}
+
+    # One IN query per referenced table instead of three lookups per row
+    def existing(model, key):
+        ids = {row[key] for row in rows.values()}
+        return set(db.scalars(select(model.id).where(model.id.in_(ids)))) if ids else set()
+    schools = existing(models.School, "school_id")
+    divisions = existing(models.Division, "division_id")
+    subjects = existing(models.Subject, "subject_id")
+
+    seen: dict[tuple, int] = {}
+    for number, row in list(rows.items()):
+        errors = [
+            f"{key}: {row[key]} not found"
+            for key, known in (("school_id", schools), ("division_id", divisions), ("subject_id", subjects))
+            if row[key] not in known
+        ]
+        if errors:
+            report[number] = schemas.QuestionImportRow(row=number, status="invalid", errors=errors)
+            del rows[number]
+            continue
+        key = (row["title"], row["subject_id"], row["division_id"], row["school_id"])
+        if key in seen:
+            report[number] = schemas.QuestionImportRow(row=number, status="duplicate", errors=[f"same question as row {seen[key]}"])
+            del rows[number]
+            continue
+        seen[key] = number
+
+    # Rows that hit uq_question_user_title_context are skipped by the
+    # database and don't come back from RETURNING
+    numbers = list(rows)
+    for start in range(0, len(numbers), QUESTION_INSERT_BATCH):
+        batch = numbers[start:start + QUESTION_INSERT_BATCH]
+        stmt = pg_insert(Question).values([rows[number] for number in batch]).on_conflict_do_nothing(
+            constraint="uq_question_user_title_context"
+        ).returning(Question.id, Question.title, Question.subject_id, Question.division_id, Question.school_id)
+        inserted = {tuple(key): question_id for question_id, *key in db.execute(stmt)}
+        for number in batch:
+            row = rows[number]
+            question_id = inserted.get((row["title"], row["subject_id"], row["division_id"], row["school_id"]))
+            if question_id is None:
+                report[number] = schemas.QuestionImportRow(row=number, status="duplicate", errors=["question already exists"])
+            else:
+                report[number] = schemas.QuestionImportRow(row=number, status="accepted", question_id=question_id)
+        if report_progress:
+            report_progress(min(99, (start + len(batch)) * 100 // len(numbers)), f"{start + len(batch)} of {len(numbers)} questions written")
+    db.commit()
+
+    statuses = [entry.status for entry in report.values()]
+    return schemas.QuestionImportResult(
+        received=len(questions),
+        accepted=statuses.count("accepted"),
+        duplicate=statuses.count("duplicate"),
+        invalid=statuses.count("invalid"),
+        rows=[report[number] for number in sorted(report)]
+    )
 
 @router.post("/api/{quiz_id}/add_existing_question", response_model=Dict[str, Any])
 async def add_existing_question_to_quiz(
     quiz_id: int,
     question_id: int,
     question_number: Optional[int] = None,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.Principal = Depends(get_current_user)
 ):
     # Check if quiz exists and is owned by user
-    quiz = db.query(Quiz).filter(Quiz.id == quiz_id, Quiz.user_id == current_user.id).first()
+    quiz = await db.scalar(select(Quiz).where(Quiz.id == quiz_id, Quiz.user_id == current_user.id))
     if not quiz:
         raise HTTPException(status_code=404, detail="Quiz not found or not authorized")
     # Check if question exists
-    question = db.query(Question).filter(Question.id == question_id).first()
+    question = await db.scalar(select(Question).where(Question.id == question_id))
     if not question:
         raise HTTPException(status_code=404, detail="Question not found")
 
     # Check if question is already in this quiz
-    existing = db.query(QuizQuestion).filter(
+    existing = await db.scalar(select(QuizQuestion).where(
         QuizQuestion.quiz_id == quiz_id,
         QuizQuestion.question_id == question_id
-    ).first()
+    ))
     if existing:
         raise HTTPException(status_code=400, detail="Question already exists in this quiz")
 
     # Determine question number
     if question_number is None:
-        max_number = db.query(QuizQuestion.question_number).filter(
+        max_number = await db.scalar(select(func.max(QuizQuestion.question_number)).where(
             QuizQuestion.quiz_id == quiz_id
-        ).order_by(QuizQuestion.question_number.desc()).first()
-        question_number = (max_number[0] if max_number else 0) + 1
+        ))
+        question_number = (max_number or 0) + 1
 
     quiz_question = QuizQuestion(
         quiz_id=quiz_id,
@@ -133,7 +230,7 @@ async def add_existing_question_to_quiz(
     )
 
     db.add(quiz_question)
-    db.commit()
+    await db.commit()
 
     return {
         "message": "Question added to quiz successfully",
@@ -146,45 +243,68 @@ async def add_existing_question_to_quiz(
 async def add_questions_bulk(
     quiz_id: int,
     data: schemas.BulkQuizQuestionAdd,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.Principal = Depends(get_current_user)
 ):
 
     # Verify quiz exists and user owns it
-    quiz = db.query(Quiz).filter(Quiz.id == quiz_id, Quiz.user_id == current_user.id).first()
+    quiz = await db.scalar(select(Quiz).where(Quiz.id == quiz_id, Quiz.user_id == current_user.id))
     if not quiz:
         raise HTTPException(status_code=404, detail="Quiz not found or not authorized")
 
-    # Get current max question_number
-    max_number = db.query(QuizQuestion.question_number).filter(
-        QuizQuestion.quiz_id == quiz_id
-    ).order_by(QuizQuestion.question_number.desc()).first()
-    next_number = (max_number[0] if max_number else 0) + 1
-
-    added = []
-    for qid in data.question_ids:
-        # Check for duplicates
-        exists = db.query(QuizQuestion).filter(
-            QuizQuestion.quiz_id == quiz_id,
-            QuizQuestion.question_id == qid
-        ).first()
-        if exists:
-            continue 
-
-        quiz_question = QuizQuestion(
-            quiz_id=quiz_id,
-            question_id=qid,
-            question_number=next_number,
-            user_id=current_user.id
-        )
-        db.add(quiz_question)
-        added.append(qid)
-        next_number += 1
+    question_ids = list(dict.fromkeys(data.question_ids))
+    if not question_ids:
+        return {
+            "message": "Added 0 questions to quiz.",
+            "added_question_ids": [],
+            "question_numbers": {},
+            "skipped_question_ids": []
+        }
 
-    db.commit()
+    # The teacher can add their own questions and public ones
+    accessible = or_(Question.user_id == current_user.id, Question.is_public == True)
+    found = (await db.execute(select(Question.id, accessible).where(Question.id.in_(question_ids)))).all()
+    found_ids = {question_id for question_id, _ in found}
+    allowed = {question_id for question_id, is_accessible in found if is_accessible}
+    missing = [qid for qid in question_ids if qid not in found_ids]
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Questions not found: {missing}")
+    forbidden = [qid for qid in question_ids if qid not in allowed]
+    if forbidden:
+        raise HTTPException(status_code=403, detail=f"Not authorized to use questions: {forbidden}")
+
+    # One INSERT ... SELECT: new questions are numbered after the current
+    # last one in request order, questions already in the quiz are skipped
+    requested = func.unnest(literal(question_ids, ARRAY(Integer))).table_valued(
+        "question_id", with_ordinality="requested_order"
+    ).render_derived(name="requested")
+    last_number = select(func.coalesce(func.max(QuizQuestion.question_number), 0)).where(
+        QuizQuestion.quiz_id == quiz_id
+    ).scalar_subquery()
+    already_added = exists().where(QuizQuestion.quiz_id == quiz_id, QuizQuestion.question_id == Question.id)
+    rows = select(
+        literal(quiz_id),
+        Question.id,
+        last_number + func.row_number().over(order_by=requested.c.requested_order),
+        literal(current_user.id)
+    ).select_from(requested).join(
+        Question, Question.id == requested.c.question_id
+    ).where(accessible, ~already_added)
+    stmt = pg_insert(QuizQuestion).from_select(
+        ["quiz_id", "question_id", "question_number", "user_id"], rows
+    ).on_conflict_do_nothing(
+        index_elements=["quiz_id", "question_id"]
+    ).returning(QuizQuestion.question_id, QuizQuestion.question_number)
+    inserted = (await db.execute(stmt)).all()
+    await db.commit()
+
+    numbers = dict(inserted)
+    added = [qid for qid in question_ids if qid in numbers]
     return {
         "message": f"Added {len(added)} questions to quiz.",
-        "added_question_ids": added
+        "added_question_ids": added,
+        "question_numbers": {str(qid): numbers[qid] for qid in added},
+        "skipped_question_ids": [qid for qid in question_ids if qid not in numbers]
     } 
 
 @router.patch("/api/quiz/{quiz_id}", response_model=schemas.QuizCreate)
@@ -192,7 +312,7 @@ def update_quiz(
     quiz_id: int,
     quiz_update: schemas.QuizUpdate,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    current_user: schemas.Principal = Depends(get_current_user)
 ):
     quiz = db.query(Quiz).filter(Quiz.id == quiz_id).first()
     if not quiz:
@@ -212,57 +332,68 @@ def update_quiz(
 async def get_quiz_questions_with_states(
     quiz_id: int,
     include_drafts: bool = False,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.Principal = Depends(get_current_user)
 ):
     try:
-        quiz = db.query(Quiz).filter(Quiz.id == quiz_id, Quiz.user_id == current_user.id).first()
+        quiz = await db.scalar(select(Quiz).where(Quiz.id == quiz_id, Quiz.user_id == current_user.id))
         if not quiz:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Quiz not found or not authorized"
             )
 
-        quiz_questions = db.query(QuizQuestion).filter(QuizQuestion.quiz_id == quiz_id).all()
-
-        all_questions = []
-        for qq_rel in quiz_questions:
-            question = db.query(Question).filter(Question.id == qq_rel.question_id).first()
-            if question is None:
-                continue  # skip if question is missing
-            question_data = {
-                "id": question.id,
-                "question_id": question.id,
-                "title": question.title,
-                "body": question.body,
-                "is_objective": question.is_objective,
-                "answer": question.answer,
-                "choice_body": question.choice_body,
-                "state": question.state.value if hasattr(question.state, 'value') else question.state,
-                "topic": question.topic,
-                "sub_topic": question.sub_topic,
-                "question_number": qq_rel.question_number
-            }
-            all_questions.append(question_data)
-
-        # Group questions by state
+        # One ordered join for the listed questions; states that aren't shown are filtered out in SQL
+        states = [models.QuestionState.active, models.QuestionState.edited]
+        if include_drafts:
+            states.append(models.QuestionState.draft)
+        rows = (await db.execute(select(
+            Question.id,
+            Question.title,
+            Question.body,
+            Question.is_objective,
+            Question.answer,
+            Question.choice_body,
+            Question.state,
+            Question.topic,
+            Question.sub_topic,
+            QuizQuestion.question_number
+        ).join(
+            Question, Question.id == QuizQuestion.question_id
+        ).where(
+            QuizQuestion.quiz_id == quiz_id,
+            Question.state.in_(states)
+        ).order_by(QuizQuestion.question_number, QuizQuestion.id))).all()
+
+        # The total still counts every question of the quiz, whatever its state
+        total = await db.scalar(select(func.count()).select_from(QuizQuestion).join(
+            Question, Question.id == QuizQuestion.question_id
+        ).where(QuizQuestion.quiz_id == quiz_id))
+
         questions_by_state = {
             "active": [],
             "draft": [],
             "edited": []
         }
-        for q_data in all_questions:
-            state = q_data["state"]
-            if state == "active" or (state == "draft" and include_drafts) or state == "edited":
-                questions_by_state[state].append(q_data)
-
-        # Sort by question number within each state
-        for state in questions_by_state:
-            questions_by_state[state].sort(key=lambda x: x.get("question_number", 0))
+        for row in rows:
+            state = row.state.value
+            questions_by_state[state].append({
+                "id": row.id,
+                "question_id": row.id,
+                "title": row.title,
+                "body": row.body,
+                "is_objective": row.is_objective,
+                "answer": row.answer,
+                "choice_body": row.choice_body,
+                "state": state,
+                "topic": row.topic,
+                "sub_topic": row.sub_topic,
+                "question_number": row.question_number
+            })
 
         # Prepare summary
         summary = {
-            "total": len(all_questions),
+            "total": total,
             "active": len(questions_by_state["active"]),
             "draft": len(questions_by_state["draft"]),
             "edited": len(questions_by_state["edited"])
@@ -272,7 +403,7 @@ async def get_quiz_questions_with_states(
         quiz_info = {
             "quiz_id": quiz.id,
             "quiz_title": quiz.title,
-            "question_count": len(all_questions)
+            "question_count": total
         }
 
         return {
@@ -293,36 +424,57 @@ async def get_quiz_questions_with_states(
 @router.get("/api/get_quiz/{quiz_id}")
 async def get_quiz_questions(
     quiz_id: int,
-    db: Session = Depends(get_db)
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db)
 ):
-
-    quiz = db.query(Quiz).filter(Quiz.id == quiz_id).first()
+    tag_stmt = select(Quiz).outerjoin(
+        QuizQuestion, QuizQuestion.quiz_id == Quiz.id
+    ).outerjoin(
+        Question, Question.id == QuizQuestion.question_id
+    ).where(Quiz.id == quiz_id)
+    etag = await async_scope_etag(db, tag_stmt, Quiz.updated_at, Question.updated_at, QuizQuestion.question_number, QuizQuestion.question_id)
+    cached = not_modified(request, response, etag)
+    if cached:
+        return cached
+
+    quiz = await db.scalar(select(Quiz).where(Quiz.id == quiz_id))
     if not quiz:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
                             detail=f"quiz with id {quiz_id} is not found")
 
-    quiz_questions = db.query(QuizQuestion).filter(
-        QuizQuestion.quiz_id == quiz_id).order_by(QuizQuestion.question_number).all()
+    # Active questions in quiz order, in one joined fetch
+    rows = (await db.execute(select(
+        Question.id,
+        Question.title,
+        Question.body,
+        Question.is_objective,
+        Question.topic,
+        Question.sub_topic,
+        Question.answer,
+        Question.choice_body,
+        QuizQuestion.question_number
+    ).join(
+        Question, Question.id == QuizQuestion.question_id
+    ).where(
+        QuizQuestion.quiz_id == quiz_id,
+        Question.state == models.QuestionState.active
+    ).order_by(QuizQuestion.question_number))).all()
 
     questions_data = []
-    for qq in quiz_questions:
-        question = db.query(Question).filter(Question.id == qq.question_id).first()
-        if question is not None:
-            # Ensure state is always a string, not a SQLAlchemy column or expression
-            state = question.state.value if hasattr(question.state, 'value') else str(question.state)
-            if state == "active":
-                is_objective = question.__dict__.get("is_objective", False) == True
-                questions_data.append({
-                    "question_id": question.id,
-                    "question_number": qq.question_number,
-                    "title": question.title,
-                    "body": question.body,
-                    "is_objective": is_objective,
-                    "topic": question.topic,
-                    "sub_topic": question.sub_topic,
-                    "answer": question.answer,
-                    "choice_body": question.choice_body if is_objective else None
-                })
+    for row in rows:
+        is_objective = row.is_objective == True
+        questions_data.append({
+            "question_id": row.id,
+            "question_number": row.question_number,
+            "title": row.title,
+            "body": row.body,
+            "is_objective": is_objective,
+            "topic": row.topic,
+            "sub_topic": row.sub_topic,
+            "answer": row.answer,
+            "choice_body": row.choice_body if is_objective else None
+        })
 
     if not questions_data:
         raise HTTPException(status_code=404, detail="No questions found for this quiz")
@@ -345,41 +497,45 @@ async def get_quiz_questions(
 async def publish_quiz(
     published_quiz: schemas.PublishQuiz,
     task_id: int,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.Principal = Depends(get_current_user)
 ):
-    division = db.query(models.Division).filter(models.Division.id == published_quiz.division_id).first()
+    # Runs in the request, unlike grading and imports: the content is one
+    # snapshot row and the student rows one COPY (app.bulk), a fixed number
+    # of statements whatever the division's size, and the caller gets the
+    # published quiz id back directly
+    division = await db.scalar(select(models.Division).where(models.Division.id == published_quiz.division_id))
     if not division:
         raise HTTPException(status_code=404, detail="Division/class not found")
 
     # Fetch grade and section for division name
-    grade = db.query(models.Grade).filter(models.Grade.id == division.grade_id).first()
+    grade = await db.scalar(select(models.Grade).where(models.Grade.id == division.grade_id))
     if not grade:
         raise HTTPException(status_code=404, detail="Grade not found")
-    section = db.query(models.Section).filter(models.Section.id == division.section_id).first()
+    section = await db.scalar(select(models.Section).where(models.Section.id == division.section_id))
     if not section:
         raise HTTPException(status_code=404, detail="Section not found")
 
-    school = db.query(models.School).filter(models.School.id == division.school_id).first()
+    school = await db.scalar(select(models.School).where(models.School.id == division.school_id))
     if not school:
         raise HTTPException(status_code=404, detail="School not found")
 
-    quiz_main = db.query(models.Quiz).filter(models.Quiz.id == published_quiz.quiz_id).first()
+    quiz_main = await db.scalar(select(models.Quiz).where(models.Quiz.id == published_quiz.quiz_id))
     if not quiz_main:
         raise HTTPException(status_code=404, detail="Quiz not found")
 
     # Fetch subject directly since there is no relationship
-    subject = db.query(models.Subject).filter(models.Subject.id == quiz_main.subject_id).first()
+    subject = await db.scalar(select(models.Subject).where(models.Subject.id == quiz_main.subject_id))
     if not subject:
         raise HTTPException(status_code=404, detail="Subject not found")
 
-    questions = db.query(models.Question, models.QuizQuestion.question_number).join(
+    questions = (await db.execute(select(models.Question, models.QuizQuestion.question_number).join(
         models.QuizQuestion,
         models.QuizQuestion.question_id == models.Question.id
-    ).filter(
+    ).where(
         models.QuizQuestion.quiz_id == quiz_main.id,
         models.Question.state == "active"
-    ).all()
+    ).order_by(models.QuizQuestion.question_number, models.QuizQuestion.id))).all()
 
     question_detail = []
     question_number = 1
@@ -410,9 +566,12 @@ async def publish_quiz(
         "questions": question_detail
     }
 
+    # The content is stored once; the published quiz and the student rows reference it
+    snapshot_id = await snapshots.store(db, quiz_out)
+
     new_quiz = PublishedQuiz(
         user_id=current_user.id,
-        quiz_detail=quiz_out,
+        snapshot_id=snapshot_id,
         quiz_type=published_quiz.quiz_type,
         start_time=published_quiz.start_time,
         duration=published_quiz.duration,
@@ -423,21 +582,21 @@ async def publish_quiz(
     )
 
     db.add(new_quiz)
-    db.commit()
-    db.refresh(new_quiz)
+    await db.commit()
+    await db.refresh(new_quiz)
 
     # Teacher task logic: link published quiz to teacher task if task_id is provided
     if task_id != 0:
-        teacher_task = db.query(models.TeacherTasks).filter(models.TeacherTasks.id == task_id).first()
+        teacher_task = await db.scalar(select(models.TeacherTasks).where(models.TeacherTasks.id == task_id))
         if not teacher_task:
             raise HTTPException(status_code=404, detail=f"Teacher task with id {task_id} not found")
         teacher_task.published_quiz_id = new_quiz.id
-        db.commit()
-        db.refresh(teacher_task)
+        await db.commit()
+        await db.refresh(teacher_task)
 
-    student_details = db.query(models.StudentDivision).filter(models.StudentDivision.division_id == division.id).all()
+    student_details = (await db.scalars(select(models.StudentDivision).where(models.StudentDivision.division_id == division.id))).all()
     student_quiz_data = [{
-        "quiz_detail": new_quiz.quiz_detail,
+        "snapshot_id": snapshot_id,
         "response": {},
         "status": "active",
         "student_id": item.student_id,
@@ -445,12 +604,39 @@ async def publish_quiz(
     } for item in student_details]
 
     if student_quiz_data:
-        db.execute(insert(StudentQuizResponseRel), student_quiz_data)
-        db.commit()
+        await bulk.async_insert_rows(db, StudentQuizResponseRel, student_quiz_data)
+        await db.commit()
 
     return {
         "message": "Quiz published successfully",
         "published_quiz_id": new_quiz.id,
         "quiz_id": new_quiz.quiz_id
-    } 
+    }
+
+
+@router.post("/api/grade_quiz/{published_quiz_id}", response_model=schemas.JobOut, status_code=status.HTTP_202_ACCEPTED)
+def grade_quiz(
+    published_quiz_id: int,
+    partial_credit: bool = True,
+    regrade: bool = False,
+    db: Session = Depends(get_db),
+    current_user: schemas.Principal = Depends(require_role("admin", "teacher", detail="Only admin and teacher users can grade quizzes"))
+):
+    # Scores the objective questions of the submitted responses in the
+    # background (app.grading); with regrade, already graded ones too
+    published = db.get(PublishedQuiz, published_quiz_id)
+    if not published:
+        raise HTTPException(status_code=404, detail="Published quiz not found")
+    if current_user.role != "admin" and published.user_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Not authorized to grade this quiz")
+    job = jobs.submit(db, "grade_quiz", current_user.id, {
+        "published_quiz_id": published_quiz_id, "partial_credit": partial_credit, "regrade": regrade
+    })
+    db.commit()
+    db.refresh(job)
+    return job
+
 
+@jobs.handler("grade_quiz")
+def _grade_quiz_job(job: jobs.JobContext, payload: dict) -> dict:
+    return grading.grade_published_quiz(job, payload["published_quiz_id"], payload["partial_credit"], payload["regrade"])
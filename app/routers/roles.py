@@ -1,7 +1,8 @@
-from fastapi import APIRouter, Depends, HTTPException, status   
+from fastapi import APIRouter, Depends, HTTPException, status, Response
 from sqlalchemy.orm import Session
 from app import models, schemas
 from app.database import get_db
+from app import refcache
 from pydantic import BaseModel
 from sqlalchemy import select
 
@@ -19,11 +20,12 @@ def create_role(role: schemas.RoleCreate, db: Session = Depends(get_db)):
         raise HTTPException(status_code=400, detail="Role already exists")
     db_role = models.UserRole(name=role.name, description=role.description)
     db.add(db_role)
+    refcache.publish_invalidation(db, refcache.roles)
     db.commit()
     db.refresh(db_role)
+    refcache.roles.invalidate()
     return db_role
 
 @router.get("/api/get_roles", response_model=list[schemas.RoleOut])
-def get_roles(db: Session = Depends(get_db)):
-    roles = db.query(models.UserRole).all()
-    return roles
+def get_roles():
+    return Response(content=refcache.roles.body(), media_type="application/json")
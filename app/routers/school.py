@@ -1,8 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from sqlalchemy.orm import Session
 from app import models, schemas
 from app.database import get_db
-from app.auth2 import get_current_user
+from app.auth2 import require_role
+from app.pagination import PageParams, NEXT_CURSOR_HEADER
+from app import refcache
+from app.etag import etag_matches
+import orjson
+from typing import Optional
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy import select
 
@@ -13,34 +18,42 @@ router = APIRouter()
 def create_school(
     school: schemas.SchoolCreate,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    current_user: schemas.Principal = Depends(require_role("admin", detail="Not enough permissions"))
 ):
-    # Get the user's role relationship from the database
-    user_role_rel = db.query(models.UserRoleRel).filter(models.UserRoleRel.user_id == current_user.id).first()
-    if not user_role_rel:
-        raise HTTPException(status_code=403, detail="User does not have a role assigned")
-    # Fetch the actual role object
-    role = db.query(models.UserRole).filter(models.UserRole.id == user_role_rel.role_id).first()
-    # Only allow access if the user is an admin
-    if not role or role.name.lower() != "admin":
-        raise HTTPException(status_code=403, detail="Not enough permissions")
     # Create the school
     new_school = models.School(**school.model_dump())
     try:
         db.add(new_school)
+        refcache.publish_invalidation(db, refcache.schools)
         db.commit()
         db.refresh(new_school)
     except IntegrityError:
         db.rollback()
         raise HTTPException(status_code=400, detail="A school with this email already exists.")
+    refcache.schools.invalidate()
     return new_school
 
 
 
 @router.get("/api/get_schools", response_model=list[schemas.SchoolOut])
-def get_schools(db: Session = Depends(get_db)):
-    schools = db.query(models.School).all()
-    return schools
+def get_schools(
+    request: Request,
+    city: Optional[str] = None,
+    state: Optional[str] = None,
+    page: PageParams = Depends()
+):
+    # Served from the in-process reference cache, filtered and paged in memory
+    etag = refcache.schools.etag()
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    predicate = None
+    if city or state:
+        predicate = lambda row: (not city or row["city"] == city) and (not state or row["state"] == state)
+    schools, next_cursor = refcache.schools.page(page.after_id, page.limit, predicate)
+    headers = {"ETag": etag}
+    if next_cursor is not None:
+        headers[NEXT_CURSOR_HEADER] = str(next_cursor)
+    return Response(content=orjson.dumps(schools), media_type="application/json", headers=headers)
 
 
 @router.patch("/api/update_school/{school_id}", response_model=schemas.SchoolOut)
@@ -48,17 +61,8 @@ def update_school(
     school_id: int,
     school_update: schemas.SchoolUpdate,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    current_user: schemas.Principal = Depends(require_role("admin", detail="Not enough permissions"))
 ):
-    # Check permissions - only admin can update schools
-    user_role_rel = db.query(models.UserRoleRel).filter(models.UserRoleRel.user_id == current_user.id).first()
-    if not user_role_rel:
-        raise HTTPException(status_code=403, detail="User does not have a role assigned")
-    
-    role = db.query(models.UserRole).filter(models.UserRole.id == user_role_rel.role_id).first()
-    if not role or role.name.lower() != "admin":
-        raise HTTPException(status_code=403, detail="Not enough permissions")
-    
     # Get the school to update
     school = db.query(models.School).filter(models.School.id == school_id).first()
     if not school:
@@ -69,8 +73,10 @@ def update_school(
     for field, value in update_data.items():
         setattr(school, field, value)
     
+    refcache.publish_invalidation(db, refcache.schools)
     db.commit()
     db.refresh(school)
+    refcache.schools.invalidate()
     return school
 
 
@@ -79,17 +85,8 @@ def put_school(
     school_id: int,
     school_update: schemas.SchoolCreate,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    current_user: schemas.Principal = Depends(require_role("admin", detail="Not enough permissions"))
 ):
-    # Check permissions - only admin can update schools
-    user_role_rel = db.query(models.UserRoleRel).filter(models.UserRoleRel.user_id == current_user.id).first()
-    if not user_role_rel:
-        raise HTTPException(status_code=403, detail="User does not have a role assigned")
-    
-    role = db.query(models.UserRole).filter(models.UserRole.id == user_role_rel.role_id).first()
-    if not role or role.name.lower() != "admin":
-        raise HTTPException(status_code=403, detail="Not enough permissions")
-    
     # Get the school to update
     school = db.query(models.School).filter(models.School.id == school_id).first()
     if not school:
@@ -100,6 +97,8 @@ def put_school(
     for field, value in school_data.items():
         setattr(school, field, value)
     
+    refcache.publish_invalidation(db, refcache.schools)
     db.commit()
     db.refresh(school)
+    refcache.schools.invalidate()
     return school
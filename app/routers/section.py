@@ -1,9 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Response
 from sqlalchemy.orm import Session
 from app import models, schemas
 from app.database import get_db
 from sqlalchemy.exc import IntegrityError
-from app.auth2 import get_current_user
+from app.auth2 import require_role
+from app import refcache
 from typing import List
 
 router = APIRouter()
@@ -12,21 +13,20 @@ router = APIRouter()
 def add_section(
     section: schemas.SectionCreate,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    current_user: schemas.Principal = Depends(require_role("admin", detail="Not authorized"))
 ):
-    # Only admin can add section
-    if current_user.role != "admin":
-        raise HTTPException(status_code=403, detail="Not authorized")
     new_section = models.Section(**section.model_dump())
     try:
         db.add(new_section)
+        refcache.publish_invalidation(db, refcache.sections)
         db.commit()
         db.refresh(new_section)
     except IntegrityError:
         db.rollback()
         raise HTTPException(status_code=400, detail="A section with this name already exists.")
+    refcache.sections.invalidate()
     return new_section
 
 @router.get("/api/get_sections", response_model=List[schemas.SectionOut])
-def get_sections(db: Session = Depends(get_db)):
-    return db.query(models.Section).all()
+def get_sections():
+    return Response(content=refcache.sections.body(), media_type="application/json")
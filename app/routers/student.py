@@ -1,8 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Response
 from sqlalchemy.orm import Session
-from app import models, schemas
+from app import models, schemas, daytable, bulk
 from app.database import get_db
-from app.auth2 import get_current_user
+from app.auth2 import require_role
+from app.pagination import PageParams, paginate
+from app.export import ExportFormat, stream_export
+from typing import Optional
 
 router = APIRouter()
 
@@ -10,17 +13,8 @@ router = APIRouter()
 def create_student(
     student: schemas.StudentCreate,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    current_user: schemas.Principal = Depends(require_role("student", detail="Must be a student"))
 ):
-    # Role check (allow only students)
-    allowed_roles = ["student"]
-    user_role_rel = db.query(models.UserRoleRel).filter(models.UserRoleRel.user_id == current_user.id).first()
-    if not user_role_rel:
-        raise HTTPException(status_code=403, detail="User does not have a role assigned")
-    role = db.query(models.UserRole).filter(models.UserRole.id == user_role_rel.role_id).first()
-    if not role or role.name.lower() not in allowed_roles:
-        raise HTTPException(status_code=403, detail="Must be a student")
-
     # School validation
     school = db.query(models.School).filter(models.School.id == student.school_id).first()
     if not school:
@@ -51,16 +45,15 @@ def create_student(
         db.add(student_division)
         # Assign all subjects of the division to the student
         all_division_subjects = db.query(models.DivisionSubject).filter(models.DivisionSubject.division_id == division.id).all()
-        student_subject_rels = [
-            models.StudentSubjectRel(
-                student_id=db_student.id,
-                subject_id=div_sub.subject_id,
-                division_id=division.id,
-                is_active=True
-            )
+        bulk.insert_rows(db, models.StudentSubjectRel, [
+            {
+                "student_id": db_student.id,
+                "subject_id": div_sub.subject_id,
+                "division_id": division.id,
+                "is_active": True
+            }
             for div_sub in all_division_subjects
-        ]
-        db.add_all(student_subject_rels)
+        ])
         db.commit()
         db.refresh(db_student)
     except Exception as e:
@@ -87,20 +80,8 @@ def create_student(
         "section_name": section.name if section else None,
     }
 
-@router.get("/api/get_students", response_model=list[schemas.StudentOut])
-def get_students(
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
-):
-    # Allow only admin and teacher
-    user_role_rel = db.query(models.UserRoleRel).filter(models.UserRoleRel.user_id == current_user.id).first()
-    if not user_role_rel:
-        raise HTTPException(status_code=403, detail="User does not have a role assigned")
-    role = db.query(models.UserRole).filter(models.UserRole.id == user_role_rel.role_id).first()
-    if not role or role.name.lower() not in ["admin", "teacher"]:
-        raise HTTPException(status_code=403, detail="Only admin and teacher users can view students")
-
-    students = db.query(
+def _students_query(db: Session, school_id: Optional[int], division_id: Optional[int], academic_year: Optional[str]):
+    query = db.query(
         models.Student,
         models.School,
         models.StudentDivision,
@@ -117,41 +98,65 @@ def get_students(
         models.Grade, models.Division.grade_id == models.Grade.id
     ).outerjoin(
         models.Section, models.Division.section_id == models.Section.id
-    ).all()
+    )
+    if school_id is not None:
+        query = query.filter(models.Student.school_id == school_id)
+    if division_id is not None:
+        query = query.filter(models.StudentDivision.division_id == division_id)
+    if academic_year:
+        query = query.filter(models.Division.academic_year == academic_year)
+    return query
+
+
+def _student_record(row) -> dict:
+    student, school, student_division, division, grade, section = row
+    return {
+        "id": student.id,
+        "display_name": f"{student.first_name} {student.last_name}",
+        "email": student.email,
+        "created_at": student.created_at,
+        "updated_at": student.updated_at,
+        "school_id": student.school_id,
+        "school_name": school.name if school else None,
+        "division_id": division.id if division else None,
+        "grade_id": grade.id if grade else None,
+        "section_id": section.id if section else None,
+        "grade_name": grade.name if grade else None,
+        "section_name": section.name if section else None
+    }
+
+@router.get("/api/get_students", response_model=list[schemas.StudentOut])
+def get_students(
+    response: Response,
+    school_id: Optional[int] = None,
+    division_id: Optional[int] = None,
+    academic_year: Optional[str] = None,
+    stream: Optional[ExportFormat] = None,
+    page: PageParams = Depends(),
+    db: Session = Depends(get_db),
+    current_user: schemas.Principal = Depends(require_role("admin", "teacher", detail="Only admin and teacher users can view students"))
+):
+    # Bulk export: every matching row, streamed in id order from a server-side cursor
+    if stream:
+        return stream_export(
+            stream,
+            lambda export_db: _students_query(export_db, school_id, division_id, academic_year).order_by(models.Student.id),
+            _student_record,
+            fields=list(schemas.StudentOut.model_fields),
+            filename="students"
+        )
 
-    result = []
-    for student, school, division, grade, section in students:
-        result.append({
-            "id": student.id,
-            "display_name": f"{student.first_name} {student.last_name}",
-            "email": student.email,
-            "created_at": student.created_at,
-            "updated_at": student.updated_at,
-            "school_id": student.school_id,
-            "school_name": school.name if school else None,
-            "division_id": division.id if division else None,
-            "grade_id": grade.id if grade else None,
-            "section_id": section.id if section else None,
-            "grade_name": grade.name if grade else None,
-            "section_name": section.name if section else None
-        })
-    return result
+    query = _students_query(db, school_id, division_id, academic_year)
+    students = paginate(query, models.Student.id, page, response, row_id=lambda row: row.Student.id)
+    return [_student_record(row) for row in students]
 
 @router.patch("/api/update_student/{student_id}", response_model=schemas.StudentOut)
 def update_student(
     student_id: int,
     student_update: schemas.StudentUpdate,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    current_user: schemas.Principal = Depends(require_role("student", detail="Not enough permissions"))
 ):
-    # Get the user's role relationship from the database
-    user_role_rel = db.query(models.UserRoleRel).filter(models.UserRoleRel.user_id == current_user.id).first()
-    if not user_role_rel:
-        raise HTTPException(status_code=403, detail="User does not have a role assigned")
-    role = db.query(models.UserRole).filter(models.UserRole.id == user_role_rel.role_id).first()
-    # Allow access if the user is student
-    if not role or role.name.lower() != "student":
-        raise HTTPException(status_code=403, detail="Not enough permissions")
     # Get the student record
     db_student = db.query(models.Student).filter(models.Student.id == student_id, models.Student.user_id == current_user.id).first()
     if not db_student:
@@ -186,7 +191,10 @@ def update_student(
             is_current=True
         )
         db.add(student_division)
+        # The current-class lookup caches the student's division
+        daytable.publish_invalidation(db, daytable.user_key(current_user.id))
         db.commit()
+        daytable.invalidate(daytable.user_key(current_user.id))
     # Get grade and section names
     student_division = db.query(models.StudentDivision).filter(models.StudentDivision.student_id == db_student.id, models.StudentDivision.is_current == True).first()
     division = db.query(models.Division).filter(models.Division.id == student_division.division_id).first() if student_division else None
@@ -205,16 +213,8 @@ def update_student(
 def add_subject_to_student(
     payload: schemas.AddSubjects,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    current_user: schemas.Principal = Depends(require_role("admin", "student", detail="Only admin or student users can add subjects to a student."))
 ):
-    # Get the user's role relationship from the database
-    user_role_rel = db.query(models.UserRoleRel).filter(models.UserRoleRel.user_id == current_user.id).first()
-    if not user_role_rel:
-        raise HTTPException(status_code=403, detail="User does not have a role assigned")
-    role = db.query(models.UserRole).filter(models.UserRole.id == user_role_rel.role_id).first()
-    # Allow access if the user is admin or student (case-insensitive)
-    if not role or role.name.lower() not in ["admin", "student"]:
-        raise HTTPException(status_code=403, detail="Only admin or student users can add subjects to a student.")
     # Check if student exists
     student = db.query(models.Student).filter(models.Student.id == payload.student_id).first()
     if not student:
@@ -0,0 +1,191 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from datetime import datetime
+from app import models, schemas, snapshots, autosave
+from app.database import get_async_db
+from app.auth2 import require_role
+from app.models import PublishedQuiz, StudentQuizResponseRel
+
+router = APIRouter(
+    tags=['Student Quiz']
+)
+
+# Fields of the published questions that students must not see
+HIDDEN_QUESTION_FIELDS = ("answer", "baseline_answer")
+
+student_only = require_role("student", detail="Only students can take quizzes")
+
+
+def _student_view(quiz_detail: dict) -> dict:
+    return {
+        **quiz_detail,
+        "questions": [
+            {key: value for key, value in question.items() if key not in HIDDEN_QUESTION_FIELDS}
+            for question in quiz_detail.get("questions", [])
+        ]
+    }
+
+
+async def _attempt_row(db: AsyncSession, attempt_id: int, current_user: schemas.Principal):
+    # The attempt and its published quiz, if the attempt belongs to the current student
+    row = (await db.execute(
+        select(StudentQuizResponseRel, PublishedQuiz)
+        .join(PublishedQuiz, PublishedQuiz.id == StudentQuizResponseRel.quiz_rel_id)
+        .join(models.Student, models.Student.id == StudentQuizResponseRel.student_id)
+        .where(StudentQuizResponseRel.id == attempt_id, models.Student.user_id == current_user.id)
+    )).first()
+    if row is None:
+        raise HTTPException(status_code=404, detail="Quiz not found")
+    attempt, published = row
+    if attempt.is_submitted:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Quiz already submitted")
+    return attempt, published
+
+
+def _check_started(published: PublishedQuiz):
+    now = datetime.now()
+    if now < published.start_time:
+        raise HTTPException(status_code=403, detail="Quiz has not started yet")
+
+
+async def _remember(db: AsyncSession, attempt: StudentQuizResponseRel, published: PublishedQuiz, user_id: int) -> tuple[autosave.Attempt, dict]:
+    quiz_detail = await snapshots.quiz_detail_of(db, attempt) or {}
+    question_ids = frozenset(str(question["id"]) for question in quiz_detail.get("questions", []))
+    entry = autosave.Attempt(attempt.id, user_id, published.end_time, question_ids)
+    autosave.buffer.remember(entry)
+    return entry, quiz_detail
+
+
+async def _open_attempt(db: AsyncSession, attempt_id: int, current_user: schemas.Principal) -> autosave.Attempt:
+    # Saves are checked against the buffer's copy of the attempt; only the
+    # first save of an attempt on this worker reads the database
+    entry = autosave.buffer.attempt(attempt_id)
+    if entry is None or entry.user_id != current_user.id:
+        attempt, published = await _attempt_row(db, attempt_id, current_user)
+        _check_started(published)
+        entry, _ = await _remember(db, attempt, published, current_user.id)
+    if not entry.open():
+        raise HTTPException(status_code=403, detail="Quiz has ended")
+    return entry
+
+
+def _check_answers(entry: autosave.Attempt, answers: dict):
+    unknown = sorted(set(answers) - entry.question_ids)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Questions {unknown} are not part of this quiz")
+
+
+@router.get("/api/student/quizzes", response_model=List[schemas.StudentQuizOut])
+async def get_student_quizzes(
+    include_submitted: bool = True,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.Principal = Depends(student_only)
+):
+    query = select(
+        StudentQuizResponseRel.id, StudentQuizResponseRel.snapshot_id, StudentQuizResponseRel.quiz_detail,
+        StudentQuizResponseRel.status, StudentQuizResponseRel.is_submitted, StudentQuizResponseRel.submitted_at,
+        StudentQuizResponseRel.score, StudentQuizResponseRel.max_score,
+        PublishedQuiz.id.label("published_quiz_id"), PublishedQuiz.quiz_type, PublishedQuiz.start_time,
+        PublishedQuiz.end_time, PublishedQuiz.duration
+    ).join(
+        PublishedQuiz, PublishedQuiz.id == StudentQuizResponseRel.quiz_rel_id
+    ).join(
+        models.Student, models.Student.id == StudentQuizResponseRel.student_id
+    ).where(models.Student.user_id == current_user.id)
+    if not include_submitted:
+        query = query.where(StudentQuizResponseRel.is_submitted == False)
+    rows = (await db.execute(query.order_by(PublishedQuiz.start_time.desc(), StudentQuizResponseRel.id.desc()))).all()
+
+    quizzes = []
+    for row in rows:
+        quiz_detail = await snapshots.quiz_detail_of(db, row) or {}
+        quizzes.append(schemas.StudentQuizOut(
+            attempt_id=row.id,
+            published_quiz_id=row.published_quiz_id,
+            title=quiz_detail.get("title"),
+            subject_name=quiz_detail.get("subject_name"),
+            quiz_type=row.quiz_type,
+            start_time=row.start_time,
+            end_time=row.end_time,
+            duration=row.duration,
+            status=row.status,
+            is_submitted=row.is_submitted,
+            submitted_at=row.submitted_at,
+            score=row.score,
+            max_score=row.max_score
+        ))
+    return quizzes
+
+
+@router.post("/api/student/quizzes/{attempt_id}/start", response_model=schemas.StudentQuizAttemptOut)
+async def start_quiz_attempt(
+    attempt_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.Principal = Depends(student_only)
+):
+    # Also resumes an attempt: the answers saved so far come back with the quiz
+    attempt, published = await _attempt_row(db, attempt_id, current_user)
+    _check_started(published)
+    entry, quiz_detail = await _remember(db, attempt, published, current_user.id)
+    if not entry.open():
+        raise HTTPException(status_code=403, detail="Quiz has ended")
+
+    response = {**(attempt.response or {}), **autosave.buffer.pending(attempt_id)}
+    if attempt.status != "in_progress":
+        attempt.status = "in_progress"
+        await db.commit()
+    return schemas.StudentQuizAttemptOut(
+        attempt_id=attempt_id,
+        status="in_progress",
+        deadline=published.end_time,
+        quiz=_student_view(quiz_detail),
+        response=response
+    )
+
+
+@router.patch("/api/student/quizzes/{attempt_id}/answers", response_model=schemas.StudentQuizSaveOut, status_code=status.HTTP_202_ACCEPTED)
+async def save_quiz_answers(
+    attempt_id: int,
+    data: schemas.StudentQuizAnswers,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.Principal = Depends(student_only)
+):
+    # Autosave: only the changed answers; they are buffered and written
+    # with the other attempts' answers within a few seconds. A submitted
+    # attempt gets 409 once every worker has heard of the submit; a 202
+    # means buffered, not kept (app.autosave)
+    entry = await _open_attempt(db, attempt_id, current_user)
+    _check_answers(entry, data.answers)
+    autosave.buffer.save(attempt_id, data.answers)
+    return schemas.StudentQuizSaveOut(attempt_id=attempt_id, saved=len(data.answers))
+
+
+@router.post("/api/student/quizzes/{attempt_id}/submit", response_model=schemas.StudentQuizSubmitOut)
+async def submit_quiz_attempt(
+    attempt_id: int,
+    data: Optional[schemas.StudentQuizAnswers] = None,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.Principal = Depends(student_only)
+):
+    # `data` carries the answers not yet autosaved; they are merged with the
+    # buffered ones in the same UPDATE that marks the attempt submitted
+    # (app.autosave)
+    attempt, published = await _attempt_row(db, attempt_id, current_user)
+    _check_started(published)
+    entry, _ = await _remember(db, attempt, published, current_user.id)
+    if not entry.open():
+        raise HTTPException(status_code=403, detail="Quiz has ended")
+    answers = data.answers if data else {}
+    _check_answers(entry, answers)
+
+    submitted = await autosave.buffer.submit(db, attempt_id, answers)
+    if submitted is None:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Quiz already submitted")
+    return schemas.StudentQuizSubmitOut(
+        attempt_id=attempt_id,
+        status="submitted",
+        submitted_at=submitted.submitted_at,
+        answered=len(submitted.response or {})
+    )
@@ -1,10 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Request, Response
 from sqlalchemy.orm import Session
 from app import models, schemas
 from app.database import get_db
 from sqlalchemy.exc import IntegrityError
-from app.auth2 import get_current_user
-from typing import List
+from app.auth2 import require_role
+from typing import List, Optional
+from app.pagination import PageParams, paginate
+from app.etag import scope_etag, not_modified
 
 router = APIRouter()
 
@@ -12,17 +14,8 @@ router = APIRouter()
 def add_subject_topic(
     subject_topic: schemas.SubjectTopicCreate,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    current_user: schemas.Principal = Depends(require_role("admin", "teacher", detail="Only admin and teacher users can create subject topics"))
 ):
-    # Role check - only admin can add subject topics
-    user_role_rel = db.query(models.UserRoleRel).filter(models.UserRoleRel.user_id == current_user.id).first()
-    if not user_role_rel:
-        raise HTTPException(status_code=403, detail="User does not have a role assigned")
-    
-    role = db.query(models.UserRole).filter(models.UserRole.id == user_role_rel.role_id).first()
-    if not role or role.name.lower() not in ["admin", "teacher"]:
-        raise HTTPException(status_code=403, detail="Only admin and teacher users can create subject topics")
-    
     # Validate subject exists
     subject = db.query(models.Subject).filter(models.Subject.id == subject_topic.subject_id).first()
     if not subject:
@@ -78,19 +71,16 @@ def add_subject_topic(
 
 @router.get("/api/get_subject_topics", response_model=List[schemas.SubjectTopicOut])
 def get_subject_topics(
+    request: Request,
+    response: Response,
+    subject_id: Optional[int] = None,
+    board_id: Optional[int] = None,
+    grade_id: Optional[int] = None,
+    page: PageParams = Depends(),
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    current_user: schemas.Principal = Depends(require_role("admin", "teacher", detail="Only admin users can view subject topics"))
 ):
-    # Role check - only admin can view subject topics
-    user_role_rel = db.query(models.UserRoleRel).filter(models.UserRoleRel.user_id == current_user.id).first()
-    if not user_role_rel:
-        raise HTTPException(status_code=403, detail="User does not have a role assigned")
-    
-    role = db.query(models.UserRole).filter(models.UserRole.id == user_role_rel.role_id).first()
-    if not role or role.name.lower() not in ["admin" , "teacher"]:
-        raise HTTPException(status_code=403, detail="Only admin users can view subject topics")
-    
-    subject_topics = db.query(
+    query = db.query(
         models.SubjectTopic,
         models.Subject,
         models.Board,
@@ -101,7 +91,17 @@ def get_subject_topics(
         models.Board, models.SubjectTopic.board_id == models.Board.id
     ).join(
         models.Grade, models.SubjectTopic.grade_id == models.Grade.id
-    ).all()
+    )
+    if subject_id is not None:
+        query = query.filter(models.SubjectTopic.subject_id == subject_id)
+    if board_id is not None:
+        query = query.filter(models.SubjectTopic.board_id == board_id)
+    if grade_id is not None:
+        query = query.filter(models.SubjectTopic.grade_id == grade_id)
+    cached = not_modified(request, response, scope_etag(query, models.SubjectTopic.updated_at, models.Subject.updated_at, models.Board.updated_at, models.Grade.updated_at))
+    if cached:
+        return cached
+    subject_topics = paginate(query, models.SubjectTopic.id, page, response, row_id=lambda row: row.SubjectTopic.id)
     result = []
     for topic, subject, board, grade in subject_topics:
         result.append({
@@ -1,8 +1,9 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Response
 from sqlalchemy.orm import Session
 from app import models, schemas
 from app.database import get_db
-from app.auth2 import get_current_user
+from app.auth2 import require_role
+from app import refcache
 from typing import List
 from sqlalchemy import select
 
@@ -12,17 +13,8 @@ router = APIRouter()
 def create_subject(
     subject: schemas.SubjectCreate, 
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    current_user: schemas.Principal = Depends(require_role("admin", detail="Only admin users are allowed to add subject details"))
 ):
-    # Get the user's role relationship from the database
-    user_role_rel = db.query(models.UserRoleRel).filter(models.UserRoleRel.user_id == current_user.id).first()
-    if not user_role_rel:
-        raise HTTPException(status_code=403, detail="User does not have a role assigned")
-    role = db.query(models.UserRole).filter(models.UserRole.id == user_role_rel.role_id).first()
-    # Allow access if the user is teacher
-    if not role or role.name.lower() != "admin":
-      raise HTTPException(status_code=403, detail="Only admin users are allowed to add subject details")
-
     # Check for existing subject with the same name or code
     existing_subject = db.query(models.Subject).filter(
         (models.Subject.name == subject.name) |
@@ -33,14 +25,15 @@ def create_subject(
     
     db_subject = models.Subject(**subject.model_dump())
     db.add(db_subject)
+    refcache.publish_invalidation(db, refcache.subjects)
     db.commit()
     db.refresh(db_subject)
+    refcache.subjects.invalidate()
     return db_subject
 
 @router.get("/api/get_subjects", response_model=List[schemas.SubjectOut])
-def get_subjects(db: Session = Depends(get_db)):
-    subjects = db.query(models.Subject).all()
-    return subjects
+def get_subjects():
+    return Response(content=refcache.subjects.body(), media_type="application/json")
 
 
     
@@ -1,10 +1,15 @@
 from fastapi import APIRouter
-from app.database import get_db
-from app import models, schemas
-from fastapi import Depends, HTTPException, status
-from app.auth2 import get_current_user
+from app.database import get_db, get_async_db
+from app import models, schemas, daytable
+from fastapi import Depends, HTTPException, status, Response
+from app.auth2 import get_current_user, require_role
 from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.models import TeacherDivision, Subject
+from app.pagination import PageParams, paginate
+from app.export import ExportFormat, stream_export
+from typing import Optional
 from .. import schemas 
 from app.schemas import QuizDetails, QuizGenerationStatus
 from app.schemas import TeacherTaskWithQuizOut
@@ -15,25 +20,16 @@ router = APIRouter()
 @router.post("/api/add_teacher_details", response_model=schemas.TeacherOut, status_code=201)
 async def create_teacher(
     create_teacher: schemas.TeacherCreate,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.Principal = Depends(require_role("teacher", detail="Not enough permissions"))
 ):
-    # Get the user's role relationship from the database
-    user_role_rel = db.query(models.UserRoleRel).filter(models.UserRoleRel.user_id == current_user.id).first()
-    if not user_role_rel:
-        raise HTTPException(status_code=403, detail="User does not have a role assigned")
-    role = db.query(models.UserRole).filter(models.UserRole.id == user_role_rel.role_id).first()
-    # Allow access if the user is teacher
-    if not role or role.name.lower() not in ["teacher"]:
-        raise HTTPException(status_code=403, detail="Not enough permissions")
-    
     # Check for existing teacher with the same email
-    existing_teacher = db.query(models.Teacher).filter(models.Teacher.email == create_teacher.email).first()
+    existing_teacher = await db.scalar(select(models.Teacher).where(models.Teacher.email == create_teacher.email))
     if existing_teacher:
         raise HTTPException(status_code=400, detail="A teacher with this email already exists.")
     
     # Find school by id
-    school = db.query(models.School).filter(models.School.id == create_teacher.school_id).first()
+    school = await db.scalar(select(models.School).where(models.School.id == create_teacher.school_id))
     if not school:
         raise HTTPException(
             status_code=404, 
@@ -41,7 +37,7 @@ async def create_teacher(
         )
     
     # Check if teacher profile already exists for this user
-    teacher = db.query(models.Teacher).filter(models.Teacher.user_id == current_user.id).first()
+    teacher = await db.scalar(select(models.Teacher).where(models.Teacher.user_id == current_user.id))
     if teacher:
         raise HTTPException(
             status_code=403,
@@ -54,11 +50,11 @@ async def create_teacher(
     new_teacher = models.Teacher(school_id=school.id, user_id=current_user.id, **teacher_data)
     
     db.add(new_teacher)
-    db.commit()
-    db.refresh(new_teacher)
+    await db.commit()
+    await db.refresh(new_teacher)
     
     # Get school name for response
-    school = db.query(models.School).filter(models.School.id == new_teacher.school_id).first()
+    school = await db.scalar(select(models.School).where(models.School.id == new_teacher.school_id))
     
     return {
         "id": new_teacher.id,
@@ -70,41 +66,56 @@ async def create_teacher(
         "school_name": school.name if school else None
     }
 
-@router.get("/api/get_teachers", response_model=list[schemas.TeacherOut])
-def get_teachers(db: Session = Depends(get_db)):
-    teachers = db.query(
+def _teachers_query(db: Session, school_id: Optional[int]):
+    query = db.query(
         models.Teacher,
         models.School
-    ).join(models.School, models.Teacher.school_id == models.School.id).all()
-    result = []
-    for teacher, school in teachers:
-        result.append({
-            "id": teacher.id,
-            "full_name": f"{teacher.first_name} {teacher.last_name}",
-            "email": teacher.email,
-            "created_at": teacher.created_at,
-            "updated_at": teacher.updated_at,
-            "school_id": teacher.school_id,
-            "school_name": school.name if school else None
-        })
-    return result
+    ).join(models.School, models.Teacher.school_id == models.School.id)
+    if school_id is not None:
+        query = query.filter(models.Teacher.school_id == school_id)
+    return query
+
+
+def _teacher_record(row) -> dict:
+    teacher, school = row
+    return {
+        "id": teacher.id,
+        "full_name": f"{teacher.first_name} {teacher.last_name}",
+        "email": teacher.email,
+        "created_at": teacher.created_at,
+        "updated_at": teacher.updated_at,
+        "school_id": teacher.school_id,
+        "school_name": school.name if school else None
+    }
+
+@router.get("/api/get_teachers", response_model=list[schemas.TeacherOut])
+def get_teachers(
+    response: Response,
+    school_id: Optional[int] = None,
+    stream: Optional[ExportFormat] = None,
+    page: PageParams = Depends(),
+    db: Session = Depends(get_db)
+):
+    # Bulk export: every matching row, streamed in id order from a server-side cursor
+    if stream:
+        return stream_export(
+            stream,
+            lambda export_db: _teachers_query(export_db, school_id).order_by(models.Teacher.id),
+            _teacher_record,
+            fields=list(schemas.TeacherOut.model_fields),
+            filename="teachers"
+        )
+
+    teachers = paginate(_teachers_query(db, school_id), models.Teacher.id, page, response, row_id=lambda row: row.Teacher.id)
+    return [_teacher_record(row) for row in teachers]
 
 @router.patch("/api/update_teacher/{teacher_id}", response_model=schemas.TeacherOut)
 def update_teacher(
     teacher_id: int,
     teacher_update: schemas.TeacherUpdate,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    current_user: schemas.Principal = Depends(require_role("teacher", detail="Not enough permissions"))
 ):
-    # Check permissions - only teacher can update their own details
-    user_role_rel = db.query(models.UserRoleRel).filter(models.UserRoleRel.user_id == current_user.id).first()
-    if not user_role_rel:
-        raise HTTPException(status_code=403, detail="User does not have a role assigned")
-    
-    role = db.query(models.UserRole).filter(models.UserRole.id == user_role_rel.role_id).first()
-    if not role or role.name.lower() not in ["teacher"]:
-        raise HTTPException(status_code=403, detail="Not enough permissions")
-    
     # Get the teacher to update (only if owned by current user)
     db_teacher = db.query(models.Teacher).filter(models.Teacher.id == teacher_id, models.Teacher.user_id == current_user.id).first()
     if not db_teacher:
@@ -115,7 +126,13 @@ def update_teacher(
     for field, value in update_data.items():
         setattr(db_teacher, field, value)
     
+    # Teacher names are part of the cached day timetables
+    renamed = "first_name" in update_data or "last_name" in update_data
+    if renamed:
+        daytable.publish_invalidation(db)
     db.commit()
+    if renamed:
+        daytable.invalidate()
     db.refresh(db_teacher)
     return db_teacher
 
@@ -124,17 +141,8 @@ def put_teacher(
     teacher_id: int,
     teacher_update: schemas.TeacherCreate,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    current_user: schemas.Principal = Depends(require_role("admin", "teacher", detail="Not enough permissions"))
 ):
-    # Check permissions - only teacher can update their own details
-    user_role_rel = db.query(models.UserRoleRel).filter(models.UserRoleRel.user_id == current_user.id).first()
-    if not user_role_rel:
-        raise HTTPException(status_code=403, detail="User does not have a role assigned")
-    
-    role = db.query(models.UserRole).filter(models.UserRole.id == user_role_rel.role_id).first()
-    if not role or role.name.lower() not in ["admin", "teacher"]:
-        raise HTTPException(status_code=403, detail="Not enough permissions")
-    
     # Get the teacher to update (only if owned by current user)
     db_teacher = db.query(models.Teacher).filter(models.Teacher.id == teacher_id, models.Teacher.user_id == current_user.id).first()
     if not db_teacher:
@@ -145,27 +153,21 @@ def put_teacher(
     for field, value in teacher_data.items():
         setattr(db_teacher, field, value)
     
+    # Teacher names are part of the cached day timetables
+    daytable.publish_invalidation(db)
     db.commit()
+    daytable.invalidate()
     db.refresh(db_teacher)
     return db_teacher
 
 @router.post("/api/add_teacher_division", response_model=dict)
 async def add_teacher_division(
     teacher_division: schemas.AddTeacherDivision,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.Principal = Depends(require_role("admin", "teacher", detail="Only admin users can assign teachers to divisions"))
 ):
-    # Get the user's role relationship from the database
-    user_role_rel = db.query(models.UserRoleRel).filter(models.UserRoleRel.user_id == current_user.id).first()
-    if not user_role_rel:
-        raise HTTPException(status_code=403, detail="User does not have a role assigned")
-    role = db.query(models.UserRole).filter(models.UserRole.id == user_role_rel.role_id).first()
-    # Allow access if the user is admin only
-    if not role or role.name.lower() not in ["admin", "teacher"]:
-        raise HTTPException(status_code=403, detail="Only admin users can assign teachers to divisions")
-    
     # Check if division exists
-    division = db.query(models.Division).filter(models.Division.id == teacher_division.division_id).first()
+    division = await db.scalar(select(models.Division).where(models.Division.id == teacher_division.division_id))
     if not division:
         raise HTTPException(
             status_code=404,
@@ -173,7 +175,7 @@ async def add_teacher_division(
         )
     
     # Check if subject exists
-    subject = db.query(models.Subject).filter(models.Subject.id == teacher_division.subject_id).first()
+    subject = await db.scalar(select(models.Subject).where(models.Subject.id == teacher_division.subject_id))
     if not subject:
         raise HTTPException(
             status_code=404,
@@ -181,10 +183,10 @@ async def add_teacher_division(
         )
     
     # Check if subject is assigned to the division
-    division_subject = db.query(models.DivisionSubject).filter(
+    division_subject = await db.scalar(select(models.DivisionSubject).where(
         models.DivisionSubject.division_id == teacher_division.division_id,
         models.DivisionSubject.subject_id == teacher_division.subject_id
-    ).first()
+    ))
     if not division_subject:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -192,7 +194,7 @@ async def add_teacher_division(
         )
     
     # Check if teacher exists
-    teacher = db.query(models.Teacher).filter(models.Teacher.id == teacher_division.teacher_id).first()
+    teacher = await db.scalar(select(models.Teacher).where(models.Teacher.id == teacher_division.teacher_id))
     if not teacher:
         raise HTTPException(
             status_code=404,
@@ -204,17 +206,17 @@ async def add_teacher_division(
     
     try:
         db.add(new_teacher_division)
-        db.commit()
-        db.refresh(new_teacher_division)
+        await db.commit()
+        await db.refresh(new_teacher_division)
     except Exception as e:
-        db.rollback()  
+        await db.rollback()  
         raise HTTPException(
             status_code=500,
             detail=f"An error occurred while saving the teacher division: {str(e)}"
         )
     
     # grade and section names 
-    division_info = db.query(
+    division_info = (await db.execute(select(
         models.Division,
         models.Grade,
         models.Section
@@ -222,9 +224,9 @@ async def add_teacher_division(
         models.Grade, models.Division.grade_id == models.Grade.id
     ).join(
         models.Section, models.Division.section_id == models.Section.id
-    ).filter(
+    ).where(
         models.Division.id == division.id
-    ).first()
+    ))).first()
     division_name = ""
     if division_info:
         _, grade, section = division_info
@@ -238,7 +240,7 @@ async def add_teacher_division(
 @router.get("/api/teacher/me/subjects", response_model=list[schemas.SubjectOut])
 def get_my_subjects(
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    current_user: schemas.Principal = Depends(get_current_user)
 ):
     teacher = db.query(models.Teacher).filter(models.Teacher.user_id == current_user.id).first()
     if not teacher:
@@ -252,17 +254,9 @@ def get_my_subjects(
              response_model=TeacherTaskWithQuizOut)
 async def create_teacher_tasks(
     create_task: schemas.CreateTeacherTasks,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.Principal = Depends(require_role("teacher", detail="Must be a teacher"))
 ):
-    # Check if user is a teacher
-    user_role_rel = db.query(models.UserRoleRel).filter(models.UserRoleRel.user_id == current_user.id).first()
-    if not user_role_rel:
-        raise HTTPException(status_code=403, detail="User does not have a role assigned")
-    role = db.query(models.UserRole).filter(models.UserRole.id == user_role_rel.role_id).first()
-    if not role or role.name.lower() != "teacher":
-        raise HTTPException(status_code=403, detail="Must be a teacher")
-    
     # Create teacher task
     new_teacher_task = models.TeacherTasks(
         title=create_task.title,
@@ -277,8 +271,8 @@ async def create_teacher_tasks(
     )
     
     db.add(new_teacher_task)
-    db.commit()
-    db.refresh(new_teacher_task)
+    await db.commit()
+    await db.refresh(new_teacher_task)
     
     # Base response structure
     response_data = {
@@ -310,11 +304,11 @@ async def create_teacher_tasks(
             new_quiz.total_marks = total_marks
         
         db.add(new_quiz)
-        db.flush()  
-        db.refresh(new_quiz)
+        await db.flush()  
+        await db.refresh(new_quiz)
         # Link quiz to teacher task
         new_teacher_task.quiz_id = new_quiz.id
-        db.commit()
+        await db.commit()
 
         # Update response with quiz information
         response_data.update({
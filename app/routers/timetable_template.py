@@ -0,0 +1,284 @@
+from fastapi import APIRouter, Depends, HTTPException, status, Response
+from sqlalchemy.orm import Session
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy import or_
+from app import models, schemas, jobs, daytable
+from app.database import get_db
+from app.auth2 import require_role
+from app.pagination import PageParams, paginate
+from app.timetable import materialize, schedule_conflict
+from app.timetable_generator import generate_school_timetable
+from typing import List, Optional
+
+router = APIRouter()
+
+MAX_MATERIALIZE_DAYS = 366
+MAX_GENERATION_SECONDS = 60
+
+
+def _check_assignment(db: Session, teacher_id: int, division_id: int, subject_id: int):
+    # Same rules as add_class_schedule
+    teacher_division_subject = db.query(models.TeacherDivision).filter(
+        models.TeacherDivision.teacher_id == teacher_id,
+        models.TeacherDivision.division_id == division_id,
+        models.TeacherDivision.subject_id == subject_id
+    ).first()
+    if not teacher_division_subject:
+        raise HTTPException(status_code=400, detail="Teacher is not assigned to teach this subject in this division")
+
+    division_subject = db.query(models.DivisionSubject).filter(
+        models.DivisionSubject.division_id == division_id,
+        models.DivisionSubject.subject_id == subject_id
+    ).first()
+    if not division_subject:
+        raise HTTPException(status_code=400, detail="Subject is not assigned to this division")
+
+
+@router.post("/api/add_timetable_template", response_model=schemas.TimetableTemplateOut, status_code=status.HTTP_201_CREATED)
+def create_timetable_template(
+    template: schemas.TimetableTemplateCreate,
+    db: Session = Depends(get_db),
+    current_user: schemas.Principal = Depends(require_role("admin", detail="Only admin is allowed to add class schedules"))
+):
+    if not 0 <= template.weekday <= 6:
+        raise HTTPException(status_code=400, detail="weekday must be between 0 (Monday) and 6 (Sunday)")
+    if template.end_time <= template.start_time:
+        raise HTTPException(status_code=400, detail="end_time must be after start_time")
+    if template.valid_until is not None and template.valid_until < template.valid_from:
+        raise HTTPException(status_code=400, detail="valid_until must not be before valid_from")
+
+    division = db.query(models.Division).filter(models.Division.id == template.division_id).first()
+    if not division:
+        raise HTTPException(status_code=404, detail="Division not found")
+    _check_assignment(db, template.teacher_id, template.division_id, template.subject_id)
+
+    # Templates are few and written rarely, so overlaps are checked here; the
+    # dates they expand to are checked again when materialized
+    clash = db.query(models.TimetableTemplate).filter(
+        models.TimetableTemplate.weekday == template.weekday,
+        or_(
+            models.TimetableTemplate.division_id == template.division_id,
+            models.TimetableTemplate.teacher_id == template.teacher_id
+        ),
+        models.TimetableTemplate.start_time < template.end_time,
+        models.TimetableTemplate.end_time > template.start_time,
+        or_(models.TimetableTemplate.valid_until.is_(None), models.TimetableTemplate.valid_until >= template.valid_from),
+        *([models.TimetableTemplate.valid_from <= template.valid_until] if template.valid_until is not None else [])
+    ).first()
+    if clash:
+        who = "Division" if clash.division_id == template.division_id else "Teacher"
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f"{who} already has a weekly class at this time (template {clash.id})")
+
+    db_template = models.TimetableTemplate(**template.model_dump())
+    try:
+        db.add(db_template)
+        # Cached day timetables of any date from valid_from on may now be missing the class
+        daytable.publish_invalidation(db)
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=400, detail="A template already exists for this division, weekday and period from this date")
+    daytable.invalidate()
+    db.refresh(db_template)
+    return db_template
+
+
+@router.get("/api/get_timetable_templates", response_model=List[schemas.TimetableTemplateOut])
+def get_timetable_templates(
+    response: Response,
+    division_id: Optional[int] = None,
+    teacher_id: Optional[int] = None,
+    page: PageParams = Depends(),
+    db: Session = Depends(get_db),
+    current_user: schemas.Principal = Depends(require_role("admin", "teacher", detail="Only admin and teacher users can view class schedules"))
+):
+    query = db.query(models.TimetableTemplate)
+    if division_id is not None:
+        query = query.filter(models.TimetableTemplate.division_id == division_id)
+    if teacher_id is not None:
+        query = query.filter(models.TimetableTemplate.teacher_id == teacher_id)
+    return paginate(query, models.TimetableTemplate.id, page, response)
+
+
+@router.post("/api/add_holiday", response_model=schemas.HolidayOut, status_code=status.HTTP_201_CREATED)
+def create_holiday(
+    holiday: schemas.HolidayCreate,
+    db: Session = Depends(get_db),
+    current_user: schemas.Principal = Depends(require_role("admin", detail="Only admin is allowed to add class schedules"))
+):
+    school = db.query(models.School).filter(models.School.id == holiday.school_id).first()
+    if not school:
+        raise HTTPException(status_code=404, detail="School not found")
+
+    db_holiday = models.Holiday(**holiday.model_dump())
+    try:
+        db.add(db_holiday)
+        db.flush()
+        # Classes already materialized from templates for that day no longer take place
+        db.query(models.ClassSchedule).filter(
+            models.ClassSchedule.template_id.isnot(None),
+            models.ClassSchedule.date == holiday.date,
+            models.ClassSchedule.division_id.in_(
+                db.query(models.Division.id).filter(models.Division.school_id == holiday.school_id)
+            )
+        ).delete(synchronize_session=False)
+        daytable.publish_invalidation(db)
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=400, detail="A holiday already exists for this school on this date")
+    daytable.invalidate()
+    db.refresh(db_holiday)
+    return db_holiday
+
+
+@router.get("/api/get_holidays", response_model=List[schemas.HolidayOut])
+def get_holidays(
+    school_id: int,
+    db: Session = Depends(get_db),
+    current_user: schemas.Principal = Depends(require_role("admin", "teacher", detail="Only admin and teacher users can view class schedules"))
+):
+    return db.query(models.Holiday).filter(models.Holiday.school_id == school_id).order_by(models.Holiday.date).all()
+
+
+@router.post("/api/add_schedule_override", response_model=schemas.ScheduleOverrideOut, status_code=status.HTTP_201_CREATED)
+def create_schedule_override(
+    override: schemas.ScheduleOverrideCreate,
+    db: Session = Depends(get_db),
+    current_user: schemas.Principal = Depends(require_role("admin", detail="Only admin is allowed to add class schedules"))
+):
+    template = db.query(models.TimetableTemplate).filter(models.TimetableTemplate.id == override.template_id).first()
+    if not template:
+        raise HTTPException(status_code=404, detail="Timetable template not found")
+    if override.date.weekday() != template.weekday:
+        raise HTTPException(status_code=400, detail="The template does not take place on this date")
+    if override.date < template.valid_from or (template.valid_until is not None and override.date > template.valid_until):
+        raise HTTPException(status_code=400, detail="The date is outside the template's validity")
+
+    start_time = override.start_time or template.start_time
+    end_time = override.end_time or template.end_time
+    teacher_id = override.teacher_id or template.teacher_id
+    subject_id = override.subject_id or template.subject_id
+    if end_time <= start_time:
+        raise HTTPException(status_code=400, detail="end_time must be after start_time")
+    if not override.cancelled and (override.teacher_id or override.subject_id):
+        _check_assignment(db, teacher_id, template.division_id, subject_id)
+
+    db_override = models.ScheduleOverride(**override.model_dump())
+    day_keys = {
+        *daytable.class_keys(template.division_id, template.teacher_id, override.date),
+        daytable.day_key("teacher", teacher_id, override.date)
+    }
+    try:
+        db.add(db_override)
+        db.flush()
+        # Keep an already materialized class in step with the override
+        materialized = db.query(models.ClassSchedule).filter(
+            models.ClassSchedule.template_id == template.id,
+            models.ClassSchedule.date == override.date
+        ).first()
+        if materialized is not None:
+            if override.cancelled:
+                db.delete(materialized)
+            else:
+                materialized.teacher_id = teacher_id
+                materialized.subject_id = subject_id
+                materialized.start_time = start_time
+                materialized.end_time = end_time
+        daytable.publish_invalidation(db, *day_keys)
+        db.commit()
+    except IntegrityError as e:
+        db.rollback()
+        conflict = schedule_conflict(e)
+        if conflict:
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=conflict)
+        raise HTTPException(status_code=400, detail="An override already exists for this template on this date")
+    daytable.invalidate(*day_keys)
+    db.refresh(db_override)
+    return db_override
+
+
+@router.post("/api/materialize_class_schedules", response_model=schemas.MaterializeSchedulesResult)
+def materialize_class_schedules(
+    window: schemas.MaterializeSchedules,
+    db: Session = Depends(get_db),
+    current_user: schemas.Principal = Depends(require_role("admin", detail="Only admin is allowed to add class schedules"))
+):
+    # Writes the template occurrences of a date window (e.g. the coming weeks)
+    # to class_schedules; safe to repeat, dates already written are skipped
+    if window.end_date < window.start_date:
+        raise HTTPException(status_code=400, detail="end_date must not be before start_date")
+    if (window.end_date - window.start_date).days >= MAX_MATERIALIZE_DAYS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_MATERIALIZE_DAYS} days can be materialized at once")
+
+    division_ids = [window.division_id] if window.division_id is not None else None
+    try:
+        inserted, skipped = materialize(db, window.start_date, window.end_date, division_ids=division_ids)
+        if inserted:
+            daytable.publish_invalidation(db)
+        db.commit()
+    except IntegrityError as e:
+        db.rollback()
+        conflict = schedule_conflict(e)
+        if conflict:
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=conflict)
+        raise
+    if inserted:
+        daytable.invalidate()
+    return {
+        "inserted": inserted,
+        "skipped": [
+            {
+                "template_id": occurrence["template_id"],
+                "date": occurrence["date"].isoformat(),
+                "start_time": occurrence["start_time"].isoformat(),
+                "end_time": occurrence["end_time"].isoformat(),
+            }
+            for occurrence in skipped
+        ]
+    }
+
+
+@router.post("/api/generate_timetable", response_model=schemas.JobOut, status_code=status.HTTP_202_ACCEPTED)
+def generate_timetable(
+    request: schemas.TimetableGenerate,
+    db: Session = Depends(get_db),
+    current_user: schemas.Principal = Depends(require_role("admin", detail="Only admin is allowed to add class schedules"))
+):
+    # Builds the school's weekly templates from its teacher-division-subject
+    # assignments in the background; poll /api/jobs/{id} for the result
+    if not request.bell_schedule:
+        raise HTTPException(status_code=400, detail="bell_schedule must list at least one period")
+    if len({bell.period for bell in request.bell_schedule}) != len(request.bell_schedule):
+        raise HTTPException(status_code=400, detail="bell_schedule periods must be unique")
+    bells = sorted(request.bell_schedule, key=lambda bell: bell.start_time)
+    for bell in bells:
+        if bell.end_time <= bell.start_time:
+            raise HTTPException(status_code=400, detail=f"Period {bell.period} must end after it starts")
+    for earlier, later in zip(bells, bells[1:]):
+        if later.start_time < earlier.end_time:
+            raise HTTPException(status_code=400, detail=f"Periods {earlier.period} and {later.period} overlap")
+    if not request.weekdays or any(not 0 <= weekday <= 6 for weekday in request.weekdays):
+        raise HTTPException(status_code=400, detail="weekdays must be between 0 (Monday) and 6 (Sunday)")
+    if request.max_periods_per_teacher_per_day < 1:
+        raise HTTPException(status_code=400, detail="max_periods_per_teacher_per_day must be at least 1")
+    if any(count < 0 for count in request.periods_per_week.values()):
+        raise HTTPException(status_code=400, detail="periods_per_week must not be negative")
+    if request.valid_until is not None and request.valid_until < request.valid_from:
+        raise HTTPException(status_code=400, detail="valid_until must not be before valid_from")
+    if not 0 < request.time_budget_seconds <= MAX_GENERATION_SECONDS:
+        raise HTTPException(status_code=400, detail=f"time_budget_seconds must be between 0 and {MAX_GENERATION_SECONDS}")
+
+    school = db.query(models.School).filter(models.School.id == request.school_id).first()
+    if not school:
+        raise HTTPException(status_code=404, detail="School not found")
+
+    job = jobs.submit(db, "generate_timetable", current_user.id, request.model_dump(mode="json"))
+    db.commit()
+    db.refresh(job)
+    return job
+
+
+@jobs.handler("generate_timetable")
+def _generate_timetable_job(job: jobs.JobContext, payload: dict) -> dict:
+    return generate_school_timetable(job, schemas.TimetableGenerate.model_validate(payload).model_dump())
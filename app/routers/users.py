@@ -1,9 +1,11 @@
-from fastapi import FastAPI, Depends, HTTPException, status,APIRouter
+from fastapi import FastAPI, Depends, HTTPException, status,APIRouter, Response
 from sqlalchemy.orm import Session
 from app import models, schemas, utils
-from app.utils import hash
-from app.database import get_db
-from app.auth2 import get_current_user
+from app.utils import hash_async
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import get_db, get_async_db
+from app.auth2 import require_role
+from app.pagination import PageParams, paginate
 from sqlalchemy import select
 
 router = APIRouter()
@@ -11,46 +13,40 @@ router = APIRouter()
 
 @router.get("/api/get_users", response_model=list[schemas.UserOut])
 def get_users(
+    response: Response,
+    page: PageParams = Depends(),
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    current_user: schemas.Principal = Depends(require_role("admin", detail="Only admin users can view users"))
 ):
-    # Allow only admin
-    user_role_rel = db.query(models.UserRoleRel).filter(models.UserRoleRel.user_id == current_user.id).first()
-    if not user_role_rel:
-        raise HTTPException(status_code=403, detail="User does not have a role assigned")
-    role = db.query(models.UserRole).filter(models.UserRole.id == user_role_rel.role_id).first()
-    if not role or role.name.lower() != "admin":
-        raise HTTPException(status_code=403, detail="Only admin users can view users")
-
-    users = db.query(models.User).all()
+    users = paginate(db.query(models.User), models.User.id, page, response)
     return users
 
 @router.post("/api/create_teacher", status_code=status.HTTP_201_CREATED, response_model=schemas.UserOut)
-async def create_teacher(user: schemas.UserCreate, db: Session = Depends(get_db)):
+async def create_teacher(user: schemas.UserCreate, db: AsyncSession = Depends(get_async_db)):
     try:
         # Check if email already exists
-        current_user = db.query(models.User).filter(models.User.email == user.email).first()
+        current_user = await db.scalar(select(models.User).where(models.User.email == user.email))
         if current_user:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="email already exists")
         
         # Hash the password
-        hashed_password = hash(user.password)
+        hashed_password = await hash_async(user.password)
         user.password = hashed_password
 
         # Create the user
         new_user = models.User(**user.model_dump())
         db.add(new_user)
-        db.commit()
-        db.refresh(new_user)
+        await db.commit()
+        await db.refresh(new_user)
 
         # Assign the "Teacher" role
-        teacher_role = db.query(models.UserRole).filter(models.UserRole.name == "teacher").first()
+        teacher_role = await db.scalar(select(models.UserRole).where(models.UserRole.name == "teacher"))
         if not teacher_role:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Teacher role does not exist")
 
         user_role_rel = models.UserRoleRel(user_id=new_user.id, role_id=teacher_role.id)
         db.add(user_role_rel)
-        db.commit()
+        await db.commit()
 
         return new_user
     except HTTPException:
@@ -61,31 +57,31 @@ async def create_teacher(user: schemas.UserCreate, db: Session = Depends(get_db)
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
 
 @router.post("/api/create_student", status_code=status.HTTP_201_CREATED, response_model=schemas.UserOut)
-async def create_student(user: schemas.UserCreate, db: Session = Depends(get_db)):
+async def create_student(user: schemas.UserCreate, db: AsyncSession = Depends(get_async_db)):
     try:
         # Check if email already exists
-        current_user = db.query(models.User).filter(models.User.email == user.email).first()
+        current_user = await db.scalar(select(models.User).where(models.User.email == user.email))
         if current_user:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="email already exists")
         
         # Hash the password
-        hashed_password = hash(user.password)
+        hashed_password = await hash_async(user.password)
         user.password = hashed_password
 
         # Create the user
         new_user = models.User(**user.model_dump())
         db.add(new_user)
-        db.commit()
-        db.refresh(new_user)
+        await db.commit()
+        await db.refresh(new_user)
 
         # Assign the "student" role
-        student_role = db.query(models.UserRole).filter(models.UserRole.name == "student").first()
+        student_role = await db.scalar(select(models.UserRole).where(models.UserRole.name == "student"))
         if not student_role:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Student role does not exist")
 
         user_role_rel = models.UserRoleRel(user_id=new_user.id, role_id=student_role.id)
         db.add(user_role_rel)
-        db.commit()
+        await db.commit()
 
         return new_user
     except HTTPException:
@@ -94,31 +90,31 @@ async def create_student(user: schemas.UserCreate, db: Session = Depends(get_db)
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
 
 @router.post("/api/create_admin", status_code=status.HTTP_201_CREATED, response_model=schemas.UserOut)
-async def create_admin(user: schemas.UserCreate, db: Session = Depends(get_db)):
+async def create_admin(user: schemas.UserCreate, db: AsyncSession = Depends(get_async_db)):
     try:
         # Check if email already exists
-        current_user = db.query(models.User).filter(models.User.email == user.email).first()
+        current_user = await db.scalar(select(models.User).where(models.User.email == user.email))
         if current_user:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="email already exists")
         
         # Hash the password
-        hashed_password = hash(user.password)
+        hashed_password = await hash_async(user.password)
         user.password = hashed_password
 
         # Create the user
         new_user = models.User(**user.model_dump())
         db.add(new_user)
-        db.commit()
-        db.refresh(new_user)
+        await db.commit()
+        await db.refresh(new_user)
 
         # Assign the "admin" role
-        admin_role = db.query(models.UserRole).filter(models.UserRole.name == "admin").first()
+        admin_role = await db.scalar(select(models.UserRole).where(models.UserRole.name == "admin"))
         if not admin_role:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Admin role does not exist")
 
         user_role_rel = models.UserRoleRel(user_id=new_user.id, role_id=admin_role.id)
         db.add(user_role_rel)
-        db.commit()
+        await db.commit()
 
         return new_user
     except HTTPException:
@@ -43,6 +43,13 @@ class AssignRoleResponse(BaseModel):
 
 class TokenData(BaseModel):
     id: str | None = None
+    role: str | None = None
+    issued_at: int | None = None
+    expires_at: int | None = None
+
+class Principal(BaseModel):
+    id: int
+    role: str | None = None
 
 class Token(BaseModel):
     id: int
@@ -348,7 +355,8 @@ class ClassScheduleCreate(BaseModel):
     end_time: time    # Will be converted to DateTime
 
 class ClassScheduleOut(BaseModel):
-    id: int
+    id: Optional[int] = None  # None for a template occurrence that is not materialized yet
+    template_id: Optional[int] = None
     period: int
     date: str  # Date as string
     subject_id: int
@@ -365,6 +373,110 @@ class ClassScheduleOut(BaseModel):
     class Config:
         from_attributes = True
 
+class ClassScheduleImportError(BaseModel):
+    row: int  # 1-based position in the payload (data line for CSV)
+    errors: List[str]
+
+class ClassScheduleImportResult(BaseModel):
+    received: int
+    inserted: int
+    dry_run: bool
+    errors: List[ClassScheduleImportError]
+
+class TimetableTemplateCreate(BaseModel):
+    division_id: int
+    weekday: int  # 0 = Monday ... 6 = Sunday
+    period: int
+    start_time: time
+    end_time: time
+    subject_id: int
+    teacher_id: int
+    valid_from: date
+    valid_until: Optional[date] = None
+
+class TimetableTemplateOut(TimetableTemplateCreate):
+    id: int
+    created_at: datetime
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
+
+class HolidayCreate(BaseModel):
+    school_id: int
+    date: date
+    name: str
+
+class HolidayOut(HolidayCreate):
+    id: int
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+class ScheduleOverrideCreate(BaseModel):
+    template_id: int
+    date: date
+    cancelled: bool = False
+    # Fields left out keep the template's value
+    subject_id: Optional[int] = None
+    teacher_id: Optional[int] = None
+    start_time: Optional[time] = None
+    end_time: Optional[time] = None
+
+class ScheduleOverrideOut(ScheduleOverrideCreate):
+    id: int
+    created_at: datetime
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
+
+class MaterializeSchedules(BaseModel):
+    start_date: date
+    end_date: date
+    division_id: Optional[int] = None
+
+class MaterializeSchedulesResult(BaseModel):
+    inserted: int
+    skipped: List[Dict[str, Any]]  # occurrences not written because they overlap another class
+
+class BellPeriod(BaseModel):
+    period: int
+    start_time: time
+    end_time: time
+
+class TimetableGenerate(BaseModel):
+    school_id: int
+    division_ids: Optional[List[int]] = None  # default: every division of the school
+    academic_year: Optional[str] = None
+    weekdays: List[int] = [0, 1, 2, 3, 4]
+    bell_schedule: List[BellPeriod]
+    periods_per_week: Dict[int, int]  # subject_id -> periods per week
+    max_periods_per_teacher_per_day: int = 6
+    valid_from: date
+    valid_until: Optional[date] = None
+    replace_existing: bool = False
+    dry_run: bool = False
+    time_budget_seconds: float = 10.0
+
+class JobOut(BaseModel):
+    id: int
+    kind: str
+    status: str  # queued, running, succeeded, failed
+    progress: int
+    message: Optional[str] = None
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    attempts: int
+    max_attempts: int
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
 class ClassScheduleUpdate(BaseModel):
     period: Optional[int] = None
     date: Optional[str] = None
@@ -434,7 +546,21 @@ class BulkQuizQuestionAdd(BaseModel):
     question_ids: List[int]
 
 class BulkQuestionCreate(BaseModel):
-    questions: List[QuestionCreate]
+    # Rows are validated one by one, so a bad row is reported instead of failing the whole import
+    questions: List[Dict[str, Any]]
+
+class QuestionImportRow(BaseModel):
+    row: int  # 1-based position in the request
+    status: str  # "accepted", "duplicate" or "invalid"
+    question_id: Optional[int] = None
+    errors: List[str] = []
+
+class QuestionImportResult(BaseModel):
+    received: int
+    accepted: int
+    duplicate: int
+    invalid: int
+    rows: List[QuestionImportRow]
 
 class QuizUpdate(BaseModel):
     title: Optional[str] = None
@@ -477,6 +603,41 @@ class QuizGenerationStatus(BaseModel):
     total_questions: Optional[int] = None
     questions_generated: Optional[int] = None
 
+class StudentQuizOut(BaseModel):
+    attempt_id: int
+    published_quiz_id: int
+    title: Optional[str] = None
+    subject_name: Optional[str] = None
+    quiz_type: str
+    start_time: datetime
+    end_time: datetime
+    duration: int
+    status: str  # active, in_progress, submitted, graded
+    is_submitted: bool
+    submitted_at: Optional[datetime] = None
+    score: Optional[float] = None
+    max_score: Optional[float] = None
+
+class StudentQuizAnswers(BaseModel):
+    answers: Dict[str, Any] = {}  # question id -> answer; only the changed answers
+
+class StudentQuizAttemptOut(BaseModel):
+    attempt_id: int
+    status: str
+    deadline: datetime
+    quiz: Dict[str, Any]  # the published quiz without answer keys
+    response: Dict[str, Any]
+
+class StudentQuizSaveOut(BaseModel):
+    attempt_id: int
+    saved: int
+
+class StudentQuizSubmitOut(BaseModel):
+    attempt_id: int
+    status: str
+    submitted_at: datetime
+    answered: int
+
 class TaskTypeEnum(str, enum.Enum):
 
     Classwork = "Classwork"
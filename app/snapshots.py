@@ -0,0 +1,64 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Optional
+import orjson
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from app import models
+
+# Published quiz content is stored once per distinct content in
+# quiz_snapshots, addressed by the SHA-256 of its canonical JSON, and
+# student rows point at it instead of each carrying a copy. Snapshots are
+# never updated, so the in-process cache needs no invalidation.
+
+CACHE_SIZE = 256
+
+_lock = threading.Lock()
+_cache: "OrderedDict[int, dict]" = OrderedDict()
+
+
+def content_hash(quiz_detail: dict) -> str:
+    return hashlib.sha256(orjson.dumps(quiz_detail, option=orjson.OPT_SORT_KEYS)).hexdigest()
+
+
+def _remember(snapshot_id: int, quiz_detail: dict):
+    with _lock:
+        _cache[snapshot_id] = quiz_detail
+        _cache.move_to_end(snapshot_id)
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+
+
+async def store(db: AsyncSession, quiz_detail: dict) -> int:
+    # Returns the id of the snapshot holding `quiz_detail`, inserting it
+    # unless identical content was published before. The caller commits.
+    digest = content_hash(quiz_detail)
+    snapshot_id = await db.scalar(pg_insert(models.QuizSnapshot).values(
+        content_hash=digest, quiz_detail=quiz_detail
+    ).on_conflict_do_nothing(index_elements=["content_hash"]).returning(models.QuizSnapshot.id))
+    if snapshot_id is None:
+        snapshot_id = await db.scalar(select(models.QuizSnapshot.id).where(models.QuizSnapshot.content_hash == digest))
+    _remember(snapshot_id, quiz_detail)
+    return snapshot_id
+
+
+async def load(db: AsyncSession, snapshot_id: int) -> Optional[dict]:
+    with _lock:
+        quiz_detail = _cache.get(snapshot_id)
+        if quiz_detail is not None:
+            _cache.move_to_end(snapshot_id)
+            return quiz_detail
+    quiz_detail = await db.scalar(select(models.QuizSnapshot.quiz_detail).where(models.QuizSnapshot.id == snapshot_id))
+    if quiz_detail is not None:
+        _remember(snapshot_id, quiz_detail)
+    return quiz_detail
+
+
+async def quiz_detail_of(db: AsyncSession, row) -> Optional[dict]:
+    # Quiz content of a PublishedQuiz or StudentQuizResponseRel row, whether
+    # it references a snapshot or predates them and carries its own copy
+    if row.snapshot_id is not None:
+        return await load(db, row.snapshot_id)
+    return row.quiz_detail
@@ -0,0 +1,265 @@
+from collections import defaultdict
+from datetime import date, time, timedelta
+from typing import Iterable, NamedTuple, Optional
+from sqlalchemy import or_, select, func, union_all
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app import models
+from app.etag import content_etag
+
+# Overlapping classes are rejected by the exclusion constraints on
+# class_schedules (see models.ClassSchedule); these map a violation back to
+# the message the API reports with a 409.
+
+EXCLUSION_VIOLATION = "23P01"
+
+SCHEDULE_CONFLICTS = {
+    "excl_class_schedules_teacher_overlap": "Teacher is already assigned to another class at this time",
+    "excl_class_schedules_division_overlap": "Division already has a class scheduled at this time",
+}
+
+
+def _constraint_name(orig) -> Optional[str]:
+    # psycopg2 exposes the name on .diag; asyncpg on the wrapped exception
+    diag = getattr(orig, "diag", None)
+    if diag is not None and getattr(diag, "constraint_name", None):
+        return diag.constraint_name
+    return getattr(orig.__cause__, "constraint_name", None)
+
+
+def schedule_conflict(e: IntegrityError) -> Optional[str]:
+    # Returns the conflict message when `e` is an overlap rejected by the
+    # database, None for any other integrity error
+    if getattr(e.orig, "pgcode", None) != EXCLUSION_VIOLATION:
+        return None
+    return SCHEDULE_CONFLICTS.get(_constraint_name(e.orig), "Class schedule overlaps an existing class")
+
+
+class Slot(NamedTuple):
+    # One class on the timeline of a teacher or division, keyed e.g.
+    # ("teacher", teacher_id, date). Classes being imported carry their row
+    # number, classes already stored carry their id
+    key: tuple
+    start: time
+    end: time
+    row: Optional[int] = None
+    class_id: Optional[int] = None
+
+
+def find_overlaps(slots: Iterable[Slot]) -> list[tuple[Slot, Slot]]:
+    # Sort-and-sweep per key: after sorting by start, a slot overlaps the
+    # earlier slot with the latest end iff it starts before that end
+    # ('[)' ranges, so back-to-back classes don't count).
+    # Returns (slot, earlier overlapping slot) pairs, O(n log n) overall.
+    overlaps = []
+    ordered = sorted(slots, key=lambda slot: (slot.key, slot.start, slot.end))
+    running: Optional[Slot] = None
+    for slot in ordered:
+        if running is None or running.key != slot.key:
+            running = slot
+            continue
+        if slot.start < running.end:
+            overlaps.append((slot, running))
+        if slot.end > running.end:
+            running = slot
+    return overlaps
+
+
+# Weekly templates
+
+def _templates_query(db: Session, start: date, end: date):
+    return db.query(models.TimetableTemplate, models.Division.school_id).join(
+        models.Division, models.TimetableTemplate.division_id == models.Division.id
+    ).filter(
+        models.TimetableTemplate.valid_from <= end,
+        or_(models.TimetableTemplate.valid_until.is_(None), models.TimetableTemplate.valid_until >= start)
+    )
+
+
+def expand_templates(
+    db: Session,
+    start: date,
+    end: date,
+    division_ids: Optional[Iterable[int]] = None,
+    teacher_id: Optional[int] = None
+) -> list[dict]:
+    # Occurrences of the weekly templates between start and end (inclusive),
+    # for the given divisions or for whoever teaches them on the day (a
+    # substitute override moves a class onto another teacher's timetable).
+    # Holidays are skipped and per-date overrides applied.
+    query = _templates_query(db, start, end)
+    if division_ids is not None:
+        query = query.filter(models.TimetableTemplate.division_id.in_(list(division_ids)))
+    if teacher_id is not None:
+        substituted = db.query(models.ScheduleOverride.template_id).filter(
+            models.ScheduleOverride.teacher_id == teacher_id,
+            models.ScheduleOverride.date.between(start, end)
+        )
+        query = query.filter(or_(
+            models.TimetableTemplate.teacher_id == teacher_id,
+            models.TimetableTemplate.id.in_(substituted)
+        ))
+    templates = query.all()
+    if not templates:
+        return []
+
+    school_ids = {school_id for _, school_id in templates}
+    holidays = set(db.query(models.Holiday.school_id, models.Holiday.date).filter(
+        models.Holiday.school_id.in_(school_ids),
+        models.Holiday.date.between(start, end)
+    ).all())
+    overrides = {
+        (override.template_id, override.date): override
+        for override in db.query(models.ScheduleOverride).filter(
+            models.ScheduleOverride.template_id.in_([template.id for template, _ in templates]),
+            models.ScheduleOverride.date.between(start, end)
+        )
+    }
+
+    by_weekday = defaultdict(list)
+    for template, school_id in templates:
+        by_weekday[template.weekday].append((template, school_id))
+
+    occurrences = []
+    day = start
+    while day <= end:
+        for template, school_id in by_weekday.get(day.weekday(), []):
+            if day < template.valid_from or (template.valid_until is not None and day > template.valid_until):
+                continue
+            if (school_id, day) in holidays:
+                continue
+            occurrence = {
+                "template_id": template.id,
+                "date": day,
+                "period": template.period,
+                "division_id": template.division_id,
+                "subject_id": template.subject_id,
+                "teacher_id": template.teacher_id,
+                "start_time": template.start_time,
+                "end_time": template.end_time,
+                "created_at": template.created_at,
+                "updated_at": template.updated_at,
+            }
+            override = overrides.get((template.id, day))
+            if override is not None:
+                if override.cancelled:
+                    continue
+                for field in ("subject_id", "teacher_id", "start_time", "end_time"):
+                    if getattr(override, field) is not None:
+                        occurrence[field] = getattr(override, field)
+                occurrence["updated_at"] = max(template.updated_at, override.updated_at)
+            if teacher_id is not None and occurrence["teacher_id"] != teacher_id:
+                continue
+            occurrences.append(occurrence)
+        day += timedelta(days=1)
+    return occurrences
+
+
+MATERIALIZED_FIELDS = ("template_id", "date", "period", "division_id", "subject_id", "teacher_id", "start_time", "end_time")
+
+
+def materialize(
+    db: Session,
+    start: date,
+    end: date,
+    division_ids: Optional[Iterable[int]] = None,
+    teacher_id: Optional[int] = None
+) -> tuple[int, list[dict]]:
+    # Writes the template occurrences in the window to class_schedules so they
+    # get ids (for topics, tasks, quizzes). Idempotent: dates already
+    # materialized are skipped via the (template_id, date) unique constraint.
+    # Occurrences that would overlap another stored class are not written and
+    # are returned instead. The caller commits.
+    occurrences = expand_templates(db, start, end, division_ids, teacher_id)
+    if not occurrences:
+        return 0, []
+
+    dates = [occurrence["date"] for occurrence in occurrences]
+    teacher_ids = {occurrence["teacher_id"] for occurrence in occurrences}
+    division_ids = {occurrence["division_id"] for occurrence in occurrences}
+    stored = db.query(
+        models.ClassSchedule.id, models.ClassSchedule.template_id, models.ClassSchedule.teacher_id,
+        models.ClassSchedule.division_id, models.ClassSchedule.date,
+        models.ClassSchedule.start_time, models.ClassSchedule.end_time
+    ).filter(
+        models.ClassSchedule.date.between(min(dates), max(dates)),
+        or_(models.ClassSchedule.teacher_id.in_(teacher_ids), models.ClassSchedule.division_id.in_(division_ids))
+    ).all()
+    done = {(row.template_id, row.date) for row in stored if row.template_id is not None}
+
+    pending = [occurrence for occurrence in occurrences if (occurrence["template_id"], occurrence["date"]) not in done]
+    slots = []
+    for number, occurrence in enumerate(pending):
+        slots.append(Slot(("teacher", occurrence["teacher_id"], occurrence["date"]), occurrence["start_time"], occurrence["end_time"], row=number))
+        slots.append(Slot(("division", occurrence["division_id"], occurrence["date"]), occurrence["start_time"], occurrence["end_time"], row=number))
+    for row in stored:
+        slots.append(Slot(("teacher", row.teacher_id, row.date), row.start_time, row.end_time, class_id=row.id))
+        slots.append(Slot(("division", row.division_id, row.date), row.start_time, row.end_time, class_id=row.id))
+    clashing = set()
+    for slot, other in find_overlaps(slots):
+        # Keep the stored class or the first of two clashing occurrences
+        if slot.row is not None:
+            clashing.add(slot.row)
+        elif other.row is not None:
+            clashing.add(other.row)
+
+    rows = [
+        {field: occurrence[field] for field in MATERIALIZED_FIELDS}
+        for number, occurrence in enumerate(pending) if number not in clashing
+    ]
+    skipped = [pending[number] for number in sorted(clashing)]
+    if not rows:
+        return 0, skipped
+    result = db.execute(
+        pg_insert(models.ClassSchedule).values(rows)
+        .on_conflict_do_nothing(constraint="uq_class_schedules_template_date")
+        .returning(models.ClassSchedule.id)
+    )
+    return len(result.all()), skipped
+
+
+def occurrence_out(occurrence: dict, subject_names: dict, teacher_names: dict, divisions: dict) -> dict:
+    # A not yet materialized occurrence in the ClassScheduleOut shape, id None
+    division = divisions.get(occurrence["division_id"])
+    return {
+        "id": None,
+        "template_id": occurrence["template_id"],
+        "period": occurrence["period"],
+        "date": occurrence["date"].isoformat(),
+        "subject_id": occurrence["subject_id"],
+        "division_id": occurrence["division_id"],
+        "teacher_id": occurrence["teacher_id"],
+        "start_time": occurrence["start_time"].isoformat(),
+        "end_time": occurrence["end_time"].isoformat(),
+        "created_at": occurrence["created_at"],
+        "updated_at": occurrence["updated_at"],
+        "subject_name": subject_names.get(occurrence["subject_id"]),
+        "division_name": f"Grade {division.grade_id} Section {division.section_id}" if division else None,
+        "teacher_name": teacher_names.get(occurrence["teacher_id"]),
+    }
+
+
+def templates_etag(db: Session, start: date, end: date, division_ids: Optional[Iterable[int]] = None, teacher_id: Optional[int] = None) -> str:
+    # Watermark of everything expand_templates reads for this scope, in one
+    # round trip; the window is part of the tag since the expansion depends on it
+    template_scope = []
+    if division_ids is not None:
+        template_scope.append(models.TimetableTemplate.division_id.in_(list(division_ids)))
+    if teacher_id is not None:
+        template_scope.append(models.TimetableTemplate.teacher_id == teacher_id)
+    override_scope = [models.ScheduleOverride.template_id.in_(select(models.TimetableTemplate.id).where(or_(*template_scope)))]
+    if teacher_id is not None:
+        override_scope.append(models.ScheduleOverride.teacher_id == teacher_id)
+
+    def aggregate(model, *criteria):
+        return select(
+            func.count(), func.max(model.updated_at), func.sum(func.extract("epoch", model.updated_at))
+        ).select_from(model).where(*criteria)
+
+    watermark = db.execute(union_all(
+        aggregate(models.TimetableTemplate, or_(*template_scope)),
+        aggregate(models.ScheduleOverride, models.ScheduleOverride.date.between(start, end), or_(*override_scope)),
+        aggregate(models.Holiday, models.Holiday.date.between(start, end)),
+    )).all()
+    return content_etag(repr((start, end, [tuple(row) for row in watermark])).encode())
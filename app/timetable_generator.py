@@ -0,0 +1,335 @@
+import math
+import random
+import time
+from collections import Counter, defaultdict
+from datetime import date, time as time_of_day, timedelta
+from typing import Callable, NamedTuple, Optional
+from sqlalchemy import or_
+from app import models, daytable, bulk, jobs
+from app.database import SessionLocal
+
+# Weekly timetable generator. A school's week is a grid of (weekday, period)
+# slots; every division needs each of its subjects a given number of times,
+# taught by the teacher assigned to that subject in that division. Lessons
+# are placed greedily, most constrained first (busiest teachers, then the
+# most frequent subjects), each into the free slot that best spreads the
+# subject over the week and the teacher's load over the days. Hard
+# constraints: no teacher or division in two places at once and a cap on
+# a teacher's periods per day. A lesson with no free slot gets one repair
+# step: the teacher's lesson in another division at a slot where this
+# division is free is moved elsewhere. The pass is repeated with randomized
+# tie-breaks until everything is placed or the time budget runs out, and
+# the best attempt wins.
+
+
+class Lesson(NamedTuple):
+    division_id: int
+    subject_id: int
+    teacher_id: int
+    per_week: int
+
+
+class Placement(NamedTuple):
+    division_id: int
+    subject_id: int
+    teacher_id: int
+    weekday: int
+    period: int
+
+
+class GeneratedTimetable(NamedTuple):
+    placements: list[Placement]
+    unplaced: list[Lesson]  # one entry per lesson unit that found no slot
+    attempts: int
+
+
+def _attempt(
+    lessons: list[Lesson],
+    slots: list[tuple[int, int]],
+    days: int,
+    max_per_teacher_per_day: int,
+    blocked: set,
+    rng: random.Random
+) -> tuple[list[Placement], list[Lesson]]:
+    teacher_busy = set(blocked)  # (teacher_id, weekday, period)
+    division_busy = set()  # (division_id, weekday, period)
+    teacher_day = Counter()  # (teacher_id, weekday) -> periods
+    subject_day = Counter()  # (division_id, subject_id, weekday) -> periods
+    teacher_at = {}  # (teacher_id, weekday, period) -> index into placements
+    teacher_load = Counter()
+    for lesson in lessons:
+        teacher_load[lesson.teacher_id] += lesson.per_week
+
+    # Most constrained first; shuffling before the stable sort randomizes ties
+    ordered = list(lessons)
+    rng.shuffle(ordered)
+    ordered.sort(key=lambda lesson: (-teacher_load[lesson.teacher_id], -lesson.per_week))
+
+    placements = []
+    unplaced = []
+
+    def place(lesson: Lesson, weekday: int, period: int, index: Optional[int] = None):
+        division_busy.add((lesson.division_id, weekday, period))
+        teacher_busy.add((lesson.teacher_id, weekday, period))
+        teacher_day[(lesson.teacher_id, weekday)] += 1
+        subject_day[(lesson.division_id, lesson.subject_id, weekday)] += 1
+        placement = Placement(lesson.division_id, lesson.subject_id, lesson.teacher_id, weekday, period)
+        if index is None:
+            index = len(placements)
+            placements.append(placement)
+        else:
+            placements[index] = placement
+        teacher_at[(lesson.teacher_id, weekday, period)] = index
+
+    def unplace(index: int):
+        placement = placements[index]
+        division_busy.discard((placement.division_id, placement.weekday, placement.period))
+        teacher_busy.discard((placement.teacher_id, placement.weekday, placement.period))
+        teacher_day[(placement.teacher_id, placement.weekday)] -= 1
+        subject_day[(placement.division_id, placement.subject_id, placement.weekday)] -= 1
+        del teacher_at[(placement.teacher_id, placement.weekday, placement.period)]
+
+    def repair(lesson: Lesson) -> bool:
+        teacher_id = lesson.teacher_id
+        for weekday, period in slots:
+            if (lesson.division_id, weekday, period) in division_busy:
+                continue
+            index = teacher_at.get((teacher_id, weekday, period))
+            if index is None:
+                continue
+            other = placements[index]
+            for to_weekday, to_period in slots:
+                if (other.division_id, to_weekday, to_period) in division_busy:
+                    continue
+                if (teacher_id, to_weekday, to_period) in teacher_busy:
+                    continue
+                # Moving within the day still adds this lesson's period to it
+                if teacher_day[(teacher_id, to_weekday)] >= max_per_teacher_per_day:
+                    continue
+                unplace(index)
+                place(Lesson(other.division_id, other.subject_id, teacher_id, 0), to_weekday, to_period, index)
+                place(lesson, weekday, period)
+                return True
+        return False
+
+    for lesson in ordered:
+        spread = math.ceil(lesson.per_week / days)
+        for _ in range(lesson.per_week):
+            best = None
+            best_score = None
+            for weekday, period in slots:
+                if (lesson.division_id, weekday, period) in division_busy:
+                    continue
+                if (lesson.teacher_id, weekday, period) in teacher_busy:
+                    continue
+                if teacher_day[(lesson.teacher_id, weekday)] >= max_per_teacher_per_day:
+                    continue
+                same_day = subject_day[(lesson.division_id, lesson.subject_id, weekday)]
+                # Going over the even spread is allowed but heavily penalized
+                score = (
+                    (same_day >= spread) * 100 + same_day * 10
+                    + teacher_day[(lesson.teacher_id, weekday)]
+                    + rng.random()
+                )
+                if best_score is None or score < best_score:
+                    best, best_score = (weekday, period), score
+            if best is not None:
+                place(lesson, *best)
+            elif not repair(lesson):
+                unplaced.append(lesson)
+    return placements, unplaced
+
+
+def generate(
+    lessons: list[Lesson],
+    weekdays: list[int],
+    periods: list[int],
+    max_per_teacher_per_day: int,
+    blocked: Optional[set] = None,
+    time_budget: float = 5.0,
+    max_attempts: int = 50,
+    seed: Optional[int] = None,
+    report: Optional[Callable[[int, str], None]] = None
+) -> GeneratedTimetable:
+    # `blocked` holds (teacher_id, weekday, period) slots the teachers already
+    # teach elsewhere (e.g. divisions outside this run)
+    slots = [(weekday, period) for weekday in weekdays for period in periods]
+    rng = random.Random(seed)
+    deadline = time.monotonic() + time_budget
+    best: Optional[tuple[list[Placement], list[Lesson]]] = None
+    attempts = 0
+    while attempts < max_attempts:
+        attempts += 1
+        placements, unplaced = _attempt(lessons, slots, len(weekdays), max_per_teacher_per_day, blocked or set(), rng)
+        if best is None or len(unplaced) < len(best[1]):
+            best = (placements, unplaced)
+        if report:
+            report(min(95, 10 + attempts * 85 // max_attempts), f"attempt {attempts}: {len(best[1])} lessons unplaced")
+        if not best[1] or time.monotonic() >= deadline:
+            break
+    placements, unplaced = best
+    return GeneratedTimetable(placements, unplaced, attempts)
+
+
+def unplaced_summary(unplaced: list[Lesson]) -> list[dict]:
+    counts = Counter(unplaced)
+    return [
+        {"division_id": lesson.division_id, "subject_id": lesson.subject_id, "teacher_id": lesson.teacher_id, "periods": count}
+        for lesson, count in counts.items()
+    ]
+
+
+def lessons_from_assignments(
+    division_ids: list[int],
+    division_subjects: set,
+    teacher_assignments: list[tuple[int, int, int]],
+    periods_per_week: dict[int, int]
+) -> tuple[list[Lesson], list[dict]]:
+    # One lesson per division subject that has a weekly count; when several
+    # teachers are assigned to a subject in a division the first one (by id) teaches it
+    teachers = defaultdict(list)
+    for teacher_id, division_id, subject_id in sorted(teacher_assignments):
+        teachers[(division_id, subject_id)].append(teacher_id)
+    lessons = []
+    missing = []
+    for division_id in division_ids:
+        for subject_id, per_week in periods_per_week.items():
+            if per_week <= 0 or (division_id, subject_id) not in division_subjects:
+                continue
+            assigned = teachers.get((division_id, subject_id))
+            if not assigned:
+                missing.append({"division_id": division_id, "subject_id": subject_id, "reason": "no teacher assigned"})
+                continue
+            lessons.append(Lesson(division_id, subject_id, assigned[0], per_week))
+    return lessons, missing
+
+
+def _overlapping_periods(bell_schedule: list[dict], start: time_of_day, end: time_of_day) -> list[int]:
+    return [bell["period"] for bell in bell_schedule if bell["start_time"] < end and bell["end_time"] > start]
+
+
+def _validity_overlaps(valid_from: date, valid_until: Optional[date]):
+    # Templates in effect at some point of [valid_from, valid_until]
+    conditions = [or_(models.TimetableTemplate.valid_until.is_(None), models.TimetableTemplate.valid_until >= valid_from)]
+    if valid_until is not None:
+        conditions.append(models.TimetableTemplate.valid_from <= valid_until)
+    return conditions
+
+
+def generate_school_timetable(job, params: dict) -> dict:
+    # Job body for POST /api/generate_timetable; `params` is a dumped
+    # schemas.TimetableGenerate. Templates are written only when every lesson
+    # found a slot, otherwise the result lists what could not be placed.
+    started = time.monotonic()
+    valid_from, valid_until = params["valid_from"], params["valid_until"]
+    bell_schedule = sorted(params["bell_schedule"], key=lambda bell: bell["period"])
+    bells = {bell["period"]: bell for bell in bell_schedule}
+    weekdays = sorted(set(params["weekdays"]))
+    db = SessionLocal()
+    try:
+        job.report(2, "loading assignments")
+        division_query = db.query(models.Division.id).filter(models.Division.school_id == params["school_id"])
+        if params["division_ids"] is not None:
+            division_query = division_query.filter(models.Division.id.in_(params["division_ids"]))
+        if params["academic_year"] is not None:
+            division_query = division_query.filter(models.Division.academic_year == params["academic_year"])
+        division_ids = [division_id for division_id, in division_query.order_by(models.Division.id)]
+        if not division_ids:
+            raise jobs.JobError("No divisions found for this school")
+
+        division_subjects = set(
+            db.query(models.DivisionSubject.division_id, models.DivisionSubject.subject_id)
+            .filter(models.DivisionSubject.division_id.in_(division_ids)).all()
+        )
+        teacher_assignments = [
+            tuple(row) for row in db.query(
+                models.TeacherDivision.teacher_id, models.TeacherDivision.division_id, models.TeacherDivision.subject_id
+            ).filter(models.TeacherDivision.division_id.in_(division_ids)).all()
+        ]
+        lessons, missing = lessons_from_assignments(division_ids, division_subjects, teacher_assignments, params["periods_per_week"])
+
+        slots_per_week = len(weekdays) * len(bell_schedule)
+        demand = Counter()
+        for lesson in lessons:
+            demand[lesson.division_id] += lesson.per_week
+        overbooked = [division_id for division_id, periods in demand.items() if periods > slots_per_week]
+        if overbooked:
+            raise jobs.JobError(f"Divisions {overbooked} need more than the {slots_per_week} periods of the week")
+
+        existing = db.query(models.TimetableTemplate).filter(
+            models.TimetableTemplate.division_id.in_(division_ids),
+            *_validity_overlaps(valid_from, valid_until)
+        ).all()
+        if existing and not params["replace_existing"]:
+            raise jobs.JobError(f"{len(existing)} weekly classes already exist for these divisions in this period; set replace_existing to replace them")
+
+        # Teachers keep the classes they teach in divisions outside this run
+        teacher_ids = {lesson.teacher_id for lesson in lessons}
+        blocked = set()
+        if teacher_ids:
+            elsewhere = db.query(
+                models.TimetableTemplate.teacher_id, models.TimetableTemplate.weekday,
+                models.TimetableTemplate.start_time, models.TimetableTemplate.end_time
+            ).filter(
+                models.TimetableTemplate.teacher_id.in_(teacher_ids),
+                models.TimetableTemplate.division_id.notin_(division_ids),
+                *_validity_overlaps(valid_from, valid_until)
+            ).all()
+            for teacher_id, weekday, start, end in elsewhere:
+                for period in _overlapping_periods(bell_schedule, start, end):
+                    blocked.add((teacher_id, weekday, period))
+
+        job.report(10, f"placing {sum(demand.values())} periods for {len(division_ids)} divisions")
+        timetable = generate(
+            lessons, weekdays, list(bells), params["max_periods_per_teacher_per_day"],
+            blocked=blocked, time_budget=params["time_budget_seconds"], report=job.report
+        )
+
+        written = 0
+        complete = not timetable.unplaced
+        if complete and not params["dry_run"]:
+            job.report(96, "writing timetable")
+            # Classes already materialized from the replaced weeks go with them
+            if existing:
+                db.query(models.ClassSchedule).filter(
+                    models.ClassSchedule.template_id.in_([template.id for template in existing]),
+                    models.ClassSchedule.date >= valid_from
+                ).delete(synchronize_session=False)
+            for template in existing:
+                if template.valid_from >= valid_from:
+                    db.delete(template)
+                else:
+                    template.valid_until = valid_from - timedelta(days=1)
+            bulk.insert_rows(db, models.TimetableTemplate, [
+                {
+                    "division_id": placement.division_id,
+                    "weekday": placement.weekday,
+                    "period": placement.period,
+                    "start_time": bells[placement.period]["start_time"],
+                    "end_time": bells[placement.period]["end_time"],
+                    "subject_id": placement.subject_id,
+                    "teacher_id": placement.teacher_id,
+                    "valid_from": valid_from,
+                    "valid_until": valid_until,
+                }
+                for placement in timetable.placements
+            ])
+            daytable.publish_invalidation(db)
+            db.commit()
+            daytable.invalidate()
+            written = len(timetable.placements)
+    finally:
+        db.close()
+
+    return {
+        "complete": complete,
+        "dry_run": params["dry_run"],
+        "divisions": len(division_ids),
+        "periods_placed": len(timetable.placements),
+        "templates_written": written,
+        "attempts": timetable.attempts,
+        "elapsed_ms": round((time.monotonic() - started) * 1000),
+        "unplaced": unplaced_summary(timetable.unplaced),
+        "missing_teachers": missing,
+        "timetable": [placement._asdict() for placement in timetable.placements] if params["dry_run"] else [],
+    }
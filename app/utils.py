@@ -1,9 +1,56 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor, Future
 from passlib.context import CryptContext
 
 pwd_context = CryptContext(schemes=['bcrypt'],deprecated="auto")
 
+# bcrypt is deliberately slow, so it runs on a small dedicated pool instead of
+# the event loop or the shared request threadpool
+HASH_POOL_SIZE = 4
+
+_hash_pool = ThreadPoolExecutor(max_workers=HASH_POOL_SIZE, thread_name_prefix="bcrypt")
+_hash_pool_lock = threading.Lock()
+_hash_pool_stats = {"queued": 0, "running": 0, "max_queued": 0, "completed": 0}
+
+
+def _run_tracked(fn, *args):
+    with _hash_pool_lock:
+        _hash_pool_stats["queued"] -= 1
+        _hash_pool_stats["running"] += 1
+    try:
+        return fn(*args)
+    finally:
+        with _hash_pool_lock:
+            _hash_pool_stats["running"] -= 1
+            _hash_pool_stats["completed"] += 1
+
+
+def _submit(fn, *args) -> Future:
+    with _hash_pool_lock:
+        _hash_pool_stats["queued"] += 1
+        _hash_pool_stats["max_queued"] = max(_hash_pool_stats["max_queued"], _hash_pool_stats["queued"])
+    return _hash_pool.submit(_run_tracked, fn, *args)
+
+
 def hash(password:str):
-    return pwd_context.hash(password)
+    return _submit(pwd_context.hash, password).result()
 
 def verify(plain_password,hashed_password):
-    return pwd_context.verify(plain_password,hashed_password)
\ No newline at end of file
+    return _submit(pwd_context.verify, plain_password, hashed_password).result()
+
+async def hash_async(password: str):
+    return await asyncio.wrap_future(_submit(pwd_context.hash, password))
+
+async def verify_async(plain_password, hashed_password):
+    return await asyncio.wrap_future(_submit(pwd_context.verify, plain_password, hashed_password))
+
+def hash_pool_stats() -> dict:
+    with _hash_pool_lock:
+        return {
+            "workers": HASH_POOL_SIZE,
+            "queue_depth": _hash_pool_stats["queued"],
+            "max_queue_depth": _hash_pool_stats["max_queued"],
+            "running": _hash_pool_stats["running"],
+            "completed": _hash_pool_stats["completed"],
+        }
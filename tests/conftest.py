@@ -0,0 +1,128 @@
+import asyncio
+import os
+from datetime import datetime
+from pathlib import Path
+from types import SimpleNamespace
+import pytest
+
+# Tests that need Postgres run against TEST_DATABASE_URL, a database they
+# wipe and migrate to head; without it they are skipped. The app's engines
+# are pointed at it before app.database is imported.
+TEST_DATABASE_URL = os.environ.get("TEST_DATABASE_URL")
+if TEST_DATABASE_URL:
+    os.environ["DATABASE_URL"] = TEST_DATABASE_URL
+    os.environ["ASYNC_DATABASE_URL"] = TEST_DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://", 1)
+
+from sqlalchemy import text
+from app import models
+from app.database import engine, async_engine, SessionLocal
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+@pytest.fixture(scope="session")
+def database():
+    if not TEST_DATABASE_URL:
+        pytest.skip("TEST_DATABASE_URL is not set")
+    from alembic import command
+    from alembic.config import Config
+    with engine.begin() as connection:
+        connection.execute(text("DROP SCHEMA public CASCADE"))
+        connection.execute(text("CREATE SCHEMA public"))
+    command.upgrade(Config(str(ROOT / "alembic.ini")), "head")
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def db(database):
+    session = SessionLocal()
+    yield session
+    session.close()
+    tables = [table.name for table in models.Base.metadata.sorted_tables]
+    with engine.begin() as connection:
+        connection.execute(text(f"TRUNCATE {', '.join(tables)} RESTART IDENTITY CASCADE"))
+
+
+@pytest.fixture
+def run_async(database):
+    # Runs a coroutine function on a fresh event loop; the async pool's
+    # connections belong to that loop, so they are dropped afterwards
+    def run(coroutine_function, *args):
+        async def main():
+            try:
+                return await coroutine_function(*args)
+            finally:
+                await async_engine.dispose()
+        return asyncio.run(main())
+    return run
+
+
+@pytest.fixture
+def school(db):
+    # One school with a division, a subject and a teacher
+    school = models.School(
+        name="Test School", address="1 Main St", city="City", state="State",
+        country="Country", zip_code="00000", contact_number_1="000"
+    )
+    grade = models.Grade(name="Grade 1")
+    section = models.Section(name="A")
+    subject = models.Subject(name="Mathematics", code="MATH")
+    teacher_user = models.User(email="teacher@example.com", password="x")
+    db.add_all([school, grade, section, subject, teacher_user])
+    db.flush()
+    division = models.Division(grade_id=grade.id, section_id=section.id, academic_year="2026", school_id=school.id)
+    teacher = models.Teacher(first_name="T", last_name="Teacher", email="teacher@example.com", user_id=teacher_user.id, school_id=school.id)
+    db.add_all([division, teacher])
+    db.commit()
+    return SimpleNamespace(
+        school=school, grade=grade, section=section, subject=subject,
+        division=division, teacher=teacher, teacher_user=teacher_user
+    )
+
+
+@pytest.fixture
+def make_student(db, school):
+    def make(number: int) -> models.Student:
+        user = models.User(email=f"student{number}@example.com", password="x")
+        db.add(user)
+        db.flush()
+        student = models.Student(
+            first_name="S", last_name=str(number), email=f"student{number}@example.com",
+            user_id=user.id, school_id=school.school.id
+        )
+        db.add(student)
+        db.flush()
+        return student
+    return make
+
+
+@pytest.fixture
+def make_quiz(db, school):
+    def make(question_count: int) -> int:
+        # A quiz with question_count questions, every third one a draft
+        owner = dict(
+            user_id=school.teacher_user.id, school_id=school.school.id,
+            division_id=school.division.id, subject_id=school.subject.id
+        )
+        quiz = models.Quiz(
+            title=f"Quiz of {question_count}", start_date=datetime(2026, 1, 5, 9), duration=30,
+            topic="Algebra", sub_topic="Equations", **owner
+        )
+        db.add(quiz)
+        db.flush()
+        for number in range(1, question_count + 1):
+            state = models.QuestionState.draft if number % 3 == 0 else models.QuestionState.active
+            question = models.Question(
+                title=f"Quiz {quiz.id} question {number}", body={"text": "x + 1 = 2"},
+                answer={"A": "1"}, choice_body={"A": "1", "B": "2"},
+                topic="Algebra", sub_topic="Equations", state=state, **owner
+            )
+            db.add(question)
+            db.flush()
+            db.add(models.QuizQuestion(
+                quiz_id=quiz.id, question_id=question.id, question_number=number, user_id=owner["user_id"]
+            ))
+        db.commit()
+        return quiz.id
+    return make
@@ -0,0 +1,199 @@
+import asyncio
+import select
+from datetime import datetime, timedelta
+import orjson
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import text
+from app import autosave, models, notify, schemas
+from app.database import AsyncSessionLocal, engine
+from app.routers import student_quiz
+
+
+@pytest.fixture
+def attempt_id(db, make_student):
+    student = make_student(1)
+    attempt = models.StudentQuizResponseRel(student_id=student.id, response={"1": "A"}, status="in_progress")
+    db.add(attempt)
+    db.commit()
+    return attempt.id
+
+
+def stored(db, attempt_id):
+    db.expire_all()
+    return db.get(models.StudentQuizResponseRel, attempt_id)
+
+
+async def submit(buffer, attempt_id, answers):
+    async with AsyncSessionLocal() as session:
+        return await buffer.submit(session, attempt_id, answers)
+
+
+async def wait_in_flight(buffer, attempt_id):
+    while attempt_id not in buffer._in_flight:
+        await asyncio.sleep(0.01)
+    # Let the flush's UPDATE reach the server
+    await asyncio.sleep(0.2)
+
+
+def lock_row(attempt_id):
+    connection = engine.connect()
+    connection.execute(text("SELECT id FROM students_quiz_response_rel WHERE id = :id FOR UPDATE"), {"id": attempt_id})
+    return connection
+
+
+def test_flush_merges_answers_into_stored_response(db, run_async, attempt_id):
+    buffer = autosave.Buffer()
+    buffer.save(attempt_id, {"2": "B"})
+    buffer.save(attempt_id, {"2": "C", "3": ["A", "D"]})
+
+    assert run_async(buffer.flush) == 1
+    assert stored(db, attempt_id).response == {"1": "A", "2": "C", "3": ["A", "D"]}
+    assert buffer.pending(attempt_id) == {}
+
+
+def test_flush_after_submit_on_another_worker_keeps_earlier_answers(db, run_async, attempt_id):
+    worker_a, worker_b = autosave.Buffer(), autosave.Buffer()
+
+    async def scenario():
+        worker_a.save(attempt_id, {"2": "B"})
+        submitted = await submit(worker_b, attempt_id, {"3": "C"})
+        # Accepted by worker A after the attempt was submitted through B
+        worker_a.save(attempt_id, {"4": "D"})
+        await worker_a.flush()
+        return submitted
+
+    submitted = run_async(scenario)
+    assert submitted is not None
+    attempt = stored(db, attempt_id)
+    assert attempt.is_submitted
+    assert attempt.response == {"1": "A", "2": "B", "3": "C"}
+
+
+def test_submit_waits_for_in_flight_flush(db, run_async, attempt_id):
+    buffer = autosave.Buffer()
+    lock = lock_row(attempt_id)
+
+    async def scenario():
+        buffer.save(attempt_id, {"2": "B"})
+        flush = asyncio.create_task(buffer.flush())
+        await wait_in_flight(buffer, attempt_id)
+        submitting = asyncio.create_task(submit(buffer, attempt_id, {"3": "C"}))
+        await asyncio.sleep(0.2)
+        assert not submitting.done()
+        lock.rollback()
+        await flush
+        return await submitting
+
+    try:
+        assert run_async(scenario) is not None
+    finally:
+        lock.close()
+    attempt = stored(db, attempt_id)
+    assert attempt.is_submitted
+    assert attempt.response == {"1": "A", "2": "B", "3": "C"}
+
+
+def test_submit_writes_answers_of_a_failed_in_flight_flush(db, run_async, attempt_id):
+    buffer = autosave.Buffer()
+    lock = lock_row(attempt_id)
+
+    async def scenario():
+        buffer.save(attempt_id, {"2": "B"})
+        flush = asyncio.create_task(buffer.flush())
+        await wait_in_flight(buffer, attempt_id)
+        submitting = asyncio.create_task(submit(buffer, attempt_id, {"3": "C"}))
+        await asyncio.sleep(0.1)
+        flush.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await flush
+        # The flush put its answers back, and the submit picked them up
+        await asyncio.sleep(0.1)
+        assert buffer.pending(attempt_id) == {}
+        lock.rollback()
+        return await submitting
+
+    try:
+        assert run_async(scenario) is not None
+    finally:
+        lock.close()
+    attempt = stored(db, attempt_id)
+    assert attempt.response == {"1": "A", "2": "B", "3": "C"}
+
+
+def test_submit_of_a_submitted_attempt_returns_none(db, run_async, attempt_id):
+    buffer = autosave.Buffer()
+
+    async def scenario():
+        await submit(buffer, attempt_id, {})
+        buffer.save(attempt_id, {"2": "B"})
+        return await submit(buffer, attempt_id, {"3": "C"})
+
+    assert run_async(scenario) is None
+    assert stored(db, attempt_id).response == {"1": "A"}
+
+
+@pytest.fixture
+def published_attempt(db, school, make_student, make_quiz):
+    student = make_student(1)
+    published = models.PublishedQuiz(
+        quiz_type="Assignment", start_time=datetime.now() - timedelta(minutes=5), duration=60,
+        quiz_id=make_quiz(1), status="published", division_id=school.division.id,
+        school_id=school.school.id, user_id=school.teacher_user.id
+    )
+    db.add(published)
+    db.flush()
+    attempt = models.StudentQuizResponseRel(
+        student_id=student.id, quiz_rel_id=published.id, response={}, status="in_progress"
+    )
+    db.add(attempt)
+    db.commit()
+    return attempt.id, student.user_id
+
+
+def deliver_notifications(connection, timeout: float = 5.0):
+    # What the listener thread does with the messages on its connection
+    ready, _, _ = select.select([connection], [], [], timeout)
+    assert ready, "no notification arrived"
+    connection.poll()
+    while connection.notifies:
+        message = orjson.loads(connection.notifies.pop(0).payload)
+        notify._dispatch(message["topic"], message["key"])
+
+
+def test_saves_after_a_submit_on_another_worker_are_refused(db, run_async, published_attempt):
+    attempt_id, user_id = published_attempt
+    student = schemas.Principal(id=user_id, role="student")
+    # This worker (the module's buffer) has the attempt cached; it is submitted through another one
+    this_worker, other_worker = autosave.buffer, autosave.Buffer()
+    this_worker.remember(autosave.Attempt(attempt_id, user_id, datetime.now() + timedelta(hours=1), frozenset({"1"})))
+    listening = notify.listener._connect()
+
+    async def save(answer):
+        async with AsyncSessionLocal() as session:
+            return await student_quiz.save_quiz_answers(
+                attempt_id, schemas.StudentQuizAnswers(answers={"1": answer}), session, student
+            )
+
+    try:
+        assert run_async(save, "A").saved == 1
+        assert run_async(submit, other_worker, attempt_id, {}) is not None
+        deliver_notifications(listening)
+        assert this_worker.attempt(attempt_id) is None
+        with pytest.raises(HTTPException) as refused:
+            run_async(save, "B")
+        assert refused.value.status_code == 409
+        # The save accepted before the submit is still written
+        run_async(this_worker.flush)
+        assert stored(db, attempt_id).response == {"1": "A"}
+    finally:
+        listening.close()
+        this_worker.forget(attempt_id)
+        this_worker._dirty.pop(attempt_id, None)
+
+
+def test_listener_reconnect_forgets_every_attempt():
+    worker = autosave.buffer
+    worker.remember(autosave.Attempt(-1, 1, datetime.now() + timedelta(hours=1), frozenset()))
+    notify._dispatch(autosave.TOPIC, None)
+    assert worker.attempt(-1) is None
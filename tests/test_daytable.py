@@ -0,0 +1,45 @@
+from datetime import time
+import pytest
+from app.daytable import DayTimetable
+
+# Two back-to-back classes, then a gap before the last one
+FIRST = {"id": 1, "start_time": time(9), "end_time": time(9, 45)}
+SECOND = {"id": 2, "start_time": time(9, 45), "end_time": time(10, 30)}
+LAST = {"id": 3, "start_time": time(11), "end_time": time(11, 45)}
+DAY = DayTimetable([LAST, SECOND, FIRST])
+
+# now -> (current class id, next boundary)
+CASES = {
+    time(8): (None, time(9)),
+    time(8, 59, 59): (None, time(9)),
+    time(9): (1, time(9, 45)),
+    time(9, 30): (1, time(9, 45)),
+    # At a shared boundary the earlier class is still current; it changes just after
+    time(9, 45): (1, time(9, 45)),
+    time(9, 45, 0, 1): (2, time(10, 30)),
+    time(10, 30): (2, time(10, 30)),
+    time(10, 30, 0, 1): (None, time(11)),
+    time(11): (3, time(11, 45)),
+    time(11, 45): (3, time(11, 45)),
+    time(11, 45, 0, 1): (None, None),
+}
+
+
+@pytest.mark.parametrize("now, expected", CASES.items(), ids=[str(now) for now in CASES])
+def test_current_and_next_boundary(now, expected):
+    current_id, boundary = expected
+    current = DAY.current(now)
+    assert (current["id"] if current else None) == current_id
+    assert DAY.next_boundary(now) == boundary
+
+
+@pytest.mark.parametrize("now", CASES)
+def test_current_is_the_earliest_class_with_start_le_now_le_end(now):
+    matching = [details for details in (FIRST, SECOND, LAST) if details["start_time"] <= now <= details["end_time"]]
+    assert DAY.current(now) == (matching[0] if matching else None)
+
+
+def test_empty_day():
+    day = DayTimetable([])
+    assert day.current(time(9)) is None
+    assert day.next_boundary(time(9)) is None
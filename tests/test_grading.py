@@ -0,0 +1,79 @@
+import numpy as np
+import pytest
+from app import grading
+
+CHOICES = {"A": "1", "B": "2", "C": "3", "D": "4"}
+QUIZ = {"questions": [
+    {"id": 1, "is_objective": True, "choice_body": CHOICES, "answer": {"B": "2"}},
+    {"id": 2, "is_objective": True, "choice_body": CHOICES, "answer": ["A", "C"]},
+    {"id": 3, "is_objective": False, "choice_body": None, "answer": {"text": "Explain"}},
+    {"id": 4, "is_objective": True, "choice_body": CHOICES, "answer": {"E": "5"}},
+]}
+KEY = grading.answer_key(QUIZ)
+
+# (response to one question, credit with partial credit, credit without)
+SINGLE_ANSWER = {
+    "the key": ("B", 1, 1),
+    "the key's text": ("2", 1, 1),
+    "a wrong key": ("C", 0, 0),
+    "an unknown key": ("E", 0, 0),
+    "the right key and a wrong one": (["B", "C"], 0, 0),
+    "no answer": (None, 0, 0),
+}
+MULTI_SELECT = {
+    "exactly the keys": (["A", "C"], 1, 1),
+    "the keys as a dict": ({"A": "1", "C": "3"}, 1, 1),
+    "one of two keys": (["A"], 0.5, 0),
+    "one key by its text": ("1", 0.5, 0),
+    "one key and a wrong pick": (["A", "B"], 0, 0),
+    "both keys and a wrong pick": (["A", "C", "B"], 0.5, 0),
+    "both keys and an unknown pick": (["A", "C", "Z"], 0.5, 0),
+    "one key and an unknown pick": (["C", "Z"], 0, 0),
+    "only unknown picks": (["Y", "Z"], 0, 0),
+    "every option": (["A", "B", "C", "D"], 0, 0),
+    "nothing": ([], 0, 0),
+}
+
+
+def test_answer_key_skips_ungradable_questions():
+    assert KEY.question_ids == ["1", "2"]
+    assert KEY.ungraded == ["3", "4"]
+    assert KEY.correct.tolist() == [[False, True, False, False], [True, False, True, False]]
+
+
+@pytest.mark.parametrize("question_id, cases", [("1", SINGLE_ANSWER), ("2", MULTI_SELECT)], ids=["single answer", "multi-select"])
+def test_score(question_id, cases):
+    # One student per case, all scored in one pass
+    row = KEY.question_ids.index(question_id)
+    selected, unknown = grading.encode(KEY, [{question_id: value} for value, _, _ in cases.values()])
+    for partial_credit, column in ((True, 1), (False, 2)):
+        credits = grading.score(KEY, selected, unknown, partial_credit)[:, row]
+        expected = [case[column] for case in cases.values()]
+        assert dict(zip(cases, credits.tolist())) == dict(zip(cases, expected)), f"partial_credit={partial_credit}"
+
+
+def test_responses_to_ungraded_or_unknown_questions_are_ignored():
+    selected, unknown = grading.encode(KEY, [{"3": "anything", "4": "E", "99": "A"}, "not a dict"])
+    assert not selected.any()
+    assert not unknown.any()
+
+
+@pytest.mark.parametrize("questions", [
+    [],
+    [{"id": 3, "is_objective": False, "answer": {"text": "Explain"}}],
+    [{"id": 4, "is_objective": True, "choice_body": CHOICES, "answer": {"E": "5"}}],
+], ids=["no questions", "open-ended only", "no usable key"])
+@pytest.mark.parametrize("partial_credit", [True, False])
+def test_quiz_without_gradable_questions(questions, partial_credit):
+    key = grading.answer_key({"questions": questions})
+    assert key.question_ids == []
+    selected, unknown = grading.encode(key, [{"3": "text", "4": "E"}, {}])
+    credits = grading.score(key, selected, unknown, partial_credit)
+    assert credits.shape == (2, 0)
+    assert credits.sum(axis=1).tolist() == [0, 0]
+
+
+def test_no_responses():
+    selected, unknown = grading.encode(KEY, [])
+    assert grading.score(KEY, selected, unknown).shape == (0, 2)
+    assert np.array_equal(unknown, np.zeros((0, 2)))
@@ -0,0 +1,138 @@
+import json
+from sqlalchemy import text
+
+# The hot-path lookups that migration 0003 indexes must use those indexes
+# once the tables hold more than a handful of rows.
+
+STUDENTS = 5000
+TEACHERS = 1000
+DIVISIONS = 100
+SCHOOL_DAYS = 60
+QUIZZES = 200
+QUESTIONS_PER_QUIZ = 40
+
+SEED = [
+    """
+    INSERT INTO users (id, email, password)
+    SELECT n, 'user' || n || '@example.com', 'x' FROM generate_series(1000, 999 + :students + :teachers) n
+    """,
+    """
+    INSERT INTO students (first_name, last_name, email, user_id, school_id)
+    SELECT 'S', n::text, 'user' || n || '@example.com', n, :school_id FROM generate_series(1000, 999 + :students) n
+    """,
+    """
+    INSERT INTO teachers (first_name, last_name, email, user_id, school_id)
+    SELECT 'T', n::text, 'user' || n || '@example.com', n, :school_id
+    FROM generate_series(1000 + :students, 999 + :students + :teachers) n
+    """,
+    "INSERT INTO user_roles (name) VALUES ('student')",
+    "INSERT INTO user_roles_rel (user_id, role_id) SELECT id, (SELECT max(id) FROM user_roles) FROM users",
+    """
+    INSERT INTO divisions (grade_id, section_id, academic_year, school_id)
+    SELECT :grade_id, :section_id, 'Y' || n, :school_id FROM generate_series(1, :divisions) n
+    """,
+    # Every student has moved division twice; only the last move is current
+    """
+    INSERT INTO student_divisions (student_id, division_id, is_current)
+    SELECT s.id, d.id, move = 3
+    FROM students s, generate_series(1, 3) move,
+    LATERAL (SELECT id FROM divisions ORDER BY id OFFSET (s.id + move) % :divisions LIMIT 1) d
+    """,
+    # Each division has TEACHERS / DIVISIONS teachers, one per period, on every school day
+    """
+    INSERT INTO class_schedules (period, date, subject_id, division_id, teacher_id, start_time, end_time)
+    SELECT t.rank / :divisions + 1, DATE '2026-01-05' + day, :subject_id, d.id, t.id,
+           TIME '08:00' + (t.rank / :divisions) * INTERVAL '1 hour',
+           TIME '08:45' + (t.rank / :divisions) * INTERVAL '1 hour'
+    FROM (SELECT id, row_number() OVER (ORDER BY id) - 1 AS rank FROM teachers) t
+    JOIN (SELECT id, row_number() OVER (ORDER BY id) - 1 AS rank FROM divisions) d ON d.rank = t.rank % :divisions
+    CROSS JOIN generate_series(0, :school_days - 1) day
+    """,
+    """
+    INSERT INTO quiz (title, start_date, duration, topic, sub_topic, quiz_type, subject_id, division_id, user_id, school_id)
+    SELECT 'Quiz ' || n, TIMESTAMP '2026-01-05 09:00', 30, 'Algebra', 'Equations', 'Assignment',
+           :subject_id, :division_id, :user_id, :school_id
+    FROM generate_series(1, :quizzes) n
+    """,
+    """
+    INSERT INTO questions (title, topic, sub_topic, user_id, school_id, division_id, subject_id)
+    SELECT 'Question ' || n, 'Algebra', 'Equations', :user_id, :school_id, :division_id, :subject_id
+    FROM generate_series(1, :questions_per_quiz) n
+    """,
+    """
+    INSERT INTO quiz_question_rel (question_number, user_id, question_id, quiz_id)
+    SELECT row_number() OVER (PARTITION BY qz.id ORDER BY q.id), :user_id, q.id, qz.id FROM quiz qz, questions q
+    """,
+    """
+    INSERT INTO published_quiz (quiz_type, start_time, duration, quiz_id, status, division_id, school_id, user_id)
+    SELECT 'Assignment', TIMESTAMP '2026-01-05 09:00', 30, id, 'published',
+           :division_id, :school_id, :user_id
+    FROM quiz
+    """,
+    # Every student has an attempt at three published quizzes
+    """
+    INSERT INTO students_quiz_response_rel (status, student_id, quiz_rel_id)
+    SELECT 'submitted', s.id, p.id
+    FROM students s, generate_series(0, 2) attempt,
+    LATERAL (SELECT id FROM published_quiz ORDER BY id OFFSET (s.id * 3 + attempt) % :quizzes LIMIT 1) p
+    """,
+]
+
+# (index, query) for each hot path, looking up rows that exist
+HOT_PATHS = [
+    ("ix_student_divisions_student_id_current",
+     "SELECT division_id FROM student_divisions WHERE student_id = (SELECT min(id) FROM students) AND is_current"),
+    ("ix_student_divisions_division_id_current",
+     "SELECT student_id FROM student_divisions WHERE division_id = (SELECT min(id) FROM divisions) AND is_current"),
+    ("ix_class_schedules_teacher_id_date_start_time",
+     "SELECT * FROM class_schedules WHERE teacher_id = (SELECT min(id) FROM teachers)"
+     " AND date BETWEEN DATE '2026-01-12' AND DATE '2026-01-18' ORDER BY date, start_time"),
+    ("ix_class_schedules_division_id_date_start_time",
+     "SELECT * FROM class_schedules WHERE division_id = (SELECT min(id) FROM divisions)"
+     " AND date BETWEEN DATE '2026-01-12' AND DATE '2026-01-18' ORDER BY date, start_time"),
+    ("ix_quiz_question_rel_quiz_id_question_number",
+     "SELECT question_id, question_number FROM quiz_question_rel WHERE quiz_id = (SELECT min(id) FROM quiz)"
+     " ORDER BY question_number"),
+    ("ix_students_user_id", "SELECT * FROM students WHERE user_id = 1000"),
+    ("ix_teachers_user_id", "SELECT * FROM teachers WHERE user_id = 1000 + :students"),
+    ("ix_user_roles_rel_user_id",
+     "SELECT user_roles.name FROM user_roles_rel JOIN user_roles ON user_roles.id = user_roles_rel.role_id"
+     " WHERE user_roles_rel.user_id = 1000"),
+    ("ix_students_quiz_response_rel_student_id",
+     "SELECT * FROM students_quiz_response_rel WHERE student_id = (SELECT min(id) FROM students)"),
+    ("ix_students_quiz_response_rel_quiz_rel_id",
+     "SELECT * FROM students_quiz_response_rel WHERE quiz_rel_id = (SELECT min(id) FROM published_quiz)"),
+]
+
+INDEX_SCANS = ("Index Scan", "Index Only Scan", "Bitmap Index Scan")
+
+
+def _index_scans(plan: dict) -> set:
+    found = set()
+    if plan.get("Node Type") in INDEX_SCANS:
+        found.add(plan.get("Index Name"))
+    for child in plan.get("Plans", []):
+        found |= _index_scans(child)
+    return found
+
+
+def test_hot_paths_use_their_indexes(db, school):
+    parameters = {
+        "school_id": school.school.id, "grade_id": school.grade.id, "section_id": school.section.id,
+        "subject_id": school.subject.id, "division_id": school.division.id, "user_id": school.teacher_user.id,
+        "students": STUDENTS, "teachers": TEACHERS, "divisions": DIVISIONS, "school_days": SCHOOL_DAYS,
+        "quizzes": QUIZZES, "questions_per_quiz": QUESTIONS_PER_QUIZ,
+    }
+    for statement in SEED:
+        db.execute(text(statement), parameters)
+    db.commit()
+    db.execute(text("ANALYZE"))
+
+    missed = {}
+    for index, query in HOT_PATHS:
+        plan = db.execute(text(f"EXPLAIN (FORMAT JSON) {query}"), {"students": STUDENTS}).scalar()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        if index not in _index_scans(plan[0]["Plan"]):
+            missed[index] = plan
+    assert not missed, json.dumps(missed, indent=2)
@@ -0,0 +1,145 @@
+import threading
+from datetime import timedelta
+import pytest
+from sqlalchemy import func, select, text, update
+from app import jobs, models
+from app.database import engine
+
+
+@jobs.handler("test_succeed")
+def _succeed(job, payload):
+    return {"echo": payload}
+
+
+@jobs.handler("test_fail")
+def _fail(job, payload):
+    raise RuntimeError("temporary failure")
+
+
+@jobs.handler("test_reject")
+def _reject(job, payload):
+    raise jobs.JobError("invalid input")
+
+
+def runner(name: str) -> jobs.Runner:
+    runner = jobs.Runner(workers=1, lease_seconds=60)
+    runner.worker_id = name
+    return runner
+
+
+def queue(db, kind: str, count: int = 1, max_attempts: int = 3) -> list[int]:
+    job_ids = [jobs.submit(db, kind, None, {"n": n}, max_attempts=max_attempts).id for n in range(count)]
+    db.commit()
+    return job_ids
+
+
+def stored(db, job_id: int) -> models.Job:
+    db.expire_all()
+    return db.get(models.Job, job_id)
+
+
+def make_due(db, job_id: int):
+    # As if the job's retry delay had passed
+    db.execute(update(models.Job).where(models.Job.id == job_id).values(run_after=func.now()))
+    db.commit()
+
+
+def test_concurrent_claims_never_take_the_same_job(db):
+    job_ids = queue(db, "test_succeed", 60)
+    claimed = []
+    start = threading.Barrier(4)
+
+    def claim_all(worker: jobs.Runner):
+        start.wait()
+        while (job := worker._claim()) is not None:
+            claimed.append((worker.worker_id, job.id))
+
+    threads = [threading.Thread(target=claim_all, args=(runner(f"worker-{n}"),)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(job_id for _, job_id in claimed) == job_ids
+    db.expire_all()
+    owners = dict(db.execute(select(models.Job.id, models.Job.locked_by)).all())
+    assert owners == {job_id: worker for worker, job_id in claimed}
+
+
+def test_claim_skips_a_job_locked_by_another_worker(db):
+    first, second = queue(db, "test_succeed", 2)
+    with engine.connect() as other:
+        other.execute(text("SELECT id FROM jobs WHERE id = :id FOR UPDATE"), {"id": first})
+        assert runner("worker-a")._claim().id == second
+        assert runner("worker-b")._claim() is None
+        other.rollback()
+    assert runner("worker-b")._claim().id == first
+
+
+def test_job_with_an_expired_lease_is_claimed_again(db):
+    expired, alive = queue(db, "test_succeed", 2)
+    for job_id, heartbeat in ((expired, timedelta(seconds=120)), (alive, timedelta(seconds=10))):
+        db.execute(update(models.Job).where(models.Job.id == job_id).values(
+            status="running", attempts=1, locked_by="dead-worker", heartbeat_at=func.now() - heartbeat
+        ))
+    db.commit()
+
+    worker = runner("worker-a")
+    job = worker._claim()
+    assert (job.id, job.attempts) == (expired, 2)
+    assert worker._claim() is None
+    assert stored(db, expired).locked_by == "worker-a"
+    assert stored(db, alive).locked_by == "dead-worker"
+
+    worker._execute(job)
+    assert stored(db, expired).status == "succeeded"
+    # The dead worker can no longer write to the job it lost
+    assert not runner("dead-worker")._update(expired, progress=1)
+
+
+def test_failed_job_retries_with_backoff_until_max_attempts(db):
+    (job_id,) = queue(db, "test_fail", max_attempts=3)
+    worker = runner("worker-a")
+    for attempt in (1, 2):
+        job = worker._claim()
+        assert (job.id, job.attempts) == (job_id, attempt)
+        worker._execute(job)
+        retried = stored(db, job_id)
+        assert (retried.status, retried.locked_by, retried.error) == ("queued", None, "temporary failure")
+        delay = db.scalar(select(func.extract("epoch", models.Job.run_after - func.now())).where(models.Job.id == job_id))
+        assert jobs.retry_delay(attempt) - 5 < delay <= jobs.retry_delay(attempt)
+        assert worker._claim() is None
+        make_due(db, job_id)
+
+    job = worker._claim()
+    assert job.attempts == 3
+    worker._execute(job)
+    failed = stored(db, job_id)
+    assert (failed.status, failed.attempts, failed.error) == ("failed", 3, "temporary failure")
+    assert failed.finished_at is not None
+    make_due(db, job_id)
+    assert worker._claim() is None
+    assert worker.stats["retried"] == 2 and worker.stats["failed"] == 1
+
+
+def test_job_error_fails_without_retrying(db):
+    (job_id,) = queue(db, "test_reject", max_attempts=3)
+    worker = runner("worker-a")
+    worker._execute(worker._claim())
+    failed = stored(db, job_id)
+    assert (failed.status, failed.attempts, failed.error) == ("failed", 1, "invalid input")
+    make_due(db, job_id)
+    assert worker._claim() is None
+
+
+def test_successful_job_records_its_result(db):
+    (job_id,) = queue(db, "test_succeed")
+    worker = runner("worker-a")
+    worker._execute(worker._claim())
+    done = stored(db, job_id)
+    assert (done.status, done.progress, done.result, done.locked_by) == ("succeeded", 100, {"echo": {"n": 0}}, None)
+
+
+def test_submit_rejects_unknown_kinds(db):
+    with pytest.raises(ValueError):
+        jobs.submit(db, "test_unknown", None, {})
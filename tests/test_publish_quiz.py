@@ -0,0 +1,61 @@
+from datetime import datetime
+import pytest
+from sqlalchemy import event, select, text
+from app import models, schemas
+from app.database import AsyncSessionLocal, async_engine
+from app.routers import quiz as quiz_router
+
+
+def publish(run_async, school, quiz_id):
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    async def call():
+        async with AsyncSessionLocal() as session:
+            return await quiz_router.publish_quiz(
+                schemas.PublishQuiz(
+                    quiz_id=quiz_id, quiz_type="Assignment", division_id=school.division.id,
+                    start_time=datetime(2026, 1, 5, 9), duration=30
+                ),
+                0, session, schemas.Principal(id=school.teacher_user.id, role="teacher")
+            )
+
+    event.listen(async_engine.sync_engine, "after_cursor_execute", record)
+    try:
+        result = run_async(call)
+    finally:
+        event.remove(async_engine.sync_engine, "after_cursor_execute", record)
+    return result, len(statements)
+
+
+def enrol(db, school, first: int, count: int):
+    db.execute(text(
+        "INSERT INTO users (id, email, password) SELECT n, 'user' || n || '@example.com', 'x' FROM generate_series(:first, :last) n"
+    ), {"first": first, "last": first + count - 1})
+    db.execute(text(
+        "INSERT INTO students (first_name, last_name, email, user_id, school_id)"
+        " SELECT 'S', n::text, 'user' || n || '@example.com', n, :school_id FROM generate_series(:first, :last) n"
+    ), {"first": first, "last": first + count - 1, "school_id": school.school.id})
+    db.execute(text(
+        "INSERT INTO student_divisions (student_id, division_id, is_current)"
+        " SELECT id, :division_id, true FROM students WHERE user_id BETWEEN :first AND :last"
+    ), {"first": first, "last": first + count - 1, "division_id": school.division.id})
+    db.commit()
+
+
+@pytest.mark.parametrize("students", [200, 2000])
+def test_publish_is_a_fixed_number_of_statements(db, run_async, school, make_quiz, students):
+    enrol(db, school, 1000, 1)
+    small, small_statements = publish(run_async, school, make_quiz(10))
+    enrol(db, school, 2000, students - 1)
+    large, large_statements = publish(run_async, school, make_quiz(10))
+    assert large_statements == small_statements
+
+    rows = db.execute(select(
+        models.StudentQuizResponseRel.quiz_rel_id, models.StudentQuizResponseRel.snapshot_id
+    ).where(models.StudentQuizResponseRel.quiz_rel_id == large["published_quiz_id"])).all()
+    published = db.get(models.PublishedQuiz, large["published_quiz_id"])
+    assert len(rows) == students
+    assert {snapshot_id for _, snapshot_id in rows} == {published.snapshot_id}
@@ -0,0 +1,37 @@
+from sqlalchemy import select
+from app import models, schemas
+from app.database import AsyncSessionLocal
+from app.routers import quiz as quiz_router
+
+
+def add_questions(run_async, quiz_id, owner_id, question_ids):
+    async def call():
+        async with AsyncSessionLocal() as session:
+            return await quiz_router.add_questions_bulk(
+                quiz_id, schemas.BulkQuizQuestionAdd(question_ids=question_ids), session,
+                schemas.Principal(id=owner_id, role="teacher")
+            )
+    return run_async(call)
+
+
+def test_empty_selection_returns_the_same_keys(db, run_async, school, make_quiz):
+    source_id, target_id = make_quiz(2), make_quiz(1)
+    owner_id = school.teacher_user.id
+    source_questions = db.scalars(select(models.QuizQuestion.question_id).where(
+        models.QuizQuestion.quiz_id == source_id
+    ).order_by(models.QuizQuestion.question_number)).all()
+    present = db.scalar(select(models.QuizQuestion.question_id).where(models.QuizQuestion.quiz_id == target_id))
+
+    added = add_questions(run_async, target_id, owner_id, [*source_questions, present])
+    assert added["added_question_ids"] == source_questions
+    assert added["question_numbers"] == {str(question_id): number for number, question_id in enumerate(source_questions, 2)}
+    assert added["skipped_question_ids"] == [present]
+
+    empty = add_questions(run_async, target_id, owner_id, [])
+    assert empty == {
+        "message": "Added 0 questions to quiz.",
+        "added_question_ids": [],
+        "question_numbers": {},
+        "skipped_question_ids": []
+    }
+    assert empty.keys() == added.keys()
@@ -0,0 +1,51 @@
+import pytest
+from fastapi import Request, Response
+from sqlalchemy import event
+from app import schemas
+from app.database import AsyncSessionLocal, async_engine
+from app.routers import quiz as quiz_router
+
+
+def count_statements(run_async, coroutine_function, *args) -> int:
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    async def call():
+        async with AsyncSessionLocal() as session:
+            return await coroutine_function(session, *args)
+
+    event.listen(async_engine.sync_engine, "after_cursor_execute", record)
+    try:
+        run_async(call)
+    finally:
+        event.remove(async_engine.sync_engine, "after_cursor_execute", record)
+    return len(statements)
+
+
+async def get_quiz(db, quiz_id):
+    request = Request({"type": "http", "method": "GET", "path": f"/api/get_quiz/{quiz_id}", "headers": []})
+    result = await quiz_router.get_quiz_questions(quiz_id, request, Response(), db)
+    assert len(result["questions"]) > 0
+
+
+async def get_quiz_with_states(db, quiz_id, owner_id):
+    principal = schemas.Principal(id=owner_id, role="teacher")
+    result = await quiz_router.get_quiz_questions_with_states(quiz_id, True, db, principal)
+    assert result["summary"]["total"] > 0
+
+
+@pytest.mark.parametrize("question_count", [10, 50])
+def test_get_quiz_statement_count_does_not_grow_with_questions(run_async, make_quiz, question_count):
+    single = count_statements(run_async, get_quiz, make_quiz(1))
+    many = count_statements(run_async, get_quiz, make_quiz(question_count))
+    assert 0 < many == single
+
+
+@pytest.mark.parametrize("question_count", [10, 50])
+def test_get_quiz_with_states_statement_count_does_not_grow_with_questions(run_async, school, make_quiz, question_count):
+    owner_id = school.teacher_user.id
+    single = count_statements(run_async, get_quiz_with_states, make_quiz(1), owner_id)
+    many = count_statements(run_async, get_quiz_with_states, make_quiz(question_count), owner_id)
+    assert 0 < many == single
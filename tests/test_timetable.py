@@ -0,0 +1,55 @@
+from datetime import time
+import pytest
+from app.timetable import Slot, find_overlaps
+
+TEACHER = ("teacher", 1, "2026-01-05")
+DIVISION = ("division", 1, "2026-01-05")
+
+
+def slots(*intervals):
+    # (key, start, end) per class; the row number is its position
+    return [Slot(key, time(*start), time(*end), row=row) for row, (key, start, end) in enumerate(intervals)]
+
+
+# (intervals, expected (row, earlier overlapping row) pairs)
+CASES = {
+    "back to back": (
+        [(TEACHER, (9,), (10,)), (TEACHER, (10,), (11,))],
+        set(),
+    ),
+    "back to back, given out of order": (
+        [(TEACHER, (10,), (11,)), (TEACHER, (9,), (10,)), (TEACHER, (11,), (12,))],
+        set(),
+    ),
+    "overlapping by a minute": (
+        [(TEACHER, (9,), (10, 1)), (TEACHER, (10,), (11,))],
+        {(1, 0)},
+    ),
+    "identical": (
+        [(TEACHER, (9,), (10,)), (TEACHER, (9,), (10,))],
+        {(1, 0)},
+    ),
+    "contained": (
+        [(TEACHER, (9,), (12,)), (TEACHER, (10,), (11,))],
+        {(1, 0)},
+    ),
+    "a long class overlaps every class it spans": (
+        [(TEACHER, (9,), (12,)), (TEACHER, (10,), (10, 30)), (TEACHER, (11,), (11, 30))],
+        {(1, 0), (2, 0)},
+    ),
+    "touching the end of a long class": (
+        [(TEACHER, (9,), (11,)), (TEACHER, (9, 30), (10,)), (TEACHER, (11,), (12,))],
+        {(1, 0)},
+    ),
+    "same times on different timelines": (
+        [(TEACHER, (9,), (10,)), (DIVISION, (9,), (10,))],
+        set(),
+    ),
+    "empty": ([], set()),
+}
+
+
+@pytest.mark.parametrize("intervals, expected", CASES.values(), ids=CASES.keys())
+def test_find_overlaps(intervals, expected):
+    overlaps = find_overlaps(slots(*intervals))
+    assert {(slot.row, earlier.row) for slot, earlier in overlaps} == expected
@@ -0,0 +1,72 @@
+from collections import Counter
+import pytest
+from app.timetable_generator import Lesson, generate, unplaced_summary
+
+WEEKDAYS = [0, 1, 2, 3, 4]
+PERIODS = [1, 2, 3, 4, 5, 6]
+
+
+def check_constraints(lessons, result, max_per_teacher_per_day, blocked=frozenset()):
+    # No teacher or division in two places at once, the daily cap holds,
+    # and every lesson unit is either placed or reported unplaced
+    teacher_slots = Counter((p.teacher_id, p.weekday, p.period) for p in result.placements)
+    division_slots = Counter((p.division_id, p.weekday, p.period) for p in result.placements)
+    teacher_days = Counter((p.teacher_id, p.weekday) for p in result.placements)
+    assert max(teacher_slots.values(), default=0) <= 1
+    assert max(division_slots.values(), default=0) <= 1
+    assert max(teacher_days.values(), default=0) <= max_per_teacher_per_day
+    assert not set(teacher_slots) & set(blocked)
+    placed = Counter((p.division_id, p.subject_id, p.teacher_id) for p in result.placements)
+    unplaced = Counter((lesson.division_id, lesson.subject_id, lesson.teacher_id) for lesson in result.unplaced)
+    for lesson in lessons:
+        key = (lesson.division_id, lesson.subject_id, lesson.teacher_id)
+        assert placed[key] + unplaced[key] == lesson.per_week
+
+
+def test_places_everything_when_it_fits():
+    # Three divisions with six subjects each; teachers 1-3 teach in every division
+    lessons = [
+        Lesson(division_id, subject_id, teacher_id, per_week)
+        for division_id in (1, 2, 3)
+        for subject_id, teacher_id, per_week in [(1, 1, 6), (2, 2, 6), (3, 3, 5), (4, 10 + division_id, 5), (5, 20 + division_id, 4), (6, 30 + division_id, 4)]
+    ]
+    result = generate(lessons, WEEKDAYS, PERIODS, max_per_teacher_per_day=4, seed=1, time_budget=5)
+    assert result.unplaced == []
+    assert len(result.placements) == 3 * 30
+    check_constraints(lessons, result, 4)
+
+
+# (lessons, weekdays, periods, max periods per teacher per day, blocked teacher slots, units that cannot be placed)
+INFEASIBLE = {
+    "more lessons than the division's week": (
+        [Lesson(1, 1, 1, 20), Lesson(1, 2, 2, 11)], WEEKDAYS, PERIODS, 6, set(), 1,
+    ),
+    "over the teacher's daily cap": (
+        [Lesson(1, 1, 1, 12)], WEEKDAYS, PERIODS, 2, set(), 2,
+    ),
+    "teacher shared by too many divisions": (
+        [Lesson(division_id, 1, 1, 12) for division_id in (1, 2, 3)], WEEKDAYS, PERIODS, 6, set(), 6,
+    ),
+    "teacher blocked elsewhere": (
+        [Lesson(1, 1, 1, 8)], WEEKDAYS, PERIODS, 6, {(1, weekday, period) for weekday in WEEKDAYS[1:] for period in PERIODS}, 2,
+    ),
+    # The only repair moves the teacher's other lesson within the same, already full, day
+    "over the daily cap after a same-day repair": (
+        [Lesson(2, 10, 1, 1), Lesson(1, 11, 1, 1), Lesson(1, 12, 2, 1)], [0], [0, 1], 1, set(), 1,
+    ),
+}
+
+
+@pytest.mark.parametrize("lessons, weekdays, periods, max_per_day, blocked, expected_unplaced", INFEASIBLE.values(), ids=INFEASIBLE.keys())
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_reports_what_cannot_be_placed(lessons, weekdays, periods, max_per_day, blocked, expected_unplaced, seed):
+    result = generate(lessons, weekdays, periods, max_per_day, blocked=blocked, seed=seed, time_budget=1, max_attempts=10)
+    assert len(result.unplaced) == expected_unplaced
+    check_constraints(lessons, result, max_per_day, blocked)
+    assert sum(entry["periods"] for entry in unplaced_summary(result.unplaced)) == expected_unplaced
+
+
+def test_stops_after_max_attempts_when_nothing_helps():
+    result = generate([Lesson(1, 1, 1, 12)], WEEKDAYS, PERIODS, 2, seed=1, time_budget=60, max_attempts=3)
+    assert result.attempts == 3
+    assert len(result.unplaced) == 2